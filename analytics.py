@@ -0,0 +1,106 @@
+import numpy as np
+import pandas as pd
+
+# Bars per year used to annualize returns and volatility
+PERIODS_PER_YEAR = {
+    '1m': 252 * 390,
+    '2m': 252 * 195,
+    '5m': 252 * 78,
+    '15m': 252 * 26,
+    '30m': 252 * 13,
+    '60m': 252 * 7,
+    '90m': 252 * 5,
+    '1h': 252 * 7,
+    '1d': 252,
+    '1wk': 52,
+    '1mo': 12,
+    '3mo': 4,
+}
+
+
+def price_matrix(frames):
+    """Align per-ticker frames into one float32 (dates x tickers) matrix of closes.
+
+    Adjusted closes are used when the upstream supplied them.
+    """
+    columns = {}
+    for ticker, data in frames.items():
+        if data is None or data.empty:
+            continue
+        column = 'Adj Close' if 'Adj Close' in data and data['Adj Close'].notna().any() else 'Close'
+        columns[ticker] = data[column]
+    if not columns:
+        return pd.DataFrame(dtype='float32')
+    return pd.DataFrame(columns).sort_index().astype('float32')
+
+
+def max_drawdowns(prices):
+    """Largest peak-to-trough decline of every column"""
+    return (prices / prices.cummax() - 1).min()
+
+
+def rolling_betas(returns, benchmark, window):
+    """Rolling beta of every column against the benchmark column, vectorized over columns"""
+    bench = returns[benchmark]
+    covariance = returns.rolling(window, min_periods=window).cov(bench)
+    variance = bench.rolling(window, min_periods=window).var()
+    return covariance.div(variance, axis=0)
+
+
+def compute_analytics(prices, interval='1d', benchmark=None, beta_window=60):
+    """Returns, volatility, drawdown, beta and correlation for every ticker at once.
+
+    All statistics are whole-matrix pandas/NumPy operations, so cost grows with
+    the data size rather than with a Python loop per ticker.
+    """
+    periods = PERIODS_PER_YEAR.get(interval, 252)
+    returns = prices.pct_change(fill_method=None)
+    log_returns = np.log(prices).diff()
+
+    observations = returns.notna().sum()
+    first = prices.bfill().iloc[0]
+    last = prices.ffill().iloc[-1]
+    total_return = last / first - 1
+    years = observations / periods
+    metrics = pd.DataFrame({
+        'Total Return': total_return,
+        'Annualized Return': (1 + total_return) ** (1 / years.where(years > 0)) - 1,
+        'Annualized Volatility': returns.std() * np.sqrt(periods),
+        'Mean Log Return': log_returns.mean(),
+        'Max Drawdown': max_drawdowns(prices),
+        'Observations': observations,
+    })
+    metrics['Sharpe (rf=0)'] = metrics['Annualized Return'] / metrics['Annualized Volatility']
+
+    if benchmark is not None and benchmark in returns:
+        bench = returns[benchmark]
+        metrics['Beta'] = returns.cov().loc[:, benchmark] / bench.var()
+        metrics[f'Rolling Beta ({beta_window})'] = rolling_betas(returns, benchmark, beta_window).ffill().iloc[-1]
+
+    return {
+        'returns': returns,
+        'log_returns': log_returns,
+        'metrics': metrics,
+        'correlation': returns.corr(),
+        'covariance': returns.cov() * periods,  # Annualized
+    }
+
+
+def _plain(frame):
+    """DataFrame -> nested lists with NaN as None for JSON"""
+    return frame.astype('float64').round(6).astype(object).where(frame.notna(), None).values.tolist()
+
+
+def analytics_to_json(result, benchmark=None):
+    """JSON-friendly view of compute_analytics() output (without the return series)"""
+    metrics = result['metrics']
+    return {
+        'benchmark': benchmark,
+        'tickers': list(metrics.index),
+        'metrics': {
+            ticker: dict(zip(metrics.columns, row))
+            for ticker, row in zip(metrics.index, _plain(metrics))
+        },
+        'correlation': _plain(result['correlation']),
+        'covariance': _plain(result['covariance']),
+    }
@@ -0,0 +1,160 @@
+"""Micro-benchmarks of the request hot paths against the offline fake provider.
+
+    python bench/bench_hot_paths.py [--repeat 5] [--only prices,render] [--json results.json]
+
+Every case runs on a fresh temporary DATA_DIR with warm stores, so the
+numbers measure this app's own processing rather than the network. Compare
+runs with --json before and after a change.
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+os.environ['MARKET_DATA_PROVIDER'] = 'fake'
+os.environ.setdefault('DATA_DIR', tempfile.mkdtemp(prefix='stockdownloader-bench-'))
+os.environ.setdefault('RATELIMIT_ENABLED', '0')
+os.environ.setdefault('UPSTREAM_RATE', '100000')
+os.environ.setdefault('UPSTREAM_BURST', '100000')
+
+import logging  # noqa: E402
+
+logging.disable(logging.WARNING)  # Request logging would dominate the timings
+
+import main  # noqa: E402
+
+END_DATE = '2024-12-31'  # Fixed for daily and coarser cases so runs are comparable
+
+# (label, interval, days of history)
+CASES = [
+    ('1y daily', '1d', 365),
+    ('5y daily', '1d', 5 * 365),
+    ('20y daily', '1d', 20 * 365),
+    ('20y weekly', '1wk', 20 * 365),
+    ('5d 1m', '1m', 5),
+    ('30d 5m', '5m', 30),
+]
+
+EXPORT_FORMATS = ['xlsx', 'csv', 'parquet']
+FORMAT_TICKERS = 500
+
+
+def date_range(interval, days):
+    """(start, end) of a case; intraday bars are only served for recent dates, so those end today"""
+    end = main.datetime.now() if main.is_intraday(interval) else main.datetime.strptime(END_DATE, '%Y-%m-%d')
+    return (end - main.timedelta(days=days)).strftime('%Y-%m-%d'), end.strftime('%Y-%m-%d')
+
+
+def measure(fn, repeat):
+    """Run fn once to warm up, then `repeat` times; returns (min, median) milliseconds"""
+    fn()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return min(samples), statistics.median(samples)
+
+
+def bench_prices(client, label, interval, days, repeat):
+    """download_stock_data post-processing on a warm store (read, resample, downcast)"""
+    args = ('BENCH',) + date_range(interval, days) + (interval,)
+    return measure(lambda: main.download_stock_data(*args, cached_only=True, max_rows=main.PRICE_MAX_ROWS), repeat)
+
+
+def bench_render(client, label, interval, days, repeat):
+    """index(): the full POST with cached prices and fundamentals, including the template"""
+    start, end = date_range(interval, days)
+    form = {'ticker': 'BENCH', 'start': start, 'end': end, 'interval': interval}
+    return measure(lambda: client.post('/', data=form), repeat)
+
+
+def bench_table(client, label, interval, days, repeat):
+    """The price table's JSON page (1000 rows)"""
+    start, end = date_range(interval, days)
+    query = {'ticker': 'BENCH', 'start': start, 'end': end, 'interval': interval, 'limit': 1000}
+    return measure(lambda: client.get('/api/prices', query_string=query), repeat)
+
+
+def bench_export(export_format):
+    def bench(client, label, interval, days, repeat):
+        start, end = date_range(interval, days)
+        form = {'ticker': 'BENCH', 'start': start, 'end': end, 'interval': interval}
+        client.post('/', data=form)  # Sets the session's last query
+        return measure(lambda: client.get('/export', query_string={'format': export_format}).get_data(), repeat)
+    bench.__doc__ = f"/export?format={export_format}, including streaming the whole body"
+    return bench
+
+
+def bench_formatting(repeat):
+    """The format_* family per ticker, vs. the column-wise screener formatting"""
+    infos = [main.market_data().Ticker(f'FMT{i:03d}').info for i in range(FORMAT_TICKERS)]
+    formatters = [
+        main.format_price_metrics, main.format_valuation_metrics, main.format_financial_health,
+        main.format_profitability, main.format_growth_metrics, main.format_dividend_info,
+        main.format_trading_info, main.format_analyst_info, main.format_financial_highlights,
+    ]
+    results = {}
+    results[f'format_* x {FORMAT_TICKERS} tickers'] = measure(
+        lambda: [formatter(info) for info in infos for formatter in formatters], repeat
+    )
+    for i, info in enumerate(infos):
+        main.fundamentals_store.upsert(f'FMT{i:03d}', info)
+    frame = main.fundamentals_store.frame()
+    results[f'format_frame x {FORMAT_TICKERS} tickers'] = measure(lambda: main.format_frame(frame), repeat)
+    return results
+
+
+BENCHMARKS = {
+    'prices': bench_prices,
+    'render': bench_render,
+    'table': bench_table,
+}
+BENCHMARKS.update({f'export_{fmt}': bench_export(fmt) for fmt in EXPORT_FORMATS})
+
+
+def warm_up(client):
+    """Fill the price store and fundamentals cache for every case"""
+    for label, interval, days in CASES:
+        main.download_stock_data('BENCH', *date_range(interval, days), interval)
+    main.get_financial_ratios('BENCH')
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=5, help='Timed runs per case (after one warm-up run)')
+    parser.add_argument('--only', help=f"Comma-separated subset of: {', '.join(list(BENCHMARKS) + ['format'])}")
+    parser.add_argument('--json', help='Also write the results to this file')
+    args = parser.parse_args()
+
+    selected = args.only.split(',') if args.only else list(BENCHMARKS) + ['format']
+    client = main.app.test_client()
+    warm_up(client)
+
+    results = {}
+    print(f"{'benchmark':<16}{'case':<28}{'min ms':>10}{'median ms':>12}")
+    for name in selected:
+        if name == 'format':
+            for label, (best, median) in bench_formatting(args.repeat).items():
+                results[f'format/{label}'] = {'min_ms': best, 'median_ms': median}
+                print(f"{'format':<16}{label:<28}{best:>10.2f}{median:>12.2f}")
+            continue
+        bench = BENCHMARKS[name]
+        for label, interval, days in CASES:
+            best, median = bench(client, label, interval, days, args.repeat)
+            results[f'{name}/{label}'] = {'min_ms': best, 'median_ms': median}
+            print(f"{name:<16}{label:<28}{best:>10.2f}{median:>12.2f}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main_cli()
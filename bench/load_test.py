@@ -0,0 +1,181 @@
+"""Concurrent load test of the Flask app against the offline fake provider.
+
+    python bench/load_test.py --spawn [--workers 2 --threads 4] [--concurrency 16] [--duration 30]
+    python bench/load_test.py --url http://127.0.0.1:8000   # an already running server
+
+--spawn starts gunicorn with MARKET_DATA_PROVIDER=fake, rate limits off,
+background jobs only for ranges longer than any scenario's and a temporary
+DATA_DIR, so every visit takes the synchronous path. Reports throughput, p50/p90/p99 latency per endpoint and
+the peak RSS of every worker that answered (read from /proc, so only for a
+server on this machine).
+"""
+import argparse
+import json
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from datetime import date, timedelta
+from http.cookiejar import CookieJar
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+TICKERS = [f'SYN{i:03d}' for i in range(100)]
+# Intraday bars are only served for recent dates, so that range ends today
+RANGES = [('2024-01-01', '2024-12-31', '1d'), ('2015-01-01', '2024-12-31', '1d'),
+          ('2005-01-01', '2024-12-31', '1wk'),
+          ((date.today() - timedelta(days=7)).isoformat(), date.today().isoformat(), '5m')]
+
+
+def scenario(rng):
+    """One user visit: look a ticker up, then page the table, load the chart and export"""
+    ticker = rng.choice(TICKERS)
+    start, end, interval = rng.choice(RANGES)
+    query = {'ticker': ticker, 'start': start, 'end': end, 'interval': interval}
+    yield 'index', 'POST', '/', query
+    yield 'api_prices', 'GET', '/api/prices?' + urllib.parse.urlencode(dict(query, limit=100)), None
+    yield 'api_chart', 'GET', '/api/chart?' + urllib.parse.urlencode(query), None
+    if rng.random() < 0.3:
+        yield 'export', 'GET', '/export?format=' + rng.choice(['csv', 'xlsx', 'parquet']), None
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def spawn_server(workers, threads):
+    port = free_port()
+    env = dict(
+        os.environ, MARKET_DATA_PROVIDER='fake', RATELIMIT_ENABLED='0',
+        DATA_DIR=tempfile.mkdtemp(prefix='stockdownloader-load-'),
+        WEB_CONCURRENCY=str(workers), GUNICORN_THREADS=str(threads),
+        UPSTREAM_RATE='100000', UPSTREAM_BURST='100000',
+        JOB_RANGE_DAYS='100000', JOB_INTRADAY_DAYS='100000',
+        SECRET_KEY='load-test',  # Every worker must accept the others' session cookies
+    )
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '--config', 'gunicorn.conf.py', '--bind', f'127.0.0.1:{port}',
+         '--log-level', 'warning', 'main:app'],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    url = f'http://127.0.0.1:{port}'
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        try:
+            urllib.request.urlopen(url + '/robots.txt', timeout=1).read()
+            return process, url
+        except (urllib.error.URLError, ConnectionError, OSError):
+            time.sleep(0.2)
+    process.kill()
+    raise SystemExit('gunicorn did not start within 60s')
+
+
+def peak_rss_kib(pid):
+    """VmHWM (peak resident set) of a local process, or None"""
+    try:
+        with open(f'/proc/{pid}/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1])
+    except OSError:
+        return None
+
+
+def run(url, concurrency, duration, seed):
+    results = []  # (endpoint, seconds, status)
+    lock = threading.Lock()
+    stop_at = time.monotonic() + duration
+
+    def user(index):
+        rng = random.Random(seed + index)
+        opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(CookieJar()))
+        while time.monotonic() < stop_at:
+            for endpoint, method, path, form in scenario(rng):
+                data = urllib.parse.urlencode(form).encode() if form else None
+                started = time.perf_counter()
+                try:
+                    with opener.open(urllib.request.Request(url + path, data=data, method=method), timeout=120) as r:
+                        r.read()
+                        status = r.status
+                except urllib.error.HTTPError as e:
+                    status = e.code
+                except (urllib.error.URLError, OSError):
+                    status = 0
+                with lock:
+                    results.append((endpoint, time.perf_counter() - started, status))
+
+    threads = [threading.Thread(target=user, args=(i,), daemon=True) for i in range(concurrency)]
+    started = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results, time.monotonic() - started
+
+
+def percentile(values, q):
+    return statistics.quantiles(values, n=100, method='inclusive')[q - 1] if len(values) > 1 else values[0]
+
+
+def report(results, elapsed, url):
+    print(f"\n{len(results)} requests in {elapsed:.1f}s: {len(results) / elapsed:.1f} req/s")
+    print(f"{'endpoint':<14}{'count':>8}{'errors':>8}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}")
+    endpoints = sorted({endpoint for endpoint, _, _ in results}) + ['all']
+    for endpoint in endpoints:
+        rows = [r for r in results if endpoint in ('all', r[0])]
+        latencies = [seconds * 1000 for _, seconds, _ in rows]
+        errors = sum(1 for _, _, status in rows if status == 0 or status >= 400)
+        print(f"{endpoint:<14}{len(rows):>8}{errors:>8}"
+              f"{percentile(latencies, 50):>10.1f}{percentile(latencies, 90):>10.1f}{percentile(latencies, 99):>10.1f}")
+
+    # Each worker reports its pid at /stats; sample enough times to reach them all
+    pids = set()
+    for _ in range(50):
+        try:
+            with urllib.request.urlopen(url + '/stats', timeout=5) as r:
+                pids.add(json.loads(r.read())['pid'])
+        except (urllib.error.URLError, OSError, ValueError, KeyError):
+            break
+    print('\npeak RSS per worker:')
+    for pid in sorted(pids):
+        rss = peak_rss_kib(pid)
+        print(f"  pid {pid}: {f'{rss / 1024:.1f} MiB' if rss else 'n/a (not a local process)'}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument('--url', help='Base URL of a running server')
+    target.add_argument('--spawn', action='store_true', help='Start gunicorn with the fake provider')
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--concurrency', type=int, default=16, help='Simulated concurrent users')
+    parser.add_argument('--duration', type=float, default=30, help='Seconds to run')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    process = None
+    url = args.url
+    if args.spawn:
+        process, url = spawn_server(args.workers, args.threads)
+    try:
+        results, elapsed = run(url.rstrip('/'), args.concurrency, args.duration, args.seed)
+        report(results, elapsed, url.rstrip('/'))
+    finally:
+        if process:
+            process.terminate()
+            process.wait(10)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,120 @@
+import base64
+
+import numpy as np
+import pandas as pd
+
+# Overlays the chart endpoint can compute, keyed by the name clients request
+INDICATORS = ('sma50', 'sma200', 'ema20', 'rsi14', 'bb20')
+
+
+def lttb_indices(x, y, threshold):
+    """Largest-Triangle-Three-Buckets: pick `threshold` points that keep the series' shape.
+
+    Each bucket is scored with one vectorized NumPy expression; only the
+    bucket loop itself runs in Python (threshold iterations, not n).
+    """
+    n = len(y)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    indices = np.empty(threshold, dtype=np.int64)
+    indices[0], indices[-1] = 0, n - 1
+    a = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+        next_end = edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = x[end:next_end].mean()
+        avg_y = y[end:next_end].mean()
+        area = np.abs(
+            (x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a])
+        )
+        a = start + int(np.argmax(area))
+        indices[i + 1] = a
+    return indices
+
+
+def minmax_indices(y, threshold):
+    """Keep the min and max of each bucket (plus both ends), fully vectorized"""
+    n = len(y)
+    if threshold >= n or threshold < 4:
+        return np.arange(n)
+    size = -(-n // ((threshold - 2) // 2))  # ceil(n / buckets), leaving room for both ends
+    buckets = -(-n // size)
+    padded = np.full(buckets * size, np.nan)
+    padded[:n] = y
+    grid = padded.reshape(buckets, size)
+    offsets = np.arange(buckets) * size
+    picks = np.concatenate([
+        [0, n - 1],
+        offsets + np.nanargmin(grid, axis=1),
+        offsets + np.nanargmax(grid, axis=1),
+    ])
+    return np.unique(picks)
+
+
+def compute_indicators(close, names=INDICATORS):
+    """Compute overlays over the whole close series with vectorized pandas operations"""
+    close = close.astype('float64')
+    result = {}
+    for name in names:
+        if name.startswith('sma'):
+            window = int(name[3:])
+            result[name] = close.rolling(window, min_periods=window).mean()
+        elif name.startswith('ema'):
+            result[name] = close.ewm(span=int(name[3:]), adjust=False).mean()
+        elif name.startswith('rsi'):
+            window = int(name[3:])
+            delta = close.diff()
+            # Wilder's smoothing is an EMA with alpha = 1 / window
+            gain = delta.clip(lower=0).ewm(alpha=1 / window, adjust=False, min_periods=window).mean()
+            loss = (-delta.clip(upper=0)).ewm(alpha=1 / window, adjust=False, min_periods=window).mean()
+            result[name] = 100 - 100 / (1 + gain / loss)
+        elif name.startswith('bb'):
+            window = int(name[2:])
+            mid = close.rolling(window, min_periods=window).mean()
+            std = close.rolling(window, min_periods=window).std(ddof=0)
+            result[f'{name}_mid'] = mid
+            result[f'{name}_upper'] = mid + 2 * std
+            result[f'{name}_lower'] = mid - 2 * std
+    return result
+
+
+def encode_array(values, dtype='float32'):
+    """Encode a 1-D array as little-endian base64 for a JS typed array"""
+    array = np.ascontiguousarray(np.asarray(values, dtype=np.dtype(dtype).newbyteorder('<')))
+    return {'dtype': dtype, 'data': base64.b64encode(array.tobytes()).decode('ascii')}
+
+
+def build_chart_payload(data, points=1000, method='lttb', indicators=INDICATORS):
+    """Decimate a price frame to about `points` points and encode it column-wise.
+
+    Indicators are computed on the full series first and then sampled at the
+    same indices, so overlays stay exact at every point that is kept.
+    """
+    close = data['Close'].astype('float64')
+    epoch = pd.Timestamp(0, tz=data.index.tz)  # Intraday indexes are tz-aware; send UTC epoch ms
+    x = ((data.index - epoch) // pd.Timedelta(milliseconds=1)).to_numpy(dtype='float64')
+    y = close.ffill().bfill().to_numpy()
+
+    if method == 'minmax':
+        keep = minmax_indices(y, points)
+    else:
+        method = 'lttb'
+        keep = lttb_indices(x, y, points)
+
+    columns = {'t': encode_array(x[keep], 'float64')}
+    for col in ('Open', 'High', 'Low', 'Close'):
+        if col in data:
+            columns[col.lower()] = encode_array(data[col].to_numpy()[keep])
+    if 'Volume' in data:
+        columns['volume'] = encode_array(data['Volume'].to_numpy()[keep], 'float64')
+    for name, series in compute_indicators(close, indicators).items():
+        columns[name] = encode_array(series.to_numpy()[keep])
+
+    return {
+        'method': method,
+        'source_rows': len(data),
+        'points': int(len(keep)),
+        'encoding': 'base64-le',
+        'columns': columns,
+    }
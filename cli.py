@@ -0,0 +1,267 @@
+"""Bulk-export price history (and optionally fundamentals) for a list of tickers.
+
+    python cli.py -f universe.txt --start 2015-01-01 --out exports/ [--format parquet|csv|xlsx]
+    python cli.py AAPL MSFT NVDA --start 2024-01-01 --provider fake --out /tmp/exports
+
+Runs the same download_stock_data / get_financial_ratios code as the web
+app, without the HTTP rate limits, on a pool of --workers threads. Every
+upstream call goes through the app's shared outbound budget (UPSTREAM_* or
+--rate/--burst); point DATA_DIR at the web app's data directory to share
+its store and budget. Finished tickers are appended to <out>/manifest.jsonl,
+so a rerun after a crash skips them and retries only failures, partial
+exports (windows the upstream could not serve) and the rest.
+"""
+import argparse
+import hashlib
+import json
+import logging
+import os
+import re
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import date
+
+OUTPUT_FORMATS = ['parquet', 'csv', 'xlsx']
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('tickers', nargs='*', help='Ticker symbols (or use --file)')
+    parser.add_argument('-f', '--file', help='File with tickers, separated by newlines, commas or spaces')
+    parser.add_argument('--start', required=True, help='First date, YYYY-MM-DD')
+    parser.add_argument('--end', default=date.today().isoformat(), help='End date (exclusive), default today')
+    parser.add_argument('--interval', default='1d')
+    parser.add_argument('--format', choices=OUTPUT_FORMATS, default='parquet')
+    parser.add_argument('--out', required=True, help='Output directory (also holds the manifest)')
+    parser.add_argument('--fundamentals', action='store_true', help='Also export fundamentals to one table')
+    parser.add_argument('--workers', type=int, default=4, help='Tickers exported concurrently')
+    parser.add_argument('--rate', type=float, help='Upstream calls per second (default: UPSTREAM_RATE)')
+    parser.add_argument('--burst', type=int, help='Upstream burst size (default: UPSTREAM_BURST)')
+    parser.add_argument('--timeout', type=float, default=30, help='Seconds per upstream call')
+    parser.add_argument('--provider', choices=['yahoo', 'fake'], help='Market data provider (default: yahoo)')
+    parser.add_argument('--data-dir', help='Store and budget directory (default: DATA_DIR)')
+    parser.add_argument('--progress-every', type=float, default=5, help='Seconds between progress lines')
+    parser.add_argument('-v', '--verbose', action='store_true', help='Show the app log')
+    args = parser.parse_args(argv)
+    if not args.tickers and not args.file:
+        parser.error('give tickers or --file')
+    return args
+
+
+def read_tickers(args):
+    """Unique upper-case tickers from the arguments and --file, in order"""
+    raw = ' '.join(args.tickers)
+    if args.file:
+        with open(args.file) as f:
+            raw += ' ' + f.read()
+    tickers = []
+    for token in re.split(r'[\s,;]+', raw.upper()):
+        if token and token not in tickers:
+            tickers.append(token)
+    return tickers
+
+
+def file_name(ticker):
+    """A filesystem-safe name for a ticker (e.g. BRK/B, ^GSPC).
+
+    A name that had to be changed gets a short hash of the raw ticker, so
+    BRK/B and BRK_B do not overwrite each other.
+    """
+    name = re.sub(r'[^A-Za-z0-9._^=-]', '_', ticker)
+    if name != ticker:
+        name += '-' + hashlib.sha1(ticker.encode('utf-8')).hexdigest()[:8]
+    return name
+
+
+class Manifest:
+    """Append-only JSON-lines record of finished tickers.
+
+    Each line is one ticker's outcome for one export key (range, interval,
+    format); the last line per key wins. Status is done, partial (written,
+    but some windows are missing) or failed; only done entries are skipped. Lines are flushed and fsynced as
+    they are written, so a crash loses at most the ticker in progress.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.entries = {}
+        self._lock = threading.Lock()
+        if os.path.exists(path):
+            with open(path) as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue  # A line cut short by a crash
+                    self.entries[entry['key']] = entry
+
+    def done(self, key, fundamentals=False):
+        """True if the key was exported (with fundamentals, if they are wanted) and its file still exists"""
+        entry = self.entries.get(key)
+        if entry is None or entry['status'] != 'done' or not os.path.exists(entry['path']):
+            return False
+        # An export from a run without --fundamentals is redone: prices come from the local store
+        return not fundamentals or 'fundamentals' in entry
+
+    def record(self, entry):
+        with self._lock:
+            self.entries[entry['key']] = entry
+            with open(self.path, 'a') as f:
+                f.write(json.dumps(entry) + '\n')
+                f.flush()
+                os.fsync(f.fileno())
+
+
+class Progress:
+    """Thread-safe counters for the progress lines and the final summary"""
+
+    def __init__(self, total, skipped):
+        self.total = total
+        self.skipped = skipped
+        self.done = 0
+        self.partial = 0
+        self.failed = 0
+        self.rows = 0
+        self.bytes = 0
+        self.started = time.perf_counter()
+        self._lock = threading.Lock()
+
+    def add(self, entry):
+        with self._lock:
+            if entry['status'] == 'failed':
+                self.failed += 1
+                return
+            if entry['status'] == 'done':
+                self.done += 1
+            else:
+                self.partial += 1
+            self.rows += entry['rows']
+            self.bytes += entry['bytes']
+
+    def line(self):
+        elapsed = time.perf_counter() - self.started
+        finished = self.done + self.partial + self.failed
+        rate = finished / elapsed if elapsed else 0
+        remaining = self.total - self.skipped - finished
+        eta = f'{remaining / rate:.0f}s' if rate else '?'
+        return (f"[{finished + self.skipped}/{self.total}] done {self.done} partial {self.partial} failed {self.failed} "
+                f"skipped {self.skipped} | {rate:.2f} tickers/s {self.rows / elapsed if elapsed else 0:,.0f} rows/s "
+                f"{self.bytes / 1024 ** 2:.1f} MiB | {elapsed:.0f}s elapsed, eta {eta}")
+
+
+def export_ticker(app, ticker, key, args):
+    """Download, write and describe one ticker; failures are returned, not raised"""
+    started = time.perf_counter()
+    entry = {'key': key, 'ticker': ticker, 'status': 'failed', 'rows': 0, 'bytes': 0, 'path': None}
+    try:
+        # A bulk export waits for the shared upstream budget instead of failing when it runs dry
+        with app.upstream.patience(app.UPSTREAM_BATCH_MAX_WAIT):
+            data = app.download_stock_data(ticker, args.start, args.end, args.interval, timeout=args.timeout)
+        if data is None or data.empty:
+            raise ValueError('no price data')
+        path = os.path.join(args.out, f'{file_name(ticker)}.{args.format}')
+        tmp = f'{path}.tmp'
+        # Write to a temporary name first so a crash never leaves a half file that looks finished
+        if args.format == 'parquet':
+            app.write_parquet(tmp, data, compression=app.PARQUET_COMPRESSION)
+        elif args.format == 'xlsx':
+            app.write_excel(tmp, [('Price Data', data)])
+        else:
+            with open(tmp, 'wb') as f:
+                for chunk in app.iter_csv_chunks(data):
+                    f.write(chunk)
+        os.replace(tmp, path)
+        # Windows the upstream could not serve are retried by the next run
+        missing = data.attrs.get('missing_windows') or []
+        entry.update(status='partial' if missing else 'done', rows=len(data), bytes=os.path.getsize(path), path=path,
+                     interval=data.attrs.get('interval', args.interval),
+                     first=data.index[0].strftime('%Y-%m-%d'), last=data.index[-1].strftime('%Y-%m-%d'))
+        if missing:
+            entry['missing_windows'] = [list(window) for window in missing]
+            entry['error'] = 'missing ' + ', '.join(f'{start} to {end}' for start, end in missing)
+        if args.fundamentals:
+            with app.upstream.patience(app.UPSTREAM_BATCH_MAX_WAIT):
+                ratios = app.get_financial_ratios(ticker) or {}
+            entry['fundamentals'] = {
+                f'{category}: {name}': value
+                for category, values in ratios.items() if isinstance(values, dict)
+                for name, value in values.items()
+            }
+    except Exception as e:
+        entry['error'] = str(e)
+    entry['seconds'] = round(time.perf_counter() - started, 3)
+    return entry
+
+
+def write_fundamentals(app, manifest, keys, args):
+    """One row per exported ticker, from the fundamentals kept in the manifest"""
+    import pandas as pd
+    rows = {
+        manifest.entries[key]['ticker']: manifest.entries[key]['fundamentals']
+        for key in keys if manifest.entries.get(key, {}).get('fundamentals')
+    }
+    if not rows:
+        return None
+    table = pd.DataFrame.from_dict(rows, orient='index')
+    table.index.name = 'Ticker'
+    path = os.path.join(args.out, f'fundamentals.{args.format}')
+    if args.format == 'parquet':
+        table.astype('string').to_parquet(path)
+    elif args.format == 'xlsx':
+        app.write_excel(path, [('Fundamentals', table)])
+    else:
+        table.to_csv(path)
+    return path
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    tickers = read_tickers(args)
+    os.makedirs(args.out, exist_ok=True)
+
+    # The app reads its configuration at import time
+    if args.provider:
+        os.environ['MARKET_DATA_PROVIDER'] = args.provider
+    if args.data_dir:
+        os.environ['DATA_DIR'] = args.data_dir
+    if args.rate is not None:
+        os.environ['UPSTREAM_RATE'] = str(args.rate)
+    if args.burst is not None:
+        os.environ['UPSTREAM_BURST'] = str(args.burst)
+    import main as app
+    if not args.verbose:
+        logging.getLogger().setLevel(logging.ERROR)
+
+    manifest = Manifest(os.path.join(args.out, 'manifest.jsonl'))
+    keys = {ticker: f'{ticker}|{args.start}|{args.end}|{args.interval}|{args.format}' for ticker in tickers}
+    pending = [ticker for ticker in tickers if not manifest.done(keys[ticker], args.fundamentals)]
+    progress = Progress(len(tickers), len(tickers) - len(pending))
+    print(f"Exporting {len(pending)} of {len(tickers)} tickers ({progress.skipped} already done) "
+          f"as {args.format} to {args.out} with {args.workers} workers", flush=True)
+
+    last_line = time.monotonic()
+    with ThreadPoolExecutor(max_workers=max(1, args.workers)) as pool:
+        futures = {pool.submit(export_ticker, app, ticker, keys[ticker], args): ticker for ticker in pending}
+        for future in as_completed(futures):
+            entry = future.result()
+            manifest.record(entry)
+            progress.add(entry)
+            if entry['status'] != 'done':
+                print(f"  {entry['ticker']}: {entry.get('error')}", flush=True)
+            if time.monotonic() - last_line >= args.progress_every:
+                print(progress.line(), flush=True)
+                last_line = time.monotonic()
+    print(progress.line(), flush=True)
+
+    if args.fundamentals:
+        path = write_fundamentals(app, manifest, keys.values(), args)
+        if path:
+            print(f"Fundamentals written to {path}", flush=True)
+    print(f"Upstream budget: {json.dumps(app.upstream.state())}", flush=True)
+    return 1 if progress.failed or progress.partial else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,41 @@
+import os
+import sqlite3
+import threading
+
+
+class SQLiteDB:
+    """Per-thread SQLite connections to one database file shared by all workers.
+
+    sqlite3 connections must not be shared between threads, and every gunicorn
+    worker opens its own, so WAL mode is used to let readers and a writer work
+    concurrently across processes.
+    """
+
+    def __init__(self, path, schema=None):
+        self.path = path
+        self._local = threading.local()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        if schema:
+            with self.connect() as conn:
+                conn.executescript(schema)
+        # A connection must not cross a fork (gunicorn --preload imports the app in the master)
+        os.register_at_fork(before=self.close)
+
+    def connect(self):
+        """Return this thread's connection, opening it on first use"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def close(self):
+        """Close this thread's connection; the next connect() opens a new one"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            self._local.conn = None
+            conn.close()
@@ -0,0 +1,147 @@
+import os
+import tempfile
+import logging
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 64 * 1024  # Bytes per chunk streamed to the client
+ROW_CHUNK = 5000  # Rows converted to Python objects at a time when writing
+
+
+def flatten_columns(data):
+    """Flatten MultiIndex columns ('Close', 'AAPL') -> 'Close_AAPL' without copying the data"""
+    if isinstance(data.columns, pd.MultiIndex):
+        data = data.set_axis(
+            ['_'.join([str(i) for i in col if i]) for col in data.columns.values], axis=1
+        )
+    return data
+
+
+def column_widths(frame, float_decimals=2):
+    """Estimate display widths for index + columns in one pass per column.
+
+    Numeric columns are sized from their min/max instead of stringifying every
+    cell; only object columns need string lengths.
+    """
+    columns = [frame.index] + [frame[col] for col in frame.columns]
+    names = [frame.index.name or 'index'] + list(frame.columns)
+    widths = []
+    for name, values in zip(names, columns):
+        values = pd.Series(values)
+        if values.empty:
+            width = 0
+        elif pd.api.types.is_datetime64_any_dtype(values):
+            width = 19 if (values.dt.normalize() != values).any() else 10
+        elif pd.api.types.is_numeric_dtype(values):
+            decimals = float_decimals if pd.api.types.is_float_dtype(values) else 0
+            extremes = [values.min(), values.max()]
+            width = max(len(f"{v:.{decimals}f}") for v in extremes if pd.notna(v)) if values.notna().any() else 0
+        else:
+            width = int(values.astype(str).str.len().max())
+        widths.append(max(width, len(str(name))) + 2)
+    return widths
+
+
+def _excel_rows(frame, float_decimals):
+    """Yield rows as tuples of plain Python values, converting ROW_CHUNK rows at a time"""
+    index = frame.index
+    if isinstance(index, pd.DatetimeIndex) and index.tz is not None:
+        index = index.tz_localize(None)  # Excel has no timezone support
+    float_cols = frame.columns[[pd.api.types.is_float_dtype(t) for t in frame.dtypes]]
+    for start in range(0, len(frame), ROW_CHUNK):
+        chunk = frame.iloc[start:start + ROW_CHUNK]
+        if len(float_cols):
+            # Round in float64 so float32 values do not come out as 190.1199951171875
+            chunk = chunk.astype({col: 'float64' for col in float_cols}).round(float_decimals)
+        chunk_index = index[start:start + ROW_CHUNK]
+        chunk = chunk.astype(object).where(chunk.notna(), None)
+        for idx, row in zip(chunk_index, chunk.itertuples(index=False, name=None)):
+            yield (idx.to_pydatetime() if isinstance(idx, pd.Timestamp) else idx,) + row
+
+
+def write_excel(path, sheets, float_decimals=2):
+    """Write (sheet_name, DataFrame) pairs to an .xlsx file in write-only mode.
+
+    openpyxl's write-only workbook streams rows to disk instead of keeping a
+    cell object per value, so memory stays flat regardless of row count.
+    """
+    # Imported on first use: openpyxl is slow to import and most requests never write Excel
+    from openpyxl import Workbook
+    from openpyxl.utils import get_column_letter
+
+    workbook = Workbook(write_only=True)
+    for sheet_name, frame in sheets:
+        frame = flatten_columns(frame)
+        worksheet = workbook.create_sheet(sheet_name)
+        # Column dimensions must be set before the first row in write-only mode
+        for i, width in enumerate(column_widths(frame, float_decimals), start=1):
+            worksheet.column_dimensions[get_column_letter(i)].width = width
+        worksheet.append([frame.index.name or 'index'] + [str(col) for col in frame.columns])
+        for row in _excel_rows(frame, float_decimals):
+            worksheet.append(row)
+    workbook.save(path)
+
+
+def iter_csv_chunks(frame, rows_per_chunk=ROW_CHUNK, on_complete=None):
+    """Yield a DataFrame as UTF-8 CSV, one encoded chunk of rows at a time.
+
+    Only one chunk of text exists at a time, so memory does not grow with the
+    number of rows. float32 columns are written with their shortest repr.
+    on_complete(total_bytes) is called once the last chunk has been produced.
+    """
+    frame = flatten_columns(frame)
+    total = 0
+    for start in range(0, max(len(frame), 1), rows_per_chunk):
+        chunk = frame.iloc[start:start + rows_per_chunk].to_csv(header=start == 0).encode('utf-8')
+        total += len(chunk)
+        yield chunk
+    if on_complete is not None:
+        on_complete(total)
+
+
+def _arrow_table(frame):
+    """Convert to an Arrow table, keeping float32/int dtypes (numeric columns are not copied)"""
+    import pyarrow as pa  # Optional dependency, only needed for Parquet/Arrow exports
+    return pa.Table.from_pandas(flatten_columns(frame), preserve_index=True)
+
+
+def write_parquet(path, frame, compression='zstd'):
+    """Write a DataFrame to a compressed Parquet file"""
+    import pyarrow.parquet as pq
+    pq.write_table(_arrow_table(frame), path, compression=compression)
+
+
+def write_arrow(path, frame, compression=None):
+    """Write a DataFrame to an Arrow IPC (Feather v2) file.
+
+    Uncompressed by default so readers can memory-map it without decoding.
+    """
+    import pyarrow.feather as feather
+    feather.write_feather(_arrow_table(frame), path, compression=compression or 'uncompressed')
+
+
+def temp_path(suffix):
+    """Create an empty temporary file for an export and return its path"""
+    fd, path = tempfile.mkstemp(suffix=suffix, prefix='export_')
+    os.close(fd)
+    return path
+
+
+def iter_file_chunks(path, chunk_size=CHUNK_SIZE):
+    """Yield a file in fixed-size chunks"""
+    with open(path, 'rb') as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+
+
+def remove_file(path):
+    """Delete a finished export file, logging instead of raising"""
+    try:
+        os.remove(path)
+    except OSError as e:
+        logger.warning(f"Could not remove export file {path}: {e}")
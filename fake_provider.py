@@ -0,0 +1,208 @@
+# Offline stand-in for the parts of yfinance the app uses (download and
+# Ticker), selected with MARKET_DATA_PROVIDER=fake. Prices are a deterministic
+# function of (ticker, timestamp), so overlapping range requests agree and
+# benchmark runs are reproducible. Payload size and latency are configurable:
+#
+#   FAKE_LATENCY       seconds slept per upstream call (default 0)
+#   FAKE_JITTER        extra random latency, 0..FAKE_JITTER seconds (default 0)
+#   FAKE_INFO_PADDING  extra filler fields added to every info dict (default 0)
+#
+# Symbols containing "INVALID" return no data, like an unknown ticker, and
+# symbols containing "OFFLINE" fail like a dropped connection. Both are logged
+# on the 'yfinance' logger the way yf.download reports per-symbol failures.
+import logging
+import os
+import random
+import time
+import zlib
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger('yfinance')
+
+INTRADAY_FREQ = {
+    '1m': '1min', '2m': '2min', '5m': '5min', '15m': '15min', '30m': '30min',
+    '60m': '60min', '90m': '90min', '1h': '60min',
+}
+COARSE_FREQ = {'1d': 'B', '5d': '5B', '1wk': 'W-MON', '1mo': 'MS', '3mo': 'QS'}
+
+
+def _latency():
+    delay = float(os.environ.get('FAKE_LATENCY', 0)) + random.uniform(0, float(os.environ.get('FAKE_JITTER', 0)))
+    if delay > 0:
+        time.sleep(delay)
+
+
+def _seed(ticker):
+    return zlib.crc32(ticker.encode('utf-8'))
+
+
+def _noise(ts, seed):
+    """Deterministic uniform noise in [-0.5, 0.5) per (timestamp, seed), vectorized"""
+    mixed = (ts * 2654435761 + seed * 40503) % 4294967296
+    mixed = (mixed ^ (mixed >> 13)) * 1274126177 % 4294967296
+    return mixed / 4294967296 - 0.5
+
+
+def _index(start, end, interval):
+    """Bar timestamps Yahoo would return for [start, end)"""
+    start, end = pd.Timestamp(start), pd.Timestamp(end)
+    if interval in INTRADAY_FREQ:
+        days = pd.bdate_range(start, end - pd.Timedelta(days=1))
+        bars = pd.timedelta_range('9h30min', '15h59min', freq=INTRADAY_FREQ[interval])
+        stamps = (days.values[:, None] + bars.values[None, :]).ravel()
+        return pd.DatetimeIndex(stamps, name='Datetime').tz_localize('America/New_York')
+    index = pd.date_range(start, end - pd.Timedelta(days=1), freq=COARSE_FREQ.get(interval, 'B'))
+    return index.rename('Date')
+
+
+def _ohlcv(ticker, index):
+    seed = _seed(ticker)
+    ts = ((index.tz_localize(None) if index.tz else index) - pd.Timestamp(0)) // pd.Timedelta(seconds=1)
+    ts = np.asarray(ts, dtype=np.int64)
+    days = ts / 86400
+    base = 20 + seed % 480
+    # Slow cycles plus per-bar noise: smooth enough to look like a price series
+    log_price = (
+        0.35 * np.sin(days / (180 + seed % 200) + seed % 7)
+        + 0.15 * np.sin(days / (23 + seed % 17))
+        + 0.02 * _noise(ts, seed)
+    )
+    close = base * np.exp(log_price)
+    open_ = close * (1 + 0.01 * _noise(ts, seed + 1))
+    high = np.maximum(open_, close) * (1 + 0.01 * np.abs(_noise(ts, seed + 2)))
+    low = np.minimum(open_, close) * (1 - 0.01 * np.abs(_noise(ts, seed + 3)))
+    volume = (1_000_000 + (seed % 50) * 100_000) * (1 + _noise(ts, seed + 4))
+    return {'Close': close, 'High': high, 'Low': low, 'Open': open_, 'Volume': volume.astype(np.int64)}
+
+
+def download(tickers, start=None, end=None, interval='1d', progress=False, threads=True, timeout=10, **kwargs):
+    """yf.download-shaped frame: (Price, Ticker) MultiIndex columns, auto-adjusted"""
+    _latency()
+    symbols = tickers.split() if isinstance(tickers, str) else list(tickers)
+    errors = {}
+    for symbol in symbols:
+        if 'INVALID' in symbol.upper():
+            errors[symbol] = "YFTzMissingError('possibly delisted; no timezone found')"
+        elif 'OFFLINE' in symbol.upper():
+            errors[symbol] = "ConnectionError('Connection aborted.', RemoteDisconnected('Remote end closed connection'))"
+    if errors:
+        logger.error('\n%.f Failed download%s:' % (len(errors), 's' if len(errors) > 1 else ''))
+        for symbol, error in errors.items():
+            logger.error(f'{[symbol]}: {error}')
+    symbols = [symbol for symbol in symbols if symbol not in errors]
+    index = _index(start, end or pd.Timestamp.today().normalize(), interval)
+    columns = pd.MultiIndex.from_product([['Close', 'High', 'Low', 'Open', 'Volume'], symbols],
+                                         names=['Price', 'Ticker'])
+    if not symbols or index.empty:
+        return pd.DataFrame(columns=columns)
+    series = {symbol: _ohlcv(symbol, index) for symbol in symbols}
+    data = {(price, symbol): series[symbol][price] for price, symbol in columns}
+    return pd.DataFrame(data, index=index, columns=columns)
+
+
+class Ticker:
+    """yf.Ticker stand-in with synthetic info and financial statements"""
+
+    def __init__(self, ticker):
+        self.ticker = ticker.upper()
+
+    @property
+    def info(self):
+        _latency()
+        if 'INVALID' in self.ticker:
+            return {}
+        r = random.Random(_seed(self.ticker))  # Same info on every call
+        price = round(r.uniform(5, 500), 2)
+        shares = r.randint(50_000_000, 15_000_000_000)
+        revenue = shares * price * r.uniform(0.1, 3)
+        info = {
+            'longName': f'{self.ticker} Holdings Inc.',
+            'sector': r.choice(['Technology', 'Healthcare', 'Energy', 'Financial Services', 'Industrials']),
+            'industry': 'Synthetic Data',
+            'country': 'United States',
+            'exchange': 'NMS',
+            'currency': 'USD',
+            'website': f'https://{self.ticker.lower()}.example.com',
+            'currentPrice': price,
+            'fiftyTwoWeekHigh': round(price * r.uniform(1, 1.5), 2),
+            'fiftyTwoWeekLow': round(price * r.uniform(0.5, 1), 2),
+            'fiftyDayAverage': round(price * r.uniform(0.9, 1.1), 2),
+            'twoHundredDayAverage': round(price * r.uniform(0.8, 1.2), 2),
+            'beta': round(r.uniform(0.3, 2), 2),
+            'marketCap': int(shares * price),
+            'enterpriseValue': int(shares * price * r.uniform(0.9, 1.3)),
+            'trailingPE': round(r.uniform(5, 60), 2),
+            'forwardPE': round(r.uniform(5, 50), 2),
+            'pegRatio': round(r.uniform(0.5, 3), 2),
+            'priceToSalesTrailing12Months': round(r.uniform(0.5, 20), 2),
+            'priceToBook': round(r.uniform(0.5, 30), 2),
+            'enterpriseToEbitda': round(r.uniform(3, 40), 2),
+            'enterpriseToRevenue': round(r.uniform(0.5, 20), 2),
+            'totalCash': int(revenue * r.uniform(0.05, 0.5)),
+            'totalDebt': int(revenue * r.uniform(0, 1)),
+            'debtToEquity': round(r.uniform(0, 250), 2),
+            'currentRatio': round(r.uniform(0.5, 4), 2),
+            'quickRatio': round(r.uniform(0.3, 3), 2),
+            'profitMargins': round(r.uniform(-0.1, 0.4), 4),
+            'operatingMargins': round(r.uniform(-0.05, 0.45), 4),
+            'grossMargins': round(r.uniform(0.2, 0.8), 4),
+            'ebitdaMargins': round(r.uniform(0, 0.5), 4),
+            'returnOnAssets': round(r.uniform(-0.05, 0.25), 4),
+            'returnOnEquity': round(r.uniform(-0.1, 0.6), 4),
+            'revenueGrowth': round(r.uniform(-0.2, 0.5), 4),
+            'earningsGrowth': round(r.uniform(-0.3, 0.8), 4),
+            'earningsQuarterlyGrowth': round(r.uniform(-0.3, 0.8), 4),
+            'totalRevenue': int(revenue),
+            'ebitda': int(revenue * r.uniform(0.05, 0.4)),
+            'freeCashflow': int(revenue * r.uniform(-0.05, 0.3)),
+            'operatingCashflow': int(revenue * r.uniform(0, 0.35)),
+            'netIncomeToCommon': int(revenue * r.uniform(-0.05, 0.25)),
+            'trailingEps': round(r.uniform(-2, 20), 2),
+            'dividendYield': round(r.uniform(0, 0.05), 4),
+            'dividendRate': round(r.uniform(0, 5), 2),
+            'payoutRatio': round(r.uniform(0, 0.8), 4),
+            'exDividendDate': 1735689600,
+            'dividendDate': 1736899200,
+            'volume': r.randint(100_000, 100_000_000),
+            'averageVolume': r.randint(100_000, 100_000_000),
+            'sharesOutstanding': shares,
+            'floatShares': int(shares * r.uniform(0.6, 1)),
+            'shortRatio': round(r.uniform(0.5, 10), 2),
+            'shortPercentOfFloat': round(r.uniform(0, 0.2), 4),
+            'recommendationKey': r.choice(['buy', 'hold', 'sell', 'strong_buy']),
+            'targetMeanPrice': round(price * r.uniform(0.8, 1.4), 2),
+            'targetHighPrice': round(price * 1.5, 2),
+            'targetLowPrice': round(price * 0.7, 2),
+            'numberOfAnalystOpinions': r.randint(1, 50),
+            'lastFiscalYearEnd': 1727654400,
+            'mostRecentQuarter': 1735603200,
+        }
+        for i in range(int(os.environ.get('FAKE_INFO_PADDING', 0))):
+            info[f'padding{i}'] = r.random()
+        return info
+
+    def _statement(self, items):
+        _latency()
+        r = random.Random(_seed(self.ticker + items[0]))
+        periods = pd.to_datetime(['2024-09-30', '2023-09-30', '2022-09-30', '2021-09-30'])
+        values = np.array([[r.uniform(1e8, 1e11) for _ in periods] for _ in items])
+        return pd.DataFrame(values, index=items, columns=periods)
+
+    @property
+    def income_stmt(self):
+        return self._statement(['Total Revenue', 'Gross Profit', 'Operating Income', 'EBITDA', 'Net Income'])
+
+    @property
+    def balance_sheet(self):
+        return self._statement(['Total Assets', 'Total Liabilities Net Minority Interest', 'Stockholders Equity',
+                                'Cash And Cash Equivalents', 'Total Debt'])
+
+    @property
+    def cashflow(self):
+        return self._statement(['Operating Cash Flow', 'Capital Expenditure', 'Free Cash Flow'])
+
+    quarterly_income_stmt = income_stmt
+    quarterly_balance_sheet = balance_sheet
+    quarterly_cashflow = cashflow
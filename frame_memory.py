@@ -0,0 +1,76 @@
+import threading
+
+import numpy as np
+import pandas as pd
+
+# Bytes per stored bar once read (DatetimeIndex plus six 8-byte columns), before downcasting
+ROW_BYTES = 64
+
+UNSIGNED_TYPES = (np.uint8, np.uint16, np.uint32, np.uint64)
+SIGNED_TYPES = (np.int8, np.int16, np.int32, np.int64)
+
+
+class MemoryBudget:
+    """Bytes of DataFrames one request (or job) may hold.
+
+    Loaders charge() each frame they keep and consult remaining before
+    reading more, downsampling instead of materializing frames that would
+    not fit. Thread-safe, since a page's fetches run on a pool.
+    """
+
+    def __init__(self, limit):
+        self.limit = limit
+        self.used = 0
+        self._lock = threading.Lock()
+
+    @property
+    def remaining(self):
+        return max(self.limit - self.used, 0)
+
+    def rows_left(self, row_bytes=ROW_BYTES):
+        """How many more stored bars fit"""
+        return self.remaining // row_bytes
+
+    def charge(self, nbytes):
+        with self._lock:
+            self.used += nbytes
+
+
+def frame_bytes(data):
+    """Memory held by a frame's index and columns (numeric data, so no deep scan)"""
+    return int(data.memory_usage(index=True).sum())
+
+
+def smallest_int_type(values):
+    """The smallest integer dtype that holds every value of an integer array"""
+    if len(values) == 0:
+        return values.dtype
+    low, high = values.min(), values.max()
+    for dtype in UNSIGNED_TYPES if low >= 0 else SIGNED_TYPES:
+        info = np.iinfo(dtype)
+        if info.min <= low and high <= info.max:
+            return np.dtype(dtype)
+    return values.dtype
+
+
+def downcast(data, float_dtype='float32'):
+    """Downcast every column in one pass: floats to float_dtype, integers to the smallest safe type.
+
+    The frame is rebuilt once from the converted arrays instead of assigning
+    column by column, so there is a single copy per converted column and no
+    block consolidation in between. attrs are kept.
+    """
+    if data.empty:
+        return data
+    columns = {}
+    for name, values in data.items():
+        array = values.to_numpy()
+        if array.dtype.kind == 'f' and array.dtype != float_dtype:
+            array = array.astype(float_dtype)
+        elif array.dtype.kind in 'iu':
+            array = array.astype(smallest_int_type(array), copy=False)
+        columns[name] = array
+    result = pd.DataFrame(columns, index=data.index, copy=False)
+    result.columns = data.columns
+    result.attrs = dict(data.attrs)
+    return result
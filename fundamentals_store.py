@@ -0,0 +1,182 @@
+import logging
+import math
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from db import SQLiteDB
+
+logger = logging.getLogger(__name__)
+
+# Raw numeric `info` fields kept per ticker, with how they are displayed
+NUMERIC_FIELDS = {
+    'currentPrice': 'currency',
+    'fiftyTwoWeekHigh': 'currency',
+    'fiftyTwoWeekLow': 'currency',
+    'fiftyDayAverage': 'currency',
+    'twoHundredDayAverage': 'currency',
+    'beta': 'decimal',
+    'marketCap': 'currency',
+    'enterpriseValue': 'currency',
+    'trailingPE': 'decimal',
+    'forwardPE': 'decimal',
+    'pegRatio': 'decimal',
+    'priceToSalesTrailing12Months': 'decimal',
+    'priceToBook': 'decimal',
+    'enterpriseToEbitda': 'decimal',
+    'enterpriseToRevenue': 'decimal',
+    'totalCash': 'currency',
+    'totalDebt': 'currency',
+    'debtToEquity': 'decimal',
+    'currentRatio': 'decimal',
+    'quickRatio': 'decimal',
+    'profitMargins': 'percent',
+    'operatingMargins': 'percent',
+    'grossMargins': 'percent',
+    'ebitdaMargins': 'percent',
+    'returnOnAssets': 'percent',
+    'returnOnEquity': 'percent',
+    'revenueGrowth': 'percent',
+    'earningsGrowth': 'percent',
+    'earningsQuarterlyGrowth': 'percent',
+    'freeCashflow': 'currency',
+    'operatingCashflow': 'currency',
+    'totalRevenue': 'currency',
+    'ebitda': 'currency',
+    'netIncomeToCommon': 'currency',
+    'trailingEps': 'currency',
+    'dividendYield': 'percent',
+    'dividendRate': 'currency',
+    'payoutRatio': 'percent',
+    'volume': 'number',
+    'averageVolume': 'number',
+    'sharesOutstanding': 'number',
+    'shortRatio': 'decimal',
+    'targetMeanPrice': 'currency',
+    'numberOfAnalystOpinions': 'number',
+}
+
+TEXT_FIELDS = ['longName', 'sector', 'industry', 'country', 'exchange', 'currency', 'recommendationKey']
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS fundamentals (
+    ticker TEXT PRIMARY KEY,
+    fetched_at REAL NOT NULL,
+    {columns}
+);
+CREATE TABLE IF NOT EXISTS fundamentals_version (
+    id INTEGER PRIMARY KEY CHECK (id = 0),
+    version INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO fundamentals_version (id, version) VALUES (0, 0);
+""".format(columns=',\n    '.join(
+    [f'"{name}" TEXT' for name in TEXT_FIELDS] + [f'"{name}" REAL' for name in NUMERIC_FIELDS]
+))
+
+
+def _number(value):
+    """Finite int/float from an info value, else None (yfinance sends 'Infinity' strings and bools)"""
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return None
+    return float(value) if math.isfinite(value) else None
+
+
+class FundamentalsStore:
+    """Columnar snapshot of raw fundamentals: one row per ticker, one column per metric.
+
+    Every worker writes the latest `info` it fetched; a version counter bumps
+    on each write so readers rebuild their in-memory DataFrame only when the
+    table actually changed.
+    """
+
+    def __init__(self, path):
+        self.db = SQLiteDB(path, SCHEMA)
+        self._lock = threading.Lock()
+        self._frame = None
+        self._frame_version = None
+        self._add_missing_columns()
+
+    def _add_missing_columns(self):
+        # Tables created by an older field list gain the new columns in place
+        conn = self.db.connect()
+        existing = {row[1] for row in conn.execute('PRAGMA table_info(fundamentals)')}
+        with conn:
+            for name in TEXT_FIELDS + list(NUMERIC_FIELDS):
+                if name not in existing:
+                    kind = 'TEXT' if name in TEXT_FIELDS else 'REAL'
+                    conn.execute(f'ALTER TABLE fundamentals ADD COLUMN "{name}" {kind}')
+
+    def upsert(self, ticker, info, fetched_at=None):
+        """Store the numeric and descriptive fields of one ticker's info dict"""
+        if not info:
+            return
+        columns = ['ticker', 'fetched_at'] + TEXT_FIELDS + list(NUMERIC_FIELDS)
+        values = [ticker, fetched_at or time.time()]
+        values += [info.get(name) if isinstance(info.get(name), str) else None for name in TEXT_FIELDS]
+        values += [_number(info.get(name)) for name in NUMERIC_FIELDS]
+        quoted = ', '.join(f'"{name}"' for name in columns)
+        placeholders = ', '.join('?' * len(columns))
+        conn = self.db.connect()
+        with conn:
+            conn.execute(f'INSERT OR REPLACE INTO fundamentals ({quoted}) VALUES ({placeholders})', values)
+            conn.execute('UPDATE fundamentals_version SET version = version + 1 WHERE id = 0')
+
+    def version(self):
+        return self.db.connect().execute('SELECT version FROM fundamentals_version WHERE id = 0').fetchone()[0]
+
+    def fetched_at(self, ticker):
+        """When a ticker's fundamentals were last stored, or None"""
+        row = self.db.connect().execute('SELECT fetched_at FROM fundamentals WHERE ticker = ?', (ticker,)).fetchone()
+        return row[0] if row else None
+
+    def frame(self):
+        """The whole table as a DataFrame indexed by ticker, cached until the next write"""
+        version = self.version()
+        with self._lock:
+            if self._frame is None or self._frame_version != version:
+                frame = pd.read_sql_query('SELECT * FROM fundamentals', self.db.connect(), index_col='ticker')
+                numeric = list(NUMERIC_FIELDS)
+                frame[numeric] = frame[numeric].astype('float64')
+                self._frame, self._frame_version = frame, version
+            return self._frame
+
+    def __len__(self):
+        return self.db.connect().execute('SELECT COUNT(*) FROM fundamentals').fetchone()[0]
+
+
+def _format_currency(values, symbol='$'):
+    """Column-wise version of main.format_currency (B/M/K scaling)"""
+    magnitude = values.abs()
+    divisor = np.select(
+        [magnitude >= 1e9, magnitude >= 1e6, magnitude >= 1e3], [1e9, 1e6, 1e3], default=1.0
+    )
+    suffix = np.select(
+        [magnitude >= 1e9, magnitude >= 1e6, magnitude >= 1e3], ['B', 'M', 'K'], default=''
+    )
+    scaled = (values / divisor).map('{:.2f}'.format).astype(str)
+    return symbol + scaled + pd.Series(suffix, index=values.index)
+
+
+FORMATTERS = {
+    'currency': _format_currency,
+    'percent': lambda values: values.map('{:.2%}'.format),
+    'decimal': lambda values: values.map('{:.2f}'.format),
+    'number': lambda values: values.map('{:,.0f}'.format),
+}
+
+
+def format_frame(frame):
+    """Display strings for a fundamentals frame, one vectorized pass per column"""
+    display = pd.DataFrame(index=frame.index)
+    for column in frame.columns:
+        values = frame[column]
+        kind = NUMERIC_FIELDS.get(column)
+        if column == 'fetched_at':
+            display[column] = pd.to_datetime(values, unit='s').dt.strftime('%Y-%m-%d %H:%M')
+        elif kind is None:
+            display[column] = values.fillna('N/A')
+        else:
+            display[column] = FORMATTERS[kind](values).where(values.notna(), 'N/A')
+    return display
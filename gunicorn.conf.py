@@ -0,0 +1,33 @@
+import os
+
+# gthread workers keep answering job polls and page loads while background
+# jobs wait on the upstream; WEB_CONCURRENCY sets the number of workers
+worker_class = 'gthread'
+workers = int(os.environ.get('WEB_CONCURRENCY', 2))
+threads = int(os.environ.get('GUNICORN_THREADS', 4))
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 60))
+
+# Import the app once in the master and fork the workers from it: they share its memory
+# copy-on-write and start without importing anything. Code changes then need a restart
+# rather than a HUP; GUNICORN_PRELOAD=0 imports the app in every worker instead.
+preload_app = os.environ.get('GUNICORN_PRELOAD', '1') != '0'
+
+
+def on_starting(server):
+    """Drop the per-worker metrics snapshots of the previous run before workers start"""
+    from metrics import clear_snapshots
+    data_dir = os.environ.get('DATA_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data'))
+    clear_snapshots(os.path.join(data_dir, 'metrics'))
+
+
+def when_ready(server):
+    """With preload, also import the modules the app defers to first use, before workers fork"""
+    if server.cfg.preload_app:
+        import main
+        main.preload_modules()
+
+
+def post_worker_init(worker):
+    """Fetch WARMUP_TICKERS into the caches before the worker accepts requests"""
+    import main
+    main.warm_up(notify=worker.notify)
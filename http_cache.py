@@ -0,0 +1,122 @@
+import gzip
+import hashlib
+import json
+import os
+import zlib
+from datetime import datetime, timezone
+
+from flask import Response, make_response, request
+
+try:
+    import brotli  # Optional dependency; responses fall back to gzip without it
+except ImportError:
+    brotli = None
+
+# Text-like responses worth compressing; xlsx/parquet/arrow exports are compressed already
+COMPRESSIBLE_TYPES = ('text/', 'application/json', 'application/javascript', 'image/svg+xml')
+
+# Changes with every deploy on Render, so representations from older code never validate
+DEPLOY_ID = os.environ.get('RENDER_GIT_COMMIT', '')
+
+
+def make_etag(*parts):
+    """ETag for a representation built from JSON-serializable parts (query, data versions...)"""
+    return hashlib.sha1(json.dumps([DEPLOY_ID] + list(parts), default=str).encode()).hexdigest()
+
+
+def last_modified(*versions):
+    """The newest of some store versions (unix timestamps) as a datetime, or None"""
+    known = [version for version in versions if version is not None]
+    return datetime.fromtimestamp(max(known), timezone.utc) if known else None
+
+
+def with_validators(response, etag, modified=None, max_age=0):
+    """Add ETag, Last-Modified and Cache-Control to a response (or a view's return value)"""
+    response = make_response(response)
+    response.set_etag(etag)
+    if modified is not None:
+        response.last_modified = modified
+    # Queries may come from the session, so shared caches must not store these
+    response.cache_control.private = True
+    if max_age:
+        response.cache_control.max_age = max_age
+    else:
+        response.cache_control.no_cache = True  # Revalidate every time; a 304 is still cheap
+    response.vary.add('Cookie')
+    return response
+
+
+def not_modified(etag, modified=None, max_age=0):
+    """A 304 response if the client's validators are current, else None.
+
+    Called before the body is serialized, so a current client costs one
+    version lookup instead of a rebuilt table or export.
+    """
+    if request.if_none_match:
+        current = request.if_none_match.contains_weak(etag)
+    elif modified is not None and request.if_modified_since:
+        current = modified.replace(microsecond=0) <= request.if_modified_since
+    else:
+        current = False
+    return with_validators(Response(status=304), etag, modified, max_age) if current else None
+
+
+def _gzip_stream(chunks, level):
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)  # wbits=31: gzip container
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def _brotli_stream(chunks, quality):
+    compressor = brotli.Compressor(quality=quality)
+    for chunk in chunks:
+        data = compressor.process(chunk)
+        if data:
+            yield data
+    yield compressor.finish()
+
+
+def compress_response(response, min_size=1024, gzip_level=6, brotli_quality=5):
+    """Compress a text response with br or gzip if the client accepts it.
+
+    Buffered bodies smaller than min_size are left alone; streamed bodies
+    (e.g. CSV exports) are compressed chunk by chunk as they are sent. File
+    downloads (direct passthrough) and already compressed formats are skipped.
+    """
+    if (response.status_code < 200 or response.status_code in (204, 206, 304)
+            or response.direct_passthrough or 'Content-Encoding' in response.headers
+            or not (response.mimetype or '').startswith(COMPRESSIBLE_TYPES)):
+        return response
+    response.vary.add('Accept-Encoding')
+    accepted = request.accept_encodings
+    if brotli is not None and accepted['br']:
+        encoding = 'br'
+    elif accepted['gzip']:
+        encoding = 'gzip'
+    else:
+        return response
+
+    if response.is_streamed:
+        chunks = response.iter_encoded()
+        if encoding == 'br':
+            response.response = _brotli_stream(chunks, brotli_quality)
+        else:
+            response.response = _gzip_stream(chunks, gzip_level)
+        response.headers.pop('Content-Length', None)
+    else:
+        data = response.get_data()
+        if len(data) < min_size:
+            return response
+        if encoding == 'br':
+            response.set_data(brotli.compress(data, quality=brotli_quality))
+        else:
+            response.set_data(gzip.compress(data, compresslevel=gzip_level))
+    response.headers['Content-Encoding'] = encoding
+    # The compressed bytes are a different representation of the same data
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
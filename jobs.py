@@ -0,0 +1,224 @@
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from db import SQLiteDB
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    key TEXT NOT NULL,
+    params TEXT NOT NULL,
+    status TEXT NOT NULL,
+    result TEXT,
+    error TEXT,
+    owner_pid INTEGER,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    cancel_requested INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS jobs_key ON jobs (key, status);
+"""
+
+ACTIVE = ('queued', 'running')
+
+
+class JobCancelled(Exception):
+    """Raised inside a job handler when the job has been cancelled or timed out"""
+
+
+class Job:
+    """Handle passed to job handlers so long jobs can stop at checkpoints"""
+
+    def __init__(self, queue, job_id):
+        self.queue = queue
+        self.id = job_id
+        self.abandoned = threading.Event()
+
+    def check(self):
+        """Raise JobCancelled if the job was cancelled (from any worker) or timed out"""
+        if self.abandoned.is_set() or self.queue._cancel_requested(self.id):
+            raise JobCancelled(self.id)
+
+
+class JobQueue:
+    """Background job runner for slow upstream work.
+
+    Jobs run on a bounded thread pool inside the worker that accepted them,
+    while their status lives in SQLite so a status poll or cancellation can be
+    answered by any gunicorn worker. Identical active jobs are deduplicated.
+    Handlers are registered per kind as ``handler(params, job)`` and return a
+    JSON-serializable result; they should call ``job.check()`` between steps.
+    A kind whose results hold resources (files) registers ``discard(result)``,
+    which is called for a result nobody will pick up because the job was
+    cancelled or timed out before its handler returned.
+    """
+
+    POLL_INTERVAL = 0.5
+
+    def __init__(self, path, concurrency=2, timeout=120):
+        self.db = SQLiteDB(path, SCHEMA)
+        self.timeout = timeout
+        self.executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='job')
+        self.handlers = {}
+        self.discards = {}
+
+    def register(self, kind, handler, discard=None):
+        self.handlers[kind] = handler
+        if discard:
+            self.discards[kind] = discard
+
+    def submit(self, kind, params):
+        """Queue a job and return its id (or the id of an identical active job)"""
+        if kind not in self.handlers:
+            raise ValueError(f"Unknown job kind '{kind}'")
+        key = f"{kind}:{json.dumps(params, sort_keys=True)}"
+        conn = self.db.connect()
+        with conn:
+            row = conn.execute(
+                'SELECT id, created_at FROM jobs WHERE key = ? AND status IN (?, ?) '
+                'ORDER BY created_at DESC LIMIT 1', (key,) + ACTIVE
+            ).fetchone()
+            if row and time.time() - row[1] < self._expiry():
+                return row[0]
+            job_id = uuid.uuid4().hex
+            conn.execute(
+                'INSERT INTO jobs (id, kind, key, params, status, owner_pid, created_at) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (job_id, kind, key, json.dumps(params), 'queued', os.getpid(), time.time())
+            )
+        self.executor.submit(self._run, job_id, kind, params)
+        logger.info(f"Queued {kind} job {job_id}")
+        return job_id
+
+    def status(self, job_id):
+        """Return the job as a dict, or None if it does not exist"""
+        row = self.db.connect().execute(
+            'SELECT id, kind, params, status, result, error, created_at, started_at, finished_at '
+            'FROM jobs WHERE id = ?', (job_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        job = dict(zip(
+            ['id', 'kind', 'params', 'status', 'result', 'error', 'created_at', 'started_at', 'finished_at'], row
+        ))
+        job['params'] = json.loads(job['params'])
+        job['result'] = json.loads(job['result']) if job['result'] else None
+        # A job whose worker died never finishes; report it instead of polling forever
+        if job['status'] in ACTIVE and time.time() - job['created_at'] > self._expiry():
+            job['status'] = 'timeout'
+            job['error'] = 'The job did not finish in time.'
+        return job
+
+    def cancel(self, job_id):
+        """Request cancellation; queued jobs stop immediately, running ones at their next checkpoint"""
+        conn = self.db.connect()
+        with conn:
+            updated = conn.execute(
+                'UPDATE jobs SET cancel_requested = 1 WHERE id = ? AND status IN (?, ?)',
+                (job_id,) + ACTIVE
+            ).rowcount
+            conn.execute(
+                "UPDATE jobs SET status = 'cancelled', finished_at = ? WHERE id = ? AND status = 'queued'",
+                (time.time(), job_id)
+            )
+        return bool(updated)
+
+    def _expiry(self):
+        # Allow for queueing behind other jobs before a job counts as lost
+        return self.timeout * 3
+
+    def _cancel_requested(self, job_id):
+        row = self.db.connect().execute(
+            'SELECT cancel_requested FROM jobs WHERE id = ?', (job_id,)
+        ).fetchone()
+        return bool(row and row[0])
+
+    def _finish(self, job_id, status, result=None, error=None):
+        conn = self.db.connect()
+        with conn:
+            conn.execute(
+                'UPDATE jobs SET status = ?, result = ?, error = ?, finished_at = ? '
+                'WHERE id = ? AND status IN (?, ?)',
+                (status, json.dumps(result) if result is not None else None, error,
+                 time.time(), job_id) + ACTIVE
+            )
+        logger.info(f"Job {job_id} finished: {status}{f' ({error})' if error else ''}")
+
+    def _discard(self, kind, job_id, result):
+        discard = self.discards.get(kind)
+        if discard:
+            try:
+                discard(result)
+            except Exception as e:
+                logger.warning(f"Could not discard the result of job {job_id}: {e}")
+
+    def _run(self, job_id, kind, params):
+        """Run one job on a pool thread, enforcing the timeout and cancellation"""
+        if self._cancel_requested(job_id):
+            self._finish(job_id, 'cancelled')
+            return
+        conn = self.db.connect()
+        with conn:
+            conn.execute(
+                "UPDATE jobs SET status = 'running', started_at = ? WHERE id = ?",
+                (time.time(), job_id)
+            )
+
+        job = Job(self, job_id)
+        outcome = {}
+        lock = threading.Lock()  # Orders a late result against abandoning the job
+
+        def target():
+            try:
+                result = self.handlers[kind](params, job)
+            except JobCancelled:
+                outcome['cancelled'] = True
+            except Exception as e:
+                outcome['error'] = str(e) or type(e).__name__
+            else:
+                with lock:
+                    late = job.abandoned.is_set()
+                    if not late:
+                        outcome['result'] = result
+                if late:
+                    self._discard(kind, job_id, result)
+
+        def abandon(status, error=None):
+            with lock:
+                job.abandoned.set()
+                result = outcome.pop('result', None)
+            if result is not None:
+                self._discard(kind, job_id, result)
+            self._finish(job_id, status, error=error)
+
+        # The handler runs on its own thread so a hung upstream call cannot
+        # hold the pool slot past the timeout
+        worker = threading.Thread(target=target, name=f'job-{job_id}', daemon=True)
+        worker.start()
+        deadline = time.monotonic() + self.timeout
+        while worker.is_alive():
+            worker.join(self.POLL_INTERVAL)
+            if not worker.is_alive():
+                break
+            if self._cancel_requested(job_id):
+                abandon('cancelled')
+                return
+            if time.monotonic() >= deadline:
+                abandon('timeout', error=f'The job took longer than {self.timeout}s.')
+                return
+
+        if outcome.get('cancelled'):
+            self._finish(job_id, 'cancelled')
+        elif 'error' in outcome:
+            self._finish(job_id, 'failed', error=outcome['error'])
+        else:
+            self._finish(job_id, 'done', result=outcome.get('result'))
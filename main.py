@@ -1,14 +1,41 @@
-from flask import Flask, render_template, request, send_file, session
-import yfinance as yf
+import time
+BOOT_STARTED = time.perf_counter()  # App import time is reported at boot
+
+from flask import (Flask, Response, g, has_request_context, make_response, render_template, request, send_file,
+                   session, url_for)
 import pandas as pd
 import io
 import os
+import json
+import hashlib
+import importlib
+import re
+import sys
+import threading
+import contextvars
+import zipfile
 import logging
+from concurrent.futures import ThreadPoolExecutor, wait
 from datetime import datetime, timedelta
-from functools import lru_cache
 from flask_cors import CORS
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
+from price_store import PriceStore, INTRADAY_LIMITS
+from ttl_cache import TTLCache
+from jobs import JobQueue
+from singleflight import SingleFlight
+from upstream import Upstream, UpstreamUnavailable
+from metrics import Metrics, SIZE_BUCKETS
+from http_cache import make_etag, last_modified, not_modified, with_validators, compress_response
+import rate_limit_storage  # Registers the sqlite:// scheme with limits
+from fundamentals_store import FundamentalsStore, format_frame
+from screener import screen, ScreenError
+from symbols import SymbolIndex
+from analytics import price_matrix, compute_analytics, analytics_to_json
+from charting import build_chart_payload, compute_indicators, INDICATORS
+from resample import base_interval, derive_interval, fit_interval, merge_bins, resample_ohlcv, INTERVAL_LABELS
+from frame_memory import MemoryBudget, downcast, frame_bytes
+from exports import write_excel, write_parquet, write_arrow, iter_csv_chunks, temp_path, iter_file_chunks, remove_file
 
 # Configure logging
 logging.basicConfig(
@@ -20,46 +47,242 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Boot timings of this process (app import, lazy imports, warm-up), logged and shown at /stats
+boot_timings = {'imports': {}}
+lazy_imported = set()  # Names whose import has completed (sys.modules also holds half-initialized modules)
+lazy_import_lock = threading.RLock()
+
+def lazy_import(name):
+    """Import a module on first use, recording how long the first import took"""
+    if name in lazy_imported:
+        return sys.modules[name]
+    # Concurrent first uses wait for the thread doing the import instead of getting a partial module
+    with lazy_import_lock:
+        first = name not in sys.modules
+        start = time.perf_counter()
+        module = importlib.import_module(name)  # Also waits for an import running outside lazy_import
+        if first:
+            seconds = time.perf_counter() - start
+            boot_timings['imports'][name] = round(seconds, 3)
+            logger.info(f"Imported {name} in {seconds:.2f}s")
+        lazy_imported.add(name)
+    return module
+
+# Market data provider: Yahoo Finance, or synthetic offline data for benchmarks and load tests
+MARKET_DATA_PROVIDER = os.environ.get('MARKET_DATA_PROVIDER', 'yahoo')
+
+def market_data():
+    """The market data module, imported on first use (yfinance pulls in requests, curl_cffi and bs4)"""
+    return lazy_import('fake_provider' if MARKET_DATA_PROVIDER == 'fake' else 'yfinance')
+
+# Slow imports deferred until first use (Excel and Parquet/Arrow exports)
+LAZY_MODULES = ['openpyxl', 'pyarrow.parquet', 'pyarrow.feather']
+
+def preload_modules():
+    """Import the deferred modules now (in the gunicorn master with --preload, so forked workers share them)"""
+    market_data()
+    for name in LAZY_MODULES:
+        try:
+            lazy_import(name)
+        except ImportError:
+            pass  # Optional dependency
+
 app = Flask(__name__)
 CORS(app)  # Enable CORS for all routes
 app.secret_key = os.environ.get('SECRET_KEY', os.urandom(24))
 app.config['SEND_FILE_MAX_AGE_DEFAULT'] = 300  # Cache static files for 5 minutes
 
-# Configure rate limiting
+# Local data directory for persistent caches (price store etc.)
+DATA_DIR = os.environ.get('DATA_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data'))
+
+# Configure rate limiting; counters are shared by all workers (SQLite by default, or e.g. redis://)
+RATELIMIT_STORAGE_URI = os.environ.get(
+    'RATELIMIT_STORAGE_URI', f"sqlite://{os.path.abspath(os.path.join(DATA_DIR, 'limits.sqlite'))}"
+)
 limiter = Limiter(
     get_remote_address,
     app=app,
     default_limits=["200 per day", "50 per hour"],
-    storage_uri="memory://",
+    storage_uri=RATELIMIT_STORAGE_URI,
+    enabled=os.environ.get('RATELIMIT_ENABLED', '1') != '0',  # Load tests switch limits off
+)
+
+# Outbound budget for every Yahoo Finance call, with backoff and a circuit breaker
+upstream = Upstream(
+    os.path.join(DATA_DIR, 'upstream.sqlite'),
+    rate=float(os.environ.get('UPSTREAM_RATE', 2)),  # Calls per second across all workers
+    burst=int(os.environ.get('UPSTREAM_BURST', 5)),
+    max_wait=float(os.environ.get('UPSTREAM_MAX_WAIT', 10)),  # Longest wait for a token before giving up
+    retries=int(os.environ.get('UPSTREAM_RETRIES', 2)),
+    failure_threshold=int(os.environ.get('UPSTREAM_FAILURE_THRESHOLD', 5)),
+    cooldown=int(os.environ.get('UPSTREAM_COOLDOWN', 30))
+)
+# Batches and background jobs queue for tokens this long instead of failing tickers once the budget runs dry
+UPSTREAM_BATCH_MAX_WAIT = float(os.environ.get('UPSTREAM_BATCH_MAX_WAIT', 120))
+
+# Stage timings, upstream calls and cache hit rates, aggregated across workers at /metrics
+metrics = Metrics(os.path.join(DATA_DIR, 'metrics'))
+metrics.describe('stage_seconds', 'histogram', 'Time spent in each stage of a request')
+metrics.describe('http_request_seconds', 'histogram', 'Request latency by endpoint')
+metrics.describe('http_response_bytes', 'histogram', 'Response body size by endpoint', buckets=SIZE_BUCKETS)
+metrics.describe('http_requests_total', 'counter', 'Requests by endpoint and status')
+metrics.describe('upstream_calls_total', 'counter', 'Yahoo Finance calls by kind and outcome')
+metrics.describe('cache_requests_total', 'counter', 'Cache lookups by cache and result')
+metrics.describe('singleflight_total', 'counter', 'Coalescing of identical upstream fetches')
+
+def record_server_timing(stage, seconds):
+    """Collect stage timings of the current request for its Server-Timing header"""
+    if has_request_context():
+        g.setdefault('stage_timings', []).append((stage, seconds))
+
+metrics.on_timing = record_server_timing
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+@app.after_request
+def record_request_metrics(response):
+    endpoint = request.endpoint or 'unknown'
+    elapsed = time.perf_counter() - g.get('request_started', time.perf_counter())
+    metrics.observe('http_request_seconds', elapsed, endpoint=endpoint)
+    metrics.inc('http_requests_total', endpoint=endpoint, status=str(response.status_code))
+    size = response.content_length or response.headers.get('X-Export-Bytes')
+    if size is not None:
+        metrics.observe('http_response_bytes', int(size), endpoint=endpoint)
+    timings = [f'{stage};dur={seconds * 1000:.1f}' for stage, seconds in g.get('stage_timings', [])]
+    response.headers['Server-Timing'] = ', '.join(timings + [f'total;dur={elapsed * 1000:.1f}'])
+    metrics.flush()
+    return response
+
+# Text responses (pages, JSON, CSV exports) are compressed with br or gzip as the client accepts.
+# Registered after the metrics hook so it runs first and the size histogram sees compressed bytes.
+COMPRESS_MIN_BYTES = int(os.environ.get('COMPRESS_MIN_BYTES', 1024))
+COMPRESS_LEVEL = int(os.environ.get('COMPRESS_LEVEL', 6))
+
+@app.after_request
+def compress(response):
+    return compress_response(response, min_size=COMPRESS_MIN_BYTES, gzip_level=COMPRESS_LEVEL)
+
+# Identical concurrent upstream fetches share one call (threads via futures, workers via lock files)
+upstream_flight = SingleFlight(os.path.join(DATA_DIR, 'locks'))
+
+def call_upstream(kind, fn, *args, **kwargs):
+    """Call Yahoo Finance through the shared budget, timing and counting the call by kind"""
+    try:
+        with metrics.timer(f'upstream_{kind}'):
+            result = upstream.call(fn, *args, **kwargs)
+    except UpstreamUnavailable:
+        metrics.inc('upstream_calls_total', kind=kind, outcome='unavailable')
+        raise
+    except Exception:
+        metrics.inc('upstream_calls_total', kind=kind, outcome='error')
+        raise
+    metrics.inc('upstream_calls_total', kind=kind, outcome='ok')
+    return result
+
+# Cache raw fundamentals (.info) to reduce API calls, shared by all workers
+fundamentals_cache = TTLCache(
+    os.path.join(DATA_DIR, 'cache.sqlite'),
+    namespace='info',
+    stale_ttl=int(os.environ.get('FUNDAMENTALS_STALE_TTL', 86400)),  # Serve stale data for a day while refreshing
+    max_entries=int(os.environ.get('FUNDAMENTALS_CACHE_SIZE', 512))
 )
 
-# Cache financial ratios data to reduce API calls
-@lru_cache(maxsize=32)
-def get_financial_ratios(ticker, max_age=3600):  # Cache for 1 hour
+# Columnar snapshot of raw fundamentals for every ticker fetched, used by the screener
+fundamentals_store = FundamentalsStore(os.path.join(DATA_DIR, 'fundamentals.sqlite'))
+
+# Known ticker symbols for validation and autocomplete: the exchange directory downloaded by
+# `python symbols.py refresh` (or the bundled sample), plus every ticker with stored fundamentals.
+# The directory lists exchange listings only (no OTC ADRs like TCEHY, no mutual funds like VFIAX), so
+# SYMBOL_VALIDATION=auto lets unknown symbols reach the upstream and suggests near misses only when it
+# finds nothing; strict rejects unknown US symbols before any upstream call; off never suggests.
+SYMBOL_VALIDATION = os.environ.get('SYMBOL_VALIDATION', 'auto')
+symbol_index = SymbolIndex.load(os.path.join(DATA_DIR, 'symbols.csv'))
+for symbol, name in fundamentals_store.frame()['longName'].dropna().items():
+    symbol_index.add(symbol, name)
+
+def unlisted_symbol(ticker):
+    """True for a US-style symbol the index can vouch is not an exchange listing (a typo, or OTC/fund)"""
+    return (SYMBOL_VALIDATION != 'off' and ticker not in symbol_index and
+            symbol_index.validates(ticker, assume_complete=SYMBOL_VALIDATION == 'strict'))
+
+def symbol_hint(ticker):
+    """' Did you mean ...?' for an unlisted symbol with near misses in the index, else ''"""
+    suggestions = symbol_index.fuzzy(ticker, limit=3) if unlisted_symbol(ticker) else []
+    return f" Did you mean {' or '.join(suggestions)}?" if suggestions else ''
+
+def unknown_symbol_error(ticker):
+    """With SYMBOL_VALIDATION=strict, an error for an unlisted symbol before any upstream call, else None"""
+    if SYMBOL_VALIDATION != 'strict' or not unlisted_symbol(ticker):
+        return None
+    return f"'{ticker}' is not a listed ticker symbol.{symbol_hint(ticker)}"
+
+class Fundamentals:
+    """Per-request view of one ticker's fundamentals.
+
+    `info` is loaded at most once (through the shared cache), and the
+    yf.Ticker is only created when a fetch actually needs it.
+    """
+
+    def __init__(self, ticker, max_age=3600):
+        self.ticker = ticker
+        self.max_age = max_age
+        self.error = None
+        self._stock = None
+        self._info = None
+
+    @property
+    def stock(self):
+        if self._stock is None:
+            self._stock = market_data().Ticker(self.ticker)
+        return self._stock
+
+    @property
+    def info(self):
+        """Raw Yahoo Finance info dict ({} if unavailable)"""
+        if self._info is None:
+            try:
+                self._info = fundamentals_cache.get_or_load(
+                    self.ticker, self._load_info, ttl=self.max_age
+                ) or {}
+            except Exception as e:
+                logger.warning(f"Could not fetch info for {self.ticker}: {e}")
+                self.error = str(e)
+                # While the upstream is failing, an expired copy beats no data
+                self._info = fundamentals_cache.peek(self.ticker) or {}
+        return self._info
+
+    def _load_info(self):
+        """Fetch .info from the upstream, coalescing identical concurrent fetches"""
+        def load():
+            # Another worker may have filled the cache while we waited for its lock
+            cached = fundamentals_cache.get(self.ticker)
+            if cached is not None and cached[1]:
+                return cached[0]
+            info = call_upstream('info', lambda: self.stock.info) or {}
+            # Yahoo answers unknown symbols (and failures it hides) with a nameless stub dict: treat
+            # it as a miss, so it is neither cached over good data nor stored for the screener
+            name = info.get('longName') or info.get('shortName')
+            if not name:
+                return None
+            symbol_index.add(self.ticker, name)
+            try:
+                fundamentals_store.upsert(self.ticker, info)
+            except Exception as e:
+                logger.warning(f"Could not store fundamentals for {self.ticker}: {e}")
+            return info
+        return upstream_flight.do(('info', self.ticker), load)
+
+def get_financial_ratios(ticker, max_age=3600, fundamentals=None):  # Cache for 1 hour
     """Get key financial ratios from Yahoo Finance with caching"""
     try:
-        # Set a timeout to prevent hanging on API calls
-        stock = yf.Ticker(ticker)
-        info = stock.info
+        fundamentals = fundamentals or Fundamentals(ticker, max_age)
+        info = fundamentals.info
         
         if not info:
             return None
         
-        # Get additional financial data
-        # Balance sheet, income statement, and cash flow data
-        try:
-            income_stmt = stock.income_stmt
-            balance_sheet = stock.balance_sheet
-            cash_flow = stock.cashflow
-            # Add quarterly data
-            income_stmt_quarterly = stock.quarterly_income_stmt
-            balance_sheet_quarterly = stock.quarterly_balance_sheet
-            cash_flow_quarterly = stock.quarterly_cashflow
-        except Exception as e:
-            logger.warning(f"Could not fetch financial statements for {ticker}: {e}")
-            income_stmt = balance_sheet = cash_flow = None
-            income_stmt_quarterly = balance_sheet_quarterly = cash_flow_quarterly = None
-            
         # Organize data into categories with formatting functions
         categories = {
             'Company Information': {
@@ -71,7 +294,7 @@ def get_financial_ratios(ticker, max_age=3600):  # Cache for 1 hour
                 'Currency': info.get('currency', 'N/A'),
                 'Website': info.get('website', 'N/A')
             },
-            'Financial Highlights': format_financial_highlights(info, income_stmt, balance_sheet, cash_flow),
+            'Financial Highlights': format_financial_highlights(info),
             'Price & Performance': format_price_metrics(info),
             'Valuation Ratios': format_valuation_metrics(info),
             'Financial Health': format_financial_health(info),
@@ -349,43 +572,345 @@ def format_financial_highlights(info, income_stmt=None, balance_sheet=None, cash
     
     return highlights
 
-# Optimize downloading data to avoid redundant calls
-def download_stock_data(ticker, start_date, end_date, interval, timeout=15):
-    """Download stock data with error handling"""
-    try:
-        # For very long date ranges, use a sample to reduce memory usage
-        start = datetime.strptime(start_date, '%Y-%m-%d')
-        end = datetime.strptime(end_date, '%Y-%m-%d')
-        date_range = (end - start).days
-        
-        # For extreme ranges with daily data, automatically switch to weekly
-        adjusted_interval = interval
-        if interval == '1d' and date_range > 1825:  # > 5 years
-            logger.info(f"Automatically switching to weekly data for {date_range} day range")
-            adjusted_interval = '1wk'
-        
-        # Download only required columns to save memory
+# yf.download logs failures per symbol instead of raising; these answers are genuinely empty
+# (no bars in the range, unknown symbol), every other logged error is a failed fetch
+NO_DATA_ERROR_RE = re.compile(r"no (price )?data found|doesn.t exist|delisted", re.IGNORECASE)
+DOWNLOAD_ERROR_RE = re.compile(r"^\s*\[([^\]]*)\]: (.*)", re.DOTALL)
+
+class DownloadErrors(logging.Handler):
+    """Collects the per-symbol errors yf.download logs on this thread ("['AAPL']: <error>").
+
+    yf.download keeps its errors in per-call state it does not return, so the
+    'yfinance' logger is the only place a caller can see them. Records from
+    other threads (concurrent downloads) are ignored.
+    """
+
+    def __init__(self):
+        super().__init__(logging.ERROR)
+        self.thread = threading.get_ident()
+        self.errors = {}
+
+    def emit(self, record):
+        if record.thread != self.thread:
+            return
+        match = DOWNLOAD_ERROR_RE.match(record.getMessage())
+        if match:
+            for symbol in re.findall(r"'([^']+)'", match.group(1)):
+                self.errors[symbol] = match.group(2)
+
+    def __enter__(self):
+        logging.getLogger('yfinance').addHandler(self)
+        return self
+
+    def __exit__(self, *exc):
+        logging.getLogger('yfinance').removeHandler(self)
+        return False
+
+def download_from_yahoo(ticker, start_date, end_date, interval, timeout=15):
+    """One yf.download call that raises on failed fetches instead of returning an empty frame.
+
+    Symbols that failed inside an otherwise successful grouped answer are
+    listed in attrs['failed_symbols'], so the store does not mark them covered.
+    """
+    yf = market_data()
+    with DownloadErrors() as captured:
         data = yf.download(
             ticker, 
             start=start_date, 
             end=end_date, 
-            interval=adjusted_interval,
+            interval=interval,
             progress=False,  # Disable progress bar to reduce console output
             threads=True,    # Enable multi-threading for faster downloads
             timeout=timeout  # Add timeout to prevent hanging on slow connections
         )
-        
-        # Optimize memory usage by converting to appropriate dtypes
-        if not data.empty:
-            # Convert float64 to float32 to reduce memory usage
-            for col in data.select_dtypes(include=['float64']).columns:
-                data[col] = data[col].astype('float32')
-                
+    failed = {symbol: error for symbol, error in captured.errors.items() if not NO_DATA_ERROR_RE.search(error)}
+    if failed and (data is None or data.empty):
+        # Raising counts the failure against the circuit breaker
+        raise IOError(f"Yahoo Finance download failed: {next(iter(failed.values()))}")
+    if data is not None:
+        data.attrs['failed_symbols'] = sorted(failed)
+    return data
+
+def fetch_from_yahoo(ticker, start_date, end_date, interval, timeout=15):
+    """Fetch raw OHLCV data for a date range from Yahoo Finance (None if the upstream is unavailable)"""
+    try:
+        return call_upstream('download', download_from_yahoo, ticker, start_date, end_date, interval, timeout)
+    except Exception as e:
+        # The store then serves whatever it already has for the range
+        logger.warning(f"Could not fetch {ticker} from Yahoo Finance: {e}")
+        return None
+
+# Persistent price store in front of the upstream: only missing date ranges are fetched
+# Long intraday ranges are fetched as parallel windows, at most PRICE_WINDOW_WORKERS at a time
+price_store = PriceStore(
+    os.path.join(DATA_DIR, 'prices.sqlite'), fetch_from_yahoo,
+    window_workers=int(os.environ.get('PRICE_WINDOW_WORKERS', 4))
+)
+
+# Default row budget for displayed queries: longer daily ranges are resampled
+# to weekly/monthly/quarterly bars locally instead of fetching coarser data
+PRICE_MAX_ROWS = int(os.environ.get('PRICE_MAX_ROWS', 5000))
+
+# Prices are kept as float32 (or float64) once read; volume as the smallest integer type that fits
+PRICE_FLOAT_DTYPE = os.environ.get('PRICE_FLOAT_DTYPE', 'float32')
+if PRICE_FLOAT_DTYPE not in ('float32', 'float64'):
+    raise ValueError(f"PRICE_FLOAT_DTYPE must be float32 or float64, not {PRICE_FLOAT_DTYPE!r}")
+
+# DataFrame memory one request (or background job) may hold; larger ranges are read downsampled
+REQUEST_MEMORY_BUDGET = int(float(os.environ.get('REQUEST_MEMORY_BUDGET_MB', 64)) * 1024 ** 2)
+
+def optimize_dtypes(data):
+    """Optimize memory usage by downcasting every column in a single pass"""
+    return downcast(data, PRICE_FLOAT_DTYPE)
+
+def request_budget():
+    """The memory budget of the current request, or a fresh one outside a request (jobs, pool threads)"""
+    if has_request_context():
+        if 'memory_budget' not in g:
+            g.memory_budget = MemoryBudget(REQUEST_MEMORY_BUDGET)
+        return g.memory_budget
+    return MemoryBudget(REQUEST_MEMORY_BUDGET)
+
+def read_prices(tickers, start_date, end_date, interval, budget, max_rows=None):
+    """Read stored bars for several tickers, derived to `interval`, within the memory budget.
+
+    The stored rows are counted first; if they would not fit, every ticker
+    is read chunk by chunk and resampled to the finest coarser interval that
+    does, so the full-resolution frame is never materialized. max_rows is
+    the display row budget of derive_interval. Returns ({ticker: data},
+    interval used).
+    """
+    fetch_interval = base_interval(interval)
+    rows = sum(price_store.count(ticker, start_date, end_date, fetch_interval) for ticker in tickers)
+    read_interval, transform = interval, None
+    if rows > budget.rows_left():
+        read_interval = fit_interval(rows, fetch_interval, interval, budget.rows_left())
+        logger.warning(f"{rows} stored {fetch_interval} rows for {', '.join(tickers[:5])} exceed the memory "
+                       f"budget; reading them as {read_interval} bars")
+        if read_interval != fetch_interval:
+            transform = lambda chunk: resample_ohlcv(chunk, read_interval)
+    frames, used_interval = {}, read_interval
+    for ticker in tickers:
+        data = merge_bins(price_store.read(ticker, start_date, end_date, fetch_interval, transform))
+        data, used_interval = derive_interval(data, read_interval, max_rows)
+        data = optimize_dtypes(data)
+        budget.charge(frame_bytes(data))
+        frames[ticker] = data
+    return frames, used_interval
+
+def fill_prices(ticker, start_date, end_date, interval, timeout=15):
+    """Fetch the ranges the local store does not cover yet; returns the windows the upstream could not serve"""
+    fetch_interval = base_interval(interval)
+    # Identical concurrent requests share one fetch
+    return upstream_flight.do(
+        ('prices', ticker, start_date, end_date, fetch_interval),
+        price_store.fill, ticker, start_date, end_date, fetch_interval, timeout=timeout
+    )
+
+# Optimize downloading data to avoid redundant calls
+def download_stock_data(ticker, start_date, end_date, interval, timeout=15, cached_only=False, max_rows=None,
+                        budget=None):
+    """Download stock data with error handling.
+
+    Weekly, monthly and quarterly bars are derived locally from stored daily
+    bars. With max_rows, ranges that would exceed the budget are resampled to
+    the next coarser interval; the interval used is in data.attrs['interval'].
+    With cached_only=True the result is read from the local store without
+    contacting the upstream (e.g. to export a query that was just displayed).
+    Intraday windows the upstream could not serve are listed in
+    data.attrs['missing_windows']. Ranges too large for the memory budget
+    (the request's unless one is given) are read at a coarser interval.
+    """
+    try:
+        missing_windows = [] if cached_only else fill_prices(ticker, start_date, end_date, interval, timeout)
+        frames, used_interval = read_prices(
+            [ticker], start_date, end_date, interval, budget or request_budget(), max_rows
+        )
+        data = frames[ticker]
+        if used_interval != interval:
+            logger.info(f"Resampled {ticker} from {interval} to {used_interval} to stay within the row and memory budgets")
+        data.attrs['missing_windows'] = missing_windows
+        data.attrs['interval'] = used_interval
+        data.attrs['requested_interval'] = interval
         return data
     except Exception as e:
         logger.error(f"Error downloading data: {str(e)}")
         return None
 
+def download_batch_data(tickers, start_date, end_date, interval, timeout=30, budget=None):
+    """Download stock data for several tickers with one grouped upstream call per missing range.
+
+    All tickers share the memory budget and one interval, in data.attrs['interval'].
+    Windows the upstream could not serve for a ticker are in its data.attrs['missing_windows'],
+    so one failing symbol or group is reported per ticker instead of failing the batch.
+    """
+    try:
+        missing_windows = price_store.fill_many(tickers, start_date, end_date, base_interval(interval), timeout=timeout)
+        frames, used_interval = read_prices(tickers, start_date, end_date, interval, budget or request_budget())
+        for ticker, data in frames.items():
+            data.attrs['interval'] = used_interval
+            data.attrs['missing_windows'] = missing_windows[ticker]
+        return frames
+    except Exception as e:
+        logger.error(f"Error downloading batch data: {str(e)}")
+        return {}
+
+def load_query_data(q, fetch=True):
+    """Return the price data for a stored query, reading the local store before the upstream"""
+    # Reuse the data index() just stored; only go upstream if it has been evicted
+    args = (q['ticker'], q['start_date'], q['end_date'], q['interval'])
+    data = download_stock_data(*args, cached_only=True, max_rows=q.get('max_rows'))
+    if fetch and (data is None or data.empty):
+        data = download_stock_data(*args, max_rows=q.get('max_rows'))
+    return data
+
+def price_page(q, cursor, limit, fetch=True):
+    """(rows cursor..cursor+limit of a query's price table, total rows), or (None, 0) without data.
+
+    Stored intervals that are shown as stored (no resampling for the row or
+    memory budget) are paged straight from the store with LIMIT/OFFSET;
+    derived intervals are built from the whole range and sliced.
+    """
+    ticker, start_date, end_date, interval = q['ticker'], q['start_date'], q['end_date'], q['interval']
+    if interval == base_interval(interval):
+        total = price_store.count(ticker, start_date, end_date, interval)
+        if not total and fetch:
+            fill_prices(ticker, start_date, end_date, interval)
+            total = price_store.count(ticker, start_date, end_date, interval)
+        max_rows = q.get('max_rows')
+        if total and (not max_rows or total <= max_rows) and total <= request_budget().rows_left():
+            return price_store.read_page(ticker, start_date, end_date, interval, cursor, limit), total
+    data = load_query_data(q, fetch)
+    if data is None or data.empty:
+        return None, 0
+    return data.iloc[cursor:cursor + limit], len(data)
+
+# Multi-ticker analytics, memoized per (ticker set, range, interval) and stored bars
+ANALYTICS_BETA_WINDOW = int(os.environ.get('ANALYTICS_BETA_WINDOW', 60))  # Bars in the rolling beta window
+ANALYTICS_LIVE_TTL = int(os.environ.get('ANALYTICS_LIVE_TTL', 300))  # Seconds a range still missing bars is memoized
+analytics_cache = TTLCache(
+    os.path.join(DATA_DIR, 'cache.sqlite'),
+    namespace='analytics',
+    stale_ttl=0,  # Keys already include the stored bars
+    max_entries=256
+)
+
+def analytics_key(symbols, start_date, end_date, interval, benchmark):
+    """Memo key from the bars stored for the range: count and first/last timestamp per symbol.
+
+    Re-fetching today's bar bumps a series' version without changing its
+    span, so live ranges still hit; a new bar changes the key.
+    """
+    fetch_interval = base_interval(interval)
+    spans = [price_store.span(symbol, start_date, end_date, fetch_interval) for symbol in symbols]
+    return hashlib.sha1(json.dumps([symbols, start_date, end_date, interval, benchmark, spans]).encode()).hexdigest()
+
+def analytics_ttl(symbols, start_date, end_date, interval):
+    """Ranges the store does not fully cover (ending today, or with failed windows) are memoized briefly"""
+    fetch_interval = base_interval(interval)
+    if any(price_store.missing(symbol, fetch_interval, start_date, end_date) for symbol in symbols):
+        return ANALYTICS_LIVE_TTL
+    return None
+
+def get_analytics(tickers, start_date, end_date, interval, benchmark=None, frames=None):
+    """Returns/volatility/drawdown/beta/correlation for a ticker set as JSON-friendly data"""
+    symbols = sorted(set(tickers) | ({benchmark} if benchmark else set()))
+    # The memo is checked before any prices are downloaded or read
+    key = analytics_key(symbols, start_date, end_date, interval, benchmark)
+    
+    def load():
+        nonlocal frames
+        if frames is None or any(symbol not in frames for symbol in symbols):
+            frames = download_batch_data(symbols, start_date, end_date, interval)
+        # Batches too large for the memory budget come back at a coarser interval
+        used_interval = next(
+            (data.attrs['interval'] for data in frames.values() if data is not None and 'interval' in data.attrs), interval
+        )
+        prices = price_matrix({symbol: frames.get(symbol) for symbol in symbols})
+        if prices.empty:
+            return None
+        result = compute_analytics(prices, used_interval, benchmark if benchmark in prices else None, ANALYTICS_BETA_WINDOW)
+        result = analytics_to_json(result, benchmark)
+        # The download may have filled gaps: also memoize under the key the next call will compute
+        filled_key = analytics_key(symbols, start_date, end_date, interval, benchmark)
+        if filled_key != key:
+            analytics_cache.set(filled_key, result, analytics_ttl(symbols, start_date, end_date, interval))
+        return result
+    
+    return analytics_cache.get_or_load(key, load, ttl=analytics_ttl(symbols, start_date, end_date, interval))
+
+def analytics_sheets(analytics):
+    """Metrics and correlation tables for an export, rebuilt from the JSON form"""
+    if not analytics:
+        return []
+    metrics = pd.DataFrame.from_dict(analytics['metrics'], orient='index')
+    metrics.index.name = 'Ticker'
+    correlation = pd.DataFrame(analytics['correlation'], index=analytics['tickers'], columns=analytics['tickers'])
+    correlation.index.name = 'Ticker'
+    return [('Analytics', metrics), ('Correlation', correlation)]
+
+# Background jobs for long or expensive queries, so sync workers are not held by the upstream
+JOB_CONCURRENCY = int(os.environ.get('JOB_CONCURRENCY', 2))
+JOB_TIMEOUT = int(os.environ.get('JOB_TIMEOUT', 120))  # Seconds per job
+JOB_RANGE_DAYS = int(os.environ.get('JOB_RANGE_DAYS', 1825))  # Uncached days that send a query to the queue
+JOB_INTRADAY_DAYS = int(os.environ.get('JOB_INTRADAY_DAYS', 7))
+
+job_queue = JobQueue(os.path.join(DATA_DIR, 'jobs.sqlite'), concurrency=JOB_CONCURRENCY, timeout=JOB_TIMEOUT)
+
+# Intervals a query may ask for: the stored and derived ones, plus every intraday interval the upstream serves
+VALID_INTERVALS = set(INTERVAL_LABELS) | set(INTRADAY_LIMITS)
+
+def interval_error(interval):
+    """An error message for an interval the app does not serve, else None"""
+    if interval in VALID_INTERVALS:
+        return None
+    return f"Unsupported interval '{interval}'. Choose one of: {', '.join(sorted(VALID_INTERVALS))}."
+
+def is_intraday(interval):
+    """Intraday intervals look like '1m', '15m', '1h' ('1mo' is monthly)"""
+    return interval[-1] in ('m', 'h')
+
+def needs_background_job(ticker, start_date, end_date, interval):
+    """Queries whose missing (not yet stored) range is large are fetched in the background"""
+    missing_days = sum(
+        (end - start).days for start, end in price_store.missing(ticker, base_interval(interval), start_date, end_date)
+    )
+    return missing_days > (JOB_INTRADAY_DAYS if is_intraday(interval) else JOB_RANGE_DAYS)
+
+def run_price_job(params, job):
+    """Fetch prices (with a longer timeout) and fundamentals into the caches"""
+    args = (params['ticker'], params['start_date'], params['end_date'], params['interval'])
+    # Retries with backoff happen inside the upstream budget; a job adds a longer timeout and token wait
+    with upstream.patience(UPSTREAM_BATCH_MAX_WAIT):
+        data = download_stock_data(*args, timeout=30)
+        if data is None or data.empty:
+            if upstream.is_open():
+                raise ValueError("Yahoo Finance is not responding right now. Please try again in a few minutes.")
+            raise ValueError(f"No data found for ticker '{params['ticker']}'. Please check the symbol and try again.")
+        job.check()
+        get_financial_ratios(params['ticker'])
+    return {'rows': len(data), 'missing_windows': data.attrs['missing_windows']}
+
+job_queue.register('prices', run_price_job)
+
+def finished_price_job(job_id, query):
+    """True if job_id names a finished prices job for this query, i.e. the page resubmitting it once the data is cached"""
+    job = job_queue.status(job_id) if job_id else None
+    return bool(
+        job and job['kind'] == 'prices' and job['status'] == 'done' and
+        all(job['params'].get(key) == query[key] for key in ('ticker', 'start_date', 'end_date', 'interval'))
+    )
+
+# Independent upstream fetches of one page view run concurrently on a bounded per-worker pool
+INDEX_DEADLINE = float(os.environ.get('INDEX_DEADLINE', 20))  # Seconds before the page renders what has arrived
+fanout_pool = ThreadPoolExecutor(max_workers=int(os.environ.get('INDEX_FANOUT_WORKERS', 8)), thread_name_prefix='fanout')
+
+def timed(fn, *args, **kwargs):
+    """Run fn and return (result, seconds), so a pool thread's stage can be recorded by the request"""
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, time.perf_counter() - start
+
 @app.route('/', methods=['GET', 'POST'])
 @limiter.limit("30 per minute")
 def index():
@@ -396,6 +921,18 @@ def index():
             end_date = request.form['end']
             interval = request.form['interval']
             
+            # Nothing reaches the upstream or the stores without a ticker and a known interval
+            if not ticker:
+                return render_template('index.html', error="Please enter a ticker symbol.")
+            error = interval_error(interval)
+            if error:
+                return render_template('index.html', error=error)
+            
+            # Strict validation answers typos from the local symbol index, before any upstream call
+            error = unknown_symbol_error(ticker)
+            if error:
+                return render_template('index.html', error=error)
+            
             # Validate dates
             try:
                 start = datetime.strptime(start_date, '%Y-%m-%d')
@@ -407,59 +944,109 @@ def index():
                 error = "Invalid date format. Please use YYYY-MM-DD format."
                 return render_template('index.html', error=error)
             
-            # Download data
-            data = download_stock_data(ticker, start_date, end_date, interval)
+            query = {
+                'ticker': ticker,
+                'start_date': start_date,
+                'end_date': end_date,
+                'interval': interval,
+                'max_rows': PRICE_MAX_ROWS
+            }
+            
+            # Long or intraday ranges the store does not have yet are fetched in the background;
+            # the page polls the job and resubmits once the data is cached. A symbol the exchange
+            # directory does not list is tried here first: it is as likely a typo as an OTC or fund symbol.
+            resubmit = finished_price_job(request.form.get('job_id'), query)
+            unlisted = unlisted_symbol(ticker)
+            if not resubmit and not unlisted and needs_background_job(ticker, start_date, end_date, interval):
+                job_id = job_queue.submit('prices', query)
+                return render_template('index.html', job=job_status_payload(job_queue.status(job_id)))
+            
+            # Prices and fundamentals are independent: fetch both at once and render whatever
+            # has arrived by the deadline (unfinished fetches keep filling the caches).
+            # Pool threads have no request context, so the request's memory budget is passed along.
+            fundamentals = Fundamentals(ticker)
+            pending = {
+                'prices': fanout_pool.submit(
+                    timed, download_stock_data, ticker, start_date, end_date, interval, max_rows=PRICE_MAX_ROWS,
+                    budget=request_budget()
+                ),
+                'fundamentals': fanout_pool.submit(timed, get_financial_ratios, ticker, fundamentals=fundamentals),
+            }
+            wait(pending.values(), timeout=INDEX_DEADLINE)
+            results, partial = {}, []
+            for stage, future in pending.items():
+                if future.done():
+                    results[stage], seconds = future.result()
+                    metrics.record(stage, seconds)
+                else:
+                    partial.append(stage)
+                    logger.warning(f"{stage} for {ticker} did not arrive within {INDEX_DEADLINE}s")
+            
+            if 'prices' in partial:
+                if not resubmit:
+                    # Let a job wait for the rest; it shares the fetch that is already running
+                    job_id = job_queue.submit('prices', query)
+                    return render_template('index.html', job=job_status_payload(job_queue.status(job_id)))
+                error = f"Yahoo Finance is taking too long to answer for '{ticker}'. Please try again in a few minutes."
+                return render_template('index.html', error=error)
+            data = results['prices']
             
             # Validate data
             if data is None or data.empty:
-                # Try one more time with a longer timeout as a fallback
-                logger.warning(f"Retrying data download for {ticker} with longer timeout")
-                data = download_stock_data(ticker, start_date, end_date, interval, timeout=30)
-                
-                # If still no data, return error
-                if data is None or data.empty:
-                    error = f"No data found for ticker '{ticker}'. Please check the symbol and try again."
+                if upstream.is_open():
+                    # Queueing more work would only pile up behind a failing upstream
+                    error = "Yahoo Finance is not responding right now and this query is not cached. Please try again in a few minutes."
                     return render_template('index.html', error=error)
-            
-            # Get financial ratios
-            financial_ratios = get_financial_ratios(ticker)
+                if not resubmit and not unlisted:
+                    # Retry with a longer timeout in the background instead of holding this worker
+                    logger.warning(f"Retrying data download for {ticker} in the background")
+                    job_id = job_queue.submit('prices', query)
+                    return render_template('index.html', job=job_status_payload(job_queue.status(job_id)))
+                
+                # Near misses from the symbol index, now that the upstream has nothing either
+                hint = symbol_hint(ticker)
+                error = f"No data found for ticker '{ticker}'.{hint or ' Please check the symbol and try again.'}"
+                return render_template('index.html', error=error)
             
             # Verify financial data was retrieved - ensure no NoneType error if Yahoo Finance API fails
+            financial_ratios = results.get('fundamentals')
             if financial_ratios is None:
                 financial_ratios = {}
-                logger.warning(f"No financial ratios available for {ticker}")
+                if 'fundamentals' not in partial:
+                    logger.warning(f"No financial ratios available for {ticker}")
             
-            # Debug: Store raw dividend info if needed
+            # Debug: Store raw dividend info if needed (the shared .info, never a second fetch)
             debug_info = {}
-            try:
-                stock = yf.Ticker(ticker)
+            raw_info = fundamentals.info if 'fundamentals' not in partial else {}
+            if 'fundamentals' in partial:
+                debug_info['error'] = f"Fundamentals did not arrive within {INDEX_DEADLINE}s"
+            elif fundamentals.error:
+                debug_info['error'] = fundamentals.error
+            else:
                 # Extract just the dividend-related fields for debugging
-                raw_info = stock.info
                 dividend_fields = {k: raw_info.get(k) for k in raw_info if 'dividend' in k.lower() or k in ['exDividendDate', 'payoutRatio']}
                 debug_info['dividend_fields'] = dividend_fields
                 debug_info['dividend_types'] = {k: type(v).__name__ for k, v in dividend_fields.items()}
-            except Exception as e:
-                debug_info['error'] = str(e)
             
             # Store only query parameters in session for download
-            session['last_query'] = {
-                'ticker': ticker,
-                'start_date': start_date,
-                'end_date': end_date,
-                'interval': interval
-            }
+            session['last_query'] = query
             
-            # Generate HTML table with optimized settings
-            price_table = data.reset_index().to_html(
-                classes='table table-striped table-sm', 
-                index=False,
-                float_format='%.2f',  # Limit decimal places
-                border=0,
-                justify='left'
-            )
+            # The table itself is loaded page by page from /api/prices, so the page stays small
+            price_summary = {
+                'rows': len(data),
+                'columns': [data.index.name or 'Date'] + [str(col) for col in data.columns],
+                'first': data.index[0].strftime('%Y-%m-%d'),
+                'last': data.index[-1].strftime('%Y-%m-%d'),
+                'interval': INTERVAL_LABELS.get(data.attrs['interval'], data.attrs['interval']),
+                'resampled_from': INTERVAL_LABELS.get(interval, interval) if data.attrs['interval'] != interval else None,
+                'max_rows': PRICE_MAX_ROWS,
+                'missing_windows': data.attrs.get('missing_windows', [])
+            }
             
             # Include debug info for admin view (hidden in production)
-            return render_template('index.html', price_table=price_table, ticker=ticker, financial_ratios=financial_ratios, debug_info=debug_info)
+            with metrics.timer('render'):
+                return render_template('index.html', price_summary=price_summary, ticker=ticker, financial_ratios=financial_ratios, debug_info=debug_info,
+                                       partial=partial, deadline=INDEX_DEADLINE)
         except Exception as e:
             error_message = f"An error occurred: {str(e)}"
             logger.error(error_message)  # Log error for debugging
@@ -467,61 +1054,559 @@ def index():
 
     return render_template('index.html')
 
-@app.route('/download_excel')
-@limiter.limit("10 per minute")
-def download_excel():
+# Price table pagination
+PRICE_PAGE_SIZE = 100
+PRICE_PAGE_MAX = 1000
+
+def query_from_request():
+    """Read a price query from the request args, falling back to the last query in the session.
+
+    Queries given in the args are answered from the local store only: fetching
+    a new range from the upstream is index()'s job, under its tighter limit.
+    """
+    if 'ticker' in request.args:
+        q = {
+            'ticker': request.args['ticker'].upper().strip(),
+            'start_date': request.args.get('start', ''),
+            'end_date': request.args.get('end', ''),
+            'interval': request.args.get('interval', '1d'),
+            'max_rows': request.args.get('max_rows', type=int)
+        }
+        # Validate dates before they reach the store
+        datetime.strptime(q['start_date'], '%Y-%m-%d')
+        datetime.strptime(q['end_date'], '%Y-%m-%d')
+        return q
+    return session.get('last_query')
+
+# Data responses carry ETag/Last-Modified from the store versions; ranges that are fully stored
+# and end before today can no longer change, so clients may reuse them for HISTORY_MAX_AGE seconds
+HISTORY_MAX_AGE = int(os.environ.get('HISTORY_MAX_AGE', 86400))
+
+def price_validators(tickers, start_date, end_date, interval, *parts):
+    """(etag, last_modified, max_age) of stored prices for a range; parts add to the etag"""
+    fetch_interval = base_interval(interval)
+    versions = [price_store.version(ticker, fetch_interval) for ticker in tickers]
+    complete = not any(price_store.missing(ticker, fetch_interval, start_date, end_date) for ticker in tickers)
+    etag = make_etag(tickers, start_date, end_date, interval, versions, *parts)
+    return etag, last_modified(*versions), HISTORY_MAX_AGE if complete else 0
+
+@app.route('/api/prices')
+@limiter.limit("120 per minute")
+def api_prices():
+    """Serve price rows as JSON pages: ?cursor=<row offset>&limit=<rows>"""
     try:
+        try:
+            q = query_from_request()
+        except ValueError:
+            return {'error': 'Invalid date format. Please use YYYY-MM-DD format.'}, 400
+        if not q:
+            return {'error': 'No price query available.'}, 400
+        
+        try:
+            cursor = max(int(request.args.get('cursor', 0)), 0)
+            limit = min(max(int(request.args.get('limit', PRICE_PAGE_SIZE)), 1), PRICE_PAGE_MAX)
+        except ValueError:
+            return {'error': 'cursor and limit must be integers.'}, 400
+        
+        # A current client costs two index lookups, before any rows are read
+        validators = price_validators([q['ticker']], q['start_date'], q['end_date'], q['interval'], q.get('max_rows'))
+        cached = not_modified(*validators)
+        if cached:
+            return cached
+        
+        page, total = price_page(q, cursor, limit, fetch='ticker' not in request.args)
+        if page is None:
+            return {'error': f"No data found for ticker '{q['ticker']}'."}, 404
+        
+        # Only the requested window is converted to JSON-friendly values
+        columns = [page.index.name or 'Date'] + [str(col) for col in page.columns]
+        floats = page.select_dtypes(include=['floating']).columns
+        page = page.astype({col: 'float64' for col in floats}).round(2)
+        page = page.astype(object).where(page.notna(), None)
+        date_format = '%Y-%m-%d %H:%M' if page.index.name == 'Datetime' else '%Y-%m-%d'
+        rows = [
+            [index.strftime(date_format)] + list(values)
+            for index, values in zip(page.index, page.itertuples(index=False, name=None))
+        ]
+        next_cursor = cursor + len(rows)
+        return with_validators({
+            'ticker': q['ticker'],
+            'columns': columns,
+            'rows': rows,
+            'total': total,
+            'cursor': cursor,
+            'next_cursor': next_cursor if next_cursor < total else None
+        }, *validators)
+    except Exception as e:
+        logger.error(f"Error serving price page: {e}")
+        return {'error': str(e)}, 500
+
+# Chart payload limits
+CHART_POINTS = 1000
+CHART_MAX_POINTS = 5000
+
+def moving_average_checks(q, data):
+    """Compare Yahoo's reported 50/200-day averages with our own SMAs over daily closes"""
+    cached = fundamentals_cache.get(q['ticker'])  # Never triggers an upstream call
+    if not cached:
+        return {}
+    info = cached[0]
+    daily = data
+    if data.attrs.get('interval') != '1d':
+        start = (datetime.strptime(q['end_date'], '%Y-%m-%d') - timedelta(days=420)).strftime('%Y-%m-%d')
+        daily = download_stock_data(q['ticker'], start, q['end_date'], '1d', cached_only=True)
+    if daily is None or daily.empty:
+        return {}
+    computed = compute_indicators(daily['Close'], ('sma50', 'sma200'))
+    checks = {}
+    for label, key, name in (('50-Day Avg', 'fiftyDayAverage', 'sma50'), ('200-Day Avg', 'twoHundredDayAverage', 'sma200')):
+        value = computed[name].iloc[-1]
+        checks[label] = {
+            'reported': info.get(key),
+            'computed': None if pd.isna(value) else round(float(value), 4),
+            'as_of': daily.index[-1].strftime('%Y-%m-%d')
+        }
+    return checks
+
+@app.route('/api/chart')
+@limiter.limit("60 per minute")
+def api_chart():
+    """Chart series as base64 typed arrays: ?points=1000&method=lttb|minmax&indicators=sma50,rsi14"""
+    try:
+        try:
+            q = query_from_request()
+        except ValueError:
+            return {'error': 'Invalid date format. Please use YYYY-MM-DD format.'}, 400
+        if not q:
+            return {'error': 'No price query available.'}, 400
+        
+        try:
+            points = min(max(int(request.args.get('points', CHART_POINTS)), 10), CHART_MAX_POINTS)
+        except ValueError:
+            return {'error': 'points must be an integer.'}, 400
+        requested = request.args.get('indicators')
+        indicators = [name for name in requested.split(',') if name in INDICATORS] if requested else INDICATORS
+        
+        # The moving-average checks also read the daily series and the stored fundamentals
+        validators = price_validators(
+            [q['ticker']], q['start_date'], q['end_date'], q['interval'], q.get('max_rows'),
+            price_store.version(q['ticker'], '1d'), fundamentals_store.fetched_at(q['ticker'])
+        )
+        cached = not_modified(*validators)
+        if cached:
+            return cached
+        
+        data = load_query_data(q, fetch='ticker' not in request.args)
+        if data is None or data.empty:
+            return {'error': f"No data found for ticker '{q['ticker']}'."}, 404
+        
+        payload = build_chart_payload(data, points, request.args.get('method', 'lttb'), indicators)
+        payload['ticker'] = q['ticker']
+        payload['interval'] = data.attrs.get('interval', q['interval'])
+        payload['checks'] = moving_average_checks(q, data)
+        return with_validators(payload, *validators)
+    except Exception as e:
+        logger.error(f"Error building chart data: {e}")
+        return {'error': str(e)}, 500
+
+XLSX_MIMETYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+# Export formats: file extension, mimetype
+EXPORT_FORMATS = {
+    'xlsx': ('xlsx', XLSX_MIMETYPE),
+    'csv': ('csv', 'text/csv'),
+    'parquet': ('parquet', 'application/vnd.apache.parquet'),
+    'arrow': ('arrow', 'application/vnd.apache.arrow.file'),
+}
+EXPORT_FORMATS['feather'] = EXPORT_FORMATS['arrow']
+PARQUET_COMPRESSION = os.environ.get('PARQUET_COMPRESSION', 'zstd')
+# CSV exports up to this many rows are encoded in memory so they carry X-Export-Bytes like the
+# other formats (a few MB at most); longer ones are streamed and only log their size
+CSV_BUFFER_ROWS = int(os.environ.get('CSV_BUFFER_ROWS', 50000))
+
+def stream_download(path, filename, mimetype, max_age=300, validators=None):
+    """Stream a finished export file to the client in chunks and delete it afterwards"""
+    size = os.path.getsize(path)
+    # Not direct_passthrough: werkzeug then skips the response's close callbacks. The server closes
+    # every response, so the file is removed even for HEAD requests and bodies that were never read.
+    response = Response(iter_file_chunks(path), mimetype=mimetype)
+    response.call_on_close(lambda: remove_file(path))
+    response.headers['Content-Disposition'] = f'attachment; filename="{filename}"'
+    response.headers['Content-Length'] = str(size)
+    response.headers['X-Export-Bytes'] = str(size)  # Lets clients compare format sizes
+    if validators:
+        return with_validators(response, *validators)
+    response.cache_control.max_age = max_age
+    return response
+
+def export_last_query(export_format):
+    """Build the download response for the last query's price data in one format"""
+    try:
+        export_format = export_format.lower()
+        if export_format not in EXPORT_FORMATS:
+            return f"Unsupported export format '{export_format}'. Choose one of: {', '.join(EXPORT_FORMATS)}.", 400
+        
         if 'last_query' not in session:
             return "No price data available to download.", 400
         
         q = session['last_query']
-        data = download_stock_data(q['ticker'], q['start_date'], q['end_date'], q['interval'])
+        # A client holding this export of the same stored data gets a 304 before anything is loaded
+        validators = price_validators(
+            [q['ticker']], q['start_date'], q['end_date'], q['interval'], q.get('max_rows'), export_format
+        )
+        cached = not_modified(*validators)
+        if cached:
+            return cached
+        
+        with metrics.timer('prices'):
+            data = load_query_data(q)
         
         if data is None or data.empty:
             return "No price data available to download.", 400
         
-        # Create Excel file in memory
-        output = io.BytesIO()
+        extension, mimetype = EXPORT_FORMATS[export_format]
+        filename = f"{q['ticker']}_price_data.{extension}"
         
-        try:
-            # Flatten MultiIndex columns if present
-            if isinstance(data.columns, pd.MultiIndex):
-                data.columns = ['_'.join([str(i) for i in col if i]) for col in data.columns.values]
-            
-            # Optimize Excel export
-            with pd.ExcelWriter(output, engine='openpyxl') as writer:
-                data.reset_index().to_excel(
-                    writer, 
-                    sheet_name='Price Data',
-                    index=False,
-                    float_format="%.2f"  # Limit decimal places
-                )
-                
-                # Set column widths for better readability
-                worksheet = writer.sheets['Price Data']
-                for i, col in enumerate(data.reset_index().columns):
-                    max_length = max(data.reset_index()[col].astype(str).map(len).max(), len(str(col)))
-                    worksheet.column_dimensions[chr(65 + i)].width = max_length + 2
+        if export_format == 'csv':
+            def log_size(total):
+                logger.info(f"Exported {q['ticker']} as csv: {total} bytes")
+            if len(data) <= CSV_BUFFER_ROWS:
+                body = b''.join(iter_csv_chunks(data, on_complete=log_size))
+                response = Response(body, mimetype=mimetype)
+                response.headers['X-Export-Bytes'] = str(len(body))  # Lets clients compare format sizes
+            else:
+                # Stream row chunks as they are encoded; the size is only known at the end
+                response = Response(iter_csv_chunks(data, on_complete=log_size), mimetype=mimetype)
+            response.headers['Content-Disposition'] = f'attachment; filename="{filename}"'
+            return with_validators(response, *validators)
         
+        path = temp_path(f'.{extension}')
+        try:
+            with metrics.timer(f'write_{export_format}'):
+                if export_format == 'xlsx':
+                    # Write-only workbook on disk keeps memory flat for long histories
+                    analytics = analytics_to_json(compute_analytics(
+                        price_matrix({q['ticker']: data}), data.attrs.get('interval', q['interval'])
+                    ))
+                    write_excel(path, [('Price Data', data)] + analytics_sheets(analytics)[:1])
+                elif export_format == 'parquet':
+                    write_parquet(path, data, compression=PARQUET_COMPRESSION)
+                else:
+                    write_arrow(path, data)
+        except ImportError:
+            os.remove(path)
+            return f"The {export_format} export requires pyarrow, which is not installed.", 501
         except Exception as e:
-            error_message = f"Error writing Excel file: {str(e)}"
+            os.remove(path)
+            error_message = f"Error writing {export_format} file: {str(e)}"
             logger.error(error_message)  # Log error for debugging
             return error_message, 500
         
-        output.seek(0)
-        filename = f"{q['ticker']}_price_data.xlsx"
-        return send_file(
-            output, 
-            as_attachment=True, 
-            download_name=filename, 
-            mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-            max_age=300  # Cache for 5 minutes
+        logger.info(f"Exported {q['ticker']} as {export_format}: {os.path.getsize(path)} bytes")
+        return stream_download(path, filename, mimetype, validators=validators)
+    except Exception as e:
+        error_message = f"An error occurred while generating the export: {str(e)}"
+        logger.error(error_message)  # Log error for debugging
+        return error_message, 500
+
+@app.route('/export')
+@limiter.limit("10 per minute")
+def export():
+    """Download the last query's price data as xlsx, csv, parquet or arrow (?format=).
+
+    X-Export-Bytes carries the file size, except for CSVs longer than
+    CSV_BUFFER_ROWS rows, which are streamed as they are encoded.
+    """
+    return export_last_query(request.args.get('format', 'xlsx'))
+
+@app.route('/download_excel')
+@limiter.limit("10 per minute")
+def download_excel():
+    return export_last_query('xlsx')
+
+# Batch mode limits
+BATCH_MAX_TICKERS = int(os.environ.get('BATCH_MAX_TICKERS', 200))
+BATCH_MAX_WORKERS = int(os.environ.get('BATCH_MAX_WORKERS', 8))  # Concurrent fundamentals fetches
+
+def parse_tickers(raw):
+    """Split a comma/space/newline separated list into unique upper-case tickers"""
+    tickers = []
+    for token in re.split(r'[\s,;]+', raw.upper()):
+        if token and token not in tickers:
+            tickers.append(token)
+    return tickers
+
+def fetch_batch_ratios(tickers):
+    """Fetch financial ratios for many tickers through a bounded thread pool"""
+    with ThreadPoolExecutor(max_workers=max(1, min(BATCH_MAX_WORKERS, len(tickers)))) as pool:
+        # One info call per ticker: the pool threads share the caller's upstream patience
+        futures = {
+            ticker: pool.submit(contextvars.copy_context().run, get_financial_ratios, ticker) for ticker in tickers
+        }
+    return {ticker: future.result() for ticker, future in futures.items()}
+
+def summarize_batch(tickers, frames, ratios):
+    """Build the one-row-per-ticker summary, reporting failures instead of raising"""
+    rows = []
+    for ticker in tickers:
+        data = frames.get(ticker)
+        info = ratios.get(ticker) or {}
+        company = info.get('Company Information', {})
+        valuation = info.get('Valuation Ratios', {})
+        has_prices = data is not None and not data.empty
+        errors = []
+        if not has_prices:
+            hint = symbol_hint(ticker)
+            errors.append(f'No price data found ({hint.strip()})' if hint else 'No price data found')
+        elif data.attrs.get('missing_windows'):
+            errors.append('Prices missing for ' + ', '.join(f'{start} to {end}' for start, end in data.attrs['missing_windows']))
+        if not info:
+            errors.append('Financial ratios unavailable')
+        rows.append({
+            'Ticker': ticker,
+            'Status': 'OK' if not errors else ('Partial' if has_prices else 'Failed'),
+            'Rows': len(data) if has_prices else 0,
+            'First Date': data.index[0].strftime('%Y-%m-%d') if has_prices else None,
+            'Last Date': data.index[-1].strftime('%Y-%m-%d') if has_prices else None,
+            'Last Close': float(data['Close'].iloc[-1]) if has_prices and 'Close' in data else None,
+            'Name': company.get('Name', 'N/A'),
+            'Sector': company.get('Sector', 'N/A'),
+            'Market Cap': valuation.get('Market Cap', 'N/A'),
+            'P/E (TTM)': valuation.get('P/E (TTM)', 'N/A'),
+            'Errors': '; '.join(errors)
+        })
+    return pd.DataFrame(rows)
+
+def sheet_name_for(ticker):
+    """Excel sheet names are limited to 31 characters and may not contain []:*?/\\"""
+    return re.sub(r'[\[\]:*?/\\]', '_', ticker)[:31]
+
+BATCH_SYNC_MAX = int(os.environ.get('BATCH_SYNC_MAX', 10))  # Larger batches run as background jobs
+
+def build_batch_export(tickers, start_date, end_date, interval, output_format, job=None, benchmark=None):
+    """Fetch a batch and write it to a temporary workbook or zip; returns the file details"""
+    frames = download_batch_data(tickers + ([benchmark] if benchmark and benchmark not in tickers else []),
+                                 start_date, end_date, interval)
+    if job:
+        job.check()
+    analytics = get_analytics(tickers, start_date, end_date, interval, benchmark, frames=frames)
+    if job:
+        job.check()
+    ratios = fetch_batch_ratios(tickers)
+    if job:
+        job.check()
+    summary = summarize_batch(tickers, frames, ratios)
+    logger.info(f"Batch of {len(tickers)} tickers: {int((summary['Status'] != 'Failed').sum())} with price data")
+    
+    sheets = [(ticker, frames.get(ticker)) for ticker in tickers]
+    sheets = [(ticker, data) for ticker, data in sheets if data is not None and not data.empty]
+    if output_format != 'zip':
+        output_format = 'xlsx'
+    path = temp_path(f'.{output_format}')
+    try:
+        if output_format == 'zip':
+            with zipfile.ZipFile(path, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+                archive.writestr('summary.csv', summary.to_csv(index=False))
+                for name, table in analytics_sheets(analytics):
+                    archive.writestr(f"{name.lower()}.csv", table.to_csv())
+                for ticker, data in sheets:
+                    if job:
+                        job.check()
+                    with archive.open(f"{ticker}.csv", 'w') as member, \
+                            io.TextIOWrapper(member, encoding='utf-8', newline='') as text:
+                        data.to_csv(text, float_format='%.4f')
+            mimetype = 'application/zip'
+        else:
+            write_excel(path, [('Summary', summary.set_index('Ticker'))] + analytics_sheets(analytics) +
+                        [(sheet_name_for(ticker), data) for ticker, data in sheets])
+            mimetype = XLSX_MIMETYPE
+    except BaseException:
+        # A cancelled job or a failed write leaves no half-written file behind
+        remove_file(path)
+        raise
+    
+    return {'path': path, 'filename': f"batch_{len(tickers)}_tickers.{output_format}", 'mimetype': mimetype}
+
+def run_batch_job(params, job):
+    with upstream.patience(UPSTREAM_BATCH_MAX_WAIT):
+        return build_batch_export(
+            params['tickers'], params['start_date'], params['end_date'], params['interval'], params['format'],
+            job=job, benchmark=params.get('benchmark')
         )
+
+# A batch that finishes after its job was cancelled or timed out leaves a file nobody will download
+job_queue.register('batch', run_batch_job, discard=lambda result: remove_file(result['path']))
+
+@app.route('/batch', methods=['POST'])
+@limiter.limit("10 per minute")
+def batch():
+    """Download prices and ratios for many tickers as one workbook or a zip of CSV files"""
+    try:
+        tickers = parse_tickers(request.form.get('tickers', ''))
+        start_date = request.form['start']
+        end_date = request.form['end']
+        interval = request.form['interval']
+        output_format = request.form.get('format', 'xlsx')
+        benchmark = request.form.get('benchmark', '').upper().strip() or None
+        
+        if not tickers:
+            return "Please enter at least one ticker symbol.", 400
+        if len(tickers) > BATCH_MAX_TICKERS:
+            return f"Too many tickers: at most {BATCH_MAX_TICKERS} per batch.", 400
+        if interval_error(interval):
+            return interval_error(interval), 400
+        errors = [error for error in map(unknown_symbol_error, tickers + ([benchmark] if benchmark else [])) if error]
+        if errors:
+            return ' '.join(errors), 400
+        
+        # Validate dates
+        try:
+            start = datetime.strptime(start_date, '%Y-%m-%d')
+            end = datetime.strptime(end_date, '%Y-%m-%d')
+            if end <= start:
+                return "End date must be after start date.", 400
+        except ValueError:
+            return "Invalid date format. Please use YYYY-MM-DD format.", 400
+        
+        if len(tickers) > BATCH_SYNC_MAX or is_intraday(interval):
+            job_id = job_queue.submit('batch', {
+                'tickers': tickers, 'start_date': start_date, 'end_date': end_date,
+                'interval': interval, 'format': output_format, 'benchmark': benchmark
+            })
+            return render_template('index.html', job=job_status_payload(job_queue.status(job_id)))
+        
+        # A small batch still makes one info call per ticker; wait for tokens rather than drop tickers
+        with upstream.patience(UPSTREAM_BATCH_MAX_WAIT):
+            export = build_batch_export(tickers, start_date, end_date, interval, output_format, benchmark=benchmark)
+        return stream_download(export['path'], export['filename'], export['mimetype'], max_age=0)
     except Exception as e:
-        error_message = f"An error occurred while generating Excel file: {str(e)}"
+        error_message = f"An error occurred while generating the batch download: {str(e)}"
         logger.error(error_message)  # Log error for debugging
         return error_message, 500
 
+@app.route('/api/analytics')
+@limiter.limit("30 per minute")
+def api_analytics():
+    """Returns, volatility, drawdown, beta and correlation: ?tickers=AAPL,MSFT&start=&end=&interval=&benchmark=SPY"""
+    try:
+        tickers = parse_tickers(request.args.get('tickers', ''))
+        start_date = request.args.get('start', '')
+        end_date = request.args.get('end', '')
+        interval = request.args.get('interval', '1d')
+        benchmark = request.args.get('benchmark', '').upper().strip() or None
+        
+        if not tickers:
+            return {'error': 'Please provide at least one ticker.'}, 400
+        if len(tickers) > BATCH_MAX_TICKERS:
+            return {'error': f'Too many tickers: at most {BATCH_MAX_TICKERS}.'}, 400
+        if interval_error(interval):
+            return {'error': interval_error(interval)}, 400
+        try:
+            if datetime.strptime(end_date, '%Y-%m-%d') <= datetime.strptime(start_date, '%Y-%m-%d'):
+                return {'error': 'End date must be after start date.'}, 400
+        except ValueError:
+            return {'error': 'Invalid date format. Please use YYYY-MM-DD format.'}, 400
+        
+        # Validators come from the store versions alone, so a current client never pays for the analytics
+        symbols = sorted(set(tickers) | ({benchmark} if benchmark else set()))
+        validators = price_validators(symbols, start_date, end_date, interval, benchmark)
+        cached = not_modified(*validators)
+        if cached:
+            return cached
+        
+        analytics = get_analytics(tickers, start_date, end_date, interval, benchmark)
+        if analytics is None:
+            return {'error': 'No price data found for these tickers.'}, 404
+        # Computing may have fetched missing bars, which changes the versions
+        return with_validators(analytics, *price_validators(symbols, start_date, end_date, interval, benchmark))
+    except Exception as e:
+        logger.error(f"Error computing analytics: {e}")
+        return {'error': str(e)}, 500
+
+SYMBOL_SEARCH_LIMIT = 10
+
+@app.route('/api/symbols')
+@limiter.limit("300 per minute")
+def api_symbols():
+    """Ticker autocomplete from the local symbol index: ?q=appl&limit=10 (prefix, name and fuzzy matches)"""
+    limit = min(max(request.args.get('limit', SYMBOL_SEARCH_LIMIT, type=int), 1), 50)
+    response = make_response({'results': symbol_index.search(request.args.get('q', '')[:40], limit)})
+    response.cache_control.max_age = 3600  # Same answer for every user until the list is refreshed
+    return response
+
+SCREENER_LIMIT = 100
+SCREENER_MAX_LIMIT = 1000
+
+@app.route('/api/screener')
+@limiter.limit("60 per minute")
+def api_screener():
+    """Screen stored fundamentals: ?q=P/E < 15 and ROE > 20%&sort=EV/EBITDA&limit=&format=display|raw
+
+    Answers from the local fundamentals store only; tickers enter it when
+    their fundamentals are fetched (single lookups and batches).
+    """
+    try:
+        limit = min(max(request.args.get('limit', SCREENER_LIMIT, type=int), 1), SCREENER_MAX_LIMIT)
+        # The store's version bumps on every write, so an unchanged universe answers with a 304
+        validators = (make_etag(sorted(request.args.items(multi=True)), fundamentals_store.version()), None, 0)
+        cached = not_modified(*validators)
+        if cached:
+            return cached
+        frame = fundamentals_store.frame()
+        result, total = screen(frame, request.args.get('q', ''), request.args.get('sort'), limit)
+        if request.args.get('format', 'display') == 'raw':
+            rows = result.astype(object).where(result.notna(), None)
+        else:
+            rows = format_frame(result)
+        return with_validators({
+            'total': total,
+            'universe': len(frame),
+            'columns': ['ticker'] + list(rows.columns),
+            'rows': [[ticker] + values for ticker, values in zip(rows.index, rows.values.tolist())],
+        }, *validators)
+    except ScreenError as e:
+        return {'error': str(e)}, 400
+    except Exception as e:
+        logger.error(f"Error running screen: {e}")
+        return {'error': str(e)}, 500
+
+def job_status_payload(job):
+    """Public view of a job: no server paths, plus where to pick up the result"""
+    payload = {key: job[key] for key in ('id', 'kind', 'status', 'error', 'params')}
+    if job['kind'] == 'batch' and job['status'] == 'done':
+        payload['result_url'] = url_for('job_result', job_id=job['id'])
+    return payload
+
+@app.route('/jobs/<job_id>')
+@limiter.limit("120 per minute")
+def job_status(job_id):
+    """Poll a background job"""
+    job = job_queue.status(job_id)
+    if job is None:
+        return {'error': 'Unknown job.'}, 404
+    return job_status_payload(job)
+
+@app.route('/jobs/<job_id>/cancel', methods=['POST'])
+@limiter.limit("30 per minute")
+def job_cancel(job_id):
+    """Cancel a queued or running background job"""
+    if job_queue.status(job_id) is None:
+        return {'error': 'Unknown job.'}, 404
+    job_queue.cancel(job_id)
+    return job_status_payload(job_queue.status(job_id))
+
+@app.route('/jobs/<job_id>/result')
+@limiter.limit("10 per minute")
+def job_result(job_id):
+    """Download the file produced by a finished batch job (available once)"""
+    job = job_queue.status(job_id)
+    if job is None or job['kind'] != 'batch' or job['status'] != 'done':
+        return "This job has no downloadable result.", 404
+    result = job['result']
+    if not os.path.exists(result['path']):
+        return "This download has expired. Please run the batch again.", 410
+    return stream_download(result['path'], result['filename'], result['mimetype'], max_age=0)
+
 @app.route('/debug-dividend/<ticker>')
 def debug_dividend(ticker):
     """Debug endpoint to check raw dividend data"""
@@ -531,10 +1616,9 @@ def debug_dividend(ticker):
             return {"error": "This endpoint is only available in development mode"}, 403
             
         # Clear the cache for this ticker
-        get_financial_ratios.cache_clear()
+        fundamentals_cache.invalidate(ticker.upper())
         
-        stock = yf.Ticker(ticker.upper())
-        info = stock.info
+        info = Fundamentals(ticker.upper()).info
         
         # Raw data
         dividend_fields = {k: info.get(k) for k in info if 'dividend' in k.lower() or k in ['exDividendDate', 'dividendDate', 'payoutRatio']}
@@ -567,11 +1651,81 @@ def debug_dividend(ticker):
     except Exception as e:
         return {'error': str(e)}
 
+def cache_counters():
+    """Per-worker cache and coalescing counters, read by the metrics snapshot"""
+    samples = []
+    for name, counters in [('prices', price_store.counters), ('fundamentals', fundamentals_cache.counters),
+                           ('analytics', analytics_cache.counters)]:
+        samples.extend(('cache_requests_total', {'cache': name, 'result': result}, count)
+                       for result, count in counters.items())
+    samples.extend(('singleflight_total', {'event': event}, count)
+                   for event, count in upstream_flight.stats().items())
+    return samples
+
+metrics.add_collector(cache_counters)
+
+@app.route('/metrics')
+@limiter.exempt
+def prometheus_metrics():
+    """Prometheus text-format metrics aggregated across all workers"""
+    metrics.flush(force=True)
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/stats')
+@limiter.exempt
+def stats():
+    """Per-worker counters for upstream request coalescing, plus the shared upstream budget"""
+    return {'pid': os.getpid(), 'singleflight': upstream_flight.stats(), 'upstream': upstream.state(),
+            'boot': boot_timings}
+
 @app.route('/robots.txt')
 def static_from_root():
     return send_file('static/robots.txt')
 
+# Popular tickers fetched into the shared caches when a worker boots, before it accepts traffic
+WARMUP_TICKERS = [t for t in re.split(r'[\s,]+', os.environ.get('WARMUP_TICKERS', '').upper()) if t]
+WARMUP_DAYS = int(os.environ.get('WARMUP_DAYS', 365))  # Daily history warmed per ticker
+WARMUP_DEADLINE = float(os.environ.get('WARMUP_DEADLINE', 30))  # Seconds; keep it under GUNICORN_TIMEOUT
+
+def warm_up(tickers=None, deadline=WARMUP_DEADLINE, notify=None):
+    """Fetch daily prices and fundamentals of popular tickers into the caches.
+
+    The stores are shared, so only the first worker to boot reaches the
+    upstream and the others find the data stored. Stops at the deadline or
+    when the upstream is unavailable and never raises: a failed warm-up only
+    means slower first requests. notify() is called after each ticker (the
+    gunicorn worker heartbeat). Returns the number of tickers warmed.
+    """
+    tickers = WARMUP_TICKERS if tickers is None else tickers
+    if not tickers:
+        return 0
+    started = time.perf_counter()
+    end_date = datetime.now().strftime('%Y-%m-%d')
+    start_date = (datetime.now() - timedelta(days=WARMUP_DAYS)).strftime('%Y-%m-%d')
+    warmed = 0
+    for ticker in tickers:
+        if time.perf_counter() - started > deadline or upstream.is_open():
+            logger.warning(f"Warm-up stopped after {warmed} of {len(tickers)} tickers")
+            break
+        try:
+            data = download_stock_data(ticker, start_date, end_date, '1d')
+            get_financial_ratios(ticker)
+            if data is not None and not data.empty:
+                warmed += 1
+        except Exception as e:
+            logger.warning(f"Warm-up of {ticker} failed: {e}")
+        if notify:
+            notify()
+    seconds = time.perf_counter() - started
+    boot_timings.update(warmup_seconds=round(seconds, 3), warmed=warmed)
+    logger.info(f"Warmed {warmed} of {len(tickers)} tickers in {seconds:.2f}s (pid {os.getpid()})")
+    return warmed
+
+boot_timings['import_seconds'] = round(time.perf_counter() - BOOT_STARTED, 3)
+logger.info(f"App imported in {boot_timings['import_seconds']:.2f}s (pid {os.getpid()})")
+
 if __name__ == '__main__':
+    warm_up()
     port = int(os.environ.get('PORT', 5000))
     debug = os.environ.get('FLASK_ENV') == 'development'
     app.run(host='0.0.0.0', port=port, debug=debug)
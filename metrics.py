@@ -0,0 +1,184 @@
+import glob
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+# Histogram buckets: seconds for latencies, bytes for response sizes
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+SIZE_BUCKETS = (1024, 10 * 1024, 100 * 1024, 1024 ** 2, 10 * 1024 ** 2, 100 * 1024 ** 2)
+
+
+class Metrics:
+    """Counters and histograms aggregated across gunicorn workers.
+
+    Each worker keeps its samples in memory and periodically writes a
+    snapshot to ``<directory>/<pid>.json``; render() merges the snapshots of
+    every worker (live or exited, so counters never go backwards) into the
+    Prometheus text format. Collectors registered with add_collector() are
+    called at snapshot time for counters that live elsewhere (e.g. cache
+    hit counts).
+    """
+
+    def __init__(self, directory=None, flush_interval=1.0):
+        self.directory = directory
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.flush_interval = flush_interval
+        self.on_timing = None  # Called as on_timing(stage, seconds) after each timed stage
+        self._lock = threading.Lock()
+        self._help = {}
+        self._counters = {}
+        self._histograms = {}
+        self._collectors = []
+        self._flushed_at = 0.0
+
+    def describe(self, name, kind, help_text, buckets=None):
+        """Declare a metric's type ('counter' or 'histogram'), help text and buckets"""
+        self._help[name] = {'type': kind, 'help': help_text, 'buckets': list(buckets or LATENCY_BUCKETS)}
+
+    def add_collector(self, collector):
+        """Register collector() -> [(counter name, labels dict, value), ...]"""
+        self._collectors.append(collector)
+
+    def inc(self, name, amount=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def observe(self, name, value, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        buckets = self._help.get(name, {}).get('buckets', LATENCY_BUCKETS)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = {'buckets': [0] * len(buckets), 'sum': 0.0, 'count': 0}
+            for i, bound in enumerate(buckets):
+                if value <= bound:
+                    histogram['buckets'][i] += 1
+            histogram['sum'] += value
+            histogram['count'] += 1
+
+    @contextmanager
+    def timer(self, stage, **labels):
+        """Time a block into the stage_seconds histogram (and the on_timing hook)"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage, time.perf_counter() - start, **labels)
+
+    def record(self, stage, seconds, **labels):
+        """Record a stage duration measured elsewhere (e.g. on a pool thread)"""
+        self.observe('stage_seconds', seconds, stage=stage, **labels)
+        if self.on_timing:
+            self.on_timing(stage, seconds)
+
+    def snapshot(self):
+        """This worker's samples as a JSON-serializable dict"""
+        counters = []
+        for collector in self._collectors:
+            try:
+                counters.extend([name, labels, value] for name, labels, value in collector())
+            except Exception as e:
+                logger.warning(f"Metrics collector failed: {e}")
+        with self._lock:
+            counters.extend([name, dict(labels), value] for (name, labels), value in self._counters.items())
+            histograms = [
+                [name, dict(labels), {'buckets': list(h['buckets']), 'sum': h['sum'], 'count': h['count']}]
+                for (name, labels), h in self._histograms.items()
+            ]
+        return {'counters': counters, 'histograms': histograms}
+
+    def flush(self, force=False):
+        """Write this worker's snapshot, at most once per flush_interval unless forced"""
+        now = time.monotonic()
+        if not self.directory or (not force and now - self._flushed_at < self.flush_interval):
+            return
+        self._flushed_at = now
+        path = os.path.join(self.directory, f'{os.getpid()}.json')
+        tmp = f'{path}.{threading.get_ident()}.tmp'
+        try:
+            with open(tmp, 'w') as f:
+                json.dump(self.snapshot(), f)
+            os.replace(tmp, path)  # Readers never see a half-written file
+        except OSError as e:
+            logger.warning(f"Could not write metrics snapshot: {e}")
+
+    def collect(self):
+        """Merge the snapshots of all workers, using live samples for this one"""
+        snapshots = [self.snapshot()]
+        if self.directory:
+            own = os.path.join(self.directory, f'{os.getpid()}.json')
+            for path in glob.glob(os.path.join(self.directory, '*.json')):
+                if path == own:
+                    continue
+                try:
+                    with open(path) as f:
+                        snapshots.append(json.load(f))
+                except (OSError, ValueError):
+                    continue  # Being replaced right now; picked up on the next scrape
+        counters, histograms = {}, {}
+        for snapshot in snapshots:
+            for name, labels, value in snapshot['counters']:
+                key = (name, tuple(sorted(labels.items())))
+                counters[key] = counters.get(key, 0) + value
+            for name, labels, h in snapshot['histograms']:
+                key = (name, tuple(sorted(labels.items())))
+                merged = histograms.setdefault(key, {'buckets': [0] * len(h['buckets']), 'sum': 0.0, 'count': 0})
+                merged['buckets'] = [a + b for a, b in zip(merged['buckets'], h['buckets'])]
+                merged['sum'] += h['sum']
+                merged['count'] += h['count']
+        return counters, histograms
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format"""
+        counters, histograms = self.collect()
+        lines = []
+        for name in sorted({key[0] for key in counters}):
+            self._header(lines, name, 'counter')
+            for (metric, labels), value in sorted(counters.items()):
+                if metric == name:
+                    lines.append(f'{name}{_labels(labels)} {_number(value)}')
+        for name in sorted({key[0] for key in histograms}):
+            self._header(lines, name, 'histogram')
+            buckets = self._help.get(name, {}).get('buckets', LATENCY_BUCKETS)
+            for (metric, labels), h in sorted(histograms.items()):
+                if metric != name:
+                    continue
+                for bound, count in zip(buckets, h['buckets']):
+                    lines.append(f'{name}_bucket{_labels(labels + (("le", _number(bound)),))} {count}')
+                lines.append(f'{name}_bucket{_labels(labels + (("le", "+Inf"),))} {h["count"]}')
+                lines.append(f'{name}_sum{_labels(labels)} {_number(h["sum"])}')
+                lines.append(f'{name}_count{_labels(labels)} {h["count"]}')
+        return '\n'.join(lines) + '\n'
+
+    def _header(self, lines, name, kind):
+        help_text = self._help.get(name, {}).get('help')
+        if help_text:
+            lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} {kind}')
+
+
+def _labels(labels):
+    if not labels:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in labels)
+    return '{' + ','.join(f'{key}="{value}"' for (key, _), value in zip(labels, escaped)) + '}'
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) and not float(value).is_integer() else str(int(value))
+
+
+def clear_snapshots(directory):
+    """Remove the snapshots of a previous server run (called once by the gunicorn master)"""
+    for path in glob.glob(os.path.join(directory, '*.json')):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
@@ -0,0 +1,446 @@
+import logging
+import time
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+
+import pandas as pd
+
+from db import SQLiteDB
+
+logger = logging.getLogger(__name__)
+
+# Columns kept in the store, in the order they are returned
+PRICE_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Adj Close', 'Volume']
+
+# Stored rows converted to a DataFrame at a time when reading
+READ_CHUNK_ROWS = 50000
+
+# Upstream limits for intraday bars, in days: (longest range one request may
+# cover, how far back the upstream keeps bars at all)
+INTRADAY_LIMITS = {
+    '1m': (7, 30),
+    '2m': (59, 60),
+    '5m': (59, 60),
+    '15m': (59, 60),
+    '30m': (59, 60),
+    '90m': (59, 60),
+    '60m': (729, 730),
+    '1h': (729, 730),
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS prices (
+    ticker TEXT NOT NULL,
+    interval TEXT NOT NULL,
+    ts INTEGER NOT NULL,
+    open REAL, high REAL, low REAL, close REAL, adj_close REAL, volume INTEGER,
+    PRIMARY KEY (ticker, interval, ts)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS coverage (
+    ticker TEXT NOT NULL,
+    interval TEXT NOT NULL,
+    start TEXT NOT NULL,
+    end TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS coverage_series ON coverage (ticker, interval);
+CREATE TABLE IF NOT EXISTS series (
+    ticker TEXT NOT NULL,
+    interval TEXT NOT NULL,
+    tz TEXT,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (ticker, interval)
+);
+"""
+
+
+def _parse_date(value):
+    """Accept 'YYYY-MM-DD' strings, dates or datetimes and return a date"""
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return datetime.strptime(value, '%Y-%m-%d').date()
+
+
+def merge_ranges(ranges):
+    """Merge overlapping or touching [start, end) date ranges"""
+    merged = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def missing_ranges(covered, start, end):
+    """Return the parts of [start, end) that are not inside any covered range"""
+    gaps = []
+    cursor = start
+    for cov_start, cov_end in merge_ranges(covered):
+        if cov_end <= cursor:
+            continue
+        if cov_start >= end:
+            break
+        if cov_start > cursor:
+            gaps.append((cursor, cov_start))
+        cursor = max(cursor, cov_end)
+        if cursor >= end:
+            break
+    if cursor < end:
+        gaps.append((cursor, end))
+    return gaps
+
+
+def split_range(start, end, days):
+    """Split [start, end) into consecutive windows of at most `days` days"""
+    windows = []
+    while start < end:
+        windows.append((start, min(end, start + timedelta(days=days))))
+        start = windows[-1][1]
+    return windows
+
+
+def plan_windows(interval, start, end, today=None):
+    """Split a gap into windows one upstream request can serve.
+
+    Returns (windows to fetch, windows older than the upstream keeps for this
+    interval). Daily and coarser intervals are fetched as one window.
+    """
+    limits = INTRADAY_LIMITS.get(interval)
+    if limits is None:
+        return [(start, end)], []
+    span, horizon = limits
+    earliest = (today or date.today()) - timedelta(days=horizon - 1)
+    unavailable = [(start, min(end, earliest))] if start < earliest else []
+    return split_range(max(start, earliest), end, span), unavailable
+
+
+def _rows_frame(rows, tz):
+    """DataFrame from stored (ts, open, ..., volume) rows"""
+    data = pd.DataFrame.from_records(rows, columns=['ts'] + PRICE_COLUMNS)
+    index = pd.to_datetime(data.pop('ts'), unit='s')
+    if tz is not None:
+        index = index.dt.tz_localize('UTC').dt.tz_convert(tz)
+    data.index = pd.DatetimeIndex(index, name='Datetime' if tz else 'Date')
+    prices = data.columns.drop('Volume')
+    data[prices] = data[prices].astype('float64')
+    if data['Volume'].notna().all():
+        data['Volume'] = data['Volume'].astype('int64')
+    return data
+
+
+def _iso_windows(ranges):
+    return [(start.isoformat(), end.isoformat()) for start, end in merge_ranges(ranges)]
+
+
+def normalize_frame(data, ticker=None):
+    """Flatten a yf.download frame for one ticker into the store's column layout.
+
+    ticker=None takes the only symbol of a single-symbol download; a named
+    ticker missing from a grouped answer gets an empty frame, never another
+    symbol's bars.
+    """
+    if data is None or data.empty:
+        return pd.DataFrame(columns=PRICE_COLUMNS)
+    if isinstance(data.columns, pd.MultiIndex):
+        # yf.download returns (Price, Ticker) columns even for a single symbol
+        symbols = data.columns.get_level_values(-1).unique()
+        if ticker is not None and ticker in symbols:
+            data = data.xs(ticker, axis=1, level=-1)
+        elif ticker is None and len(symbols) == 1:
+            data = data.droplevel(-1, axis=1)
+        else:
+            return pd.DataFrame(columns=PRICE_COLUMNS)
+    data = data.loc[:, [c for c in PRICE_COLUMNS if c in data.columns]]
+    return data.dropna(how='all')
+
+
+class PriceStore:
+    """SQLite-backed OHLCV store keyed by ticker and interval.
+
+    Tracks which [start, end) date ranges have already been fetched for each
+    series, asks the upstream fetcher only for the gaps and serves the
+    requested slice from disk. Intraday gaps longer than one upstream request
+    may cover are fetched as parallel windows (at most ``window_workers`` at
+    a time); windows the upstream could not serve are listed in the result's
+    ``attrs['missing_windows']``. The fetcher is any callable with the signature
+    ``fetcher(ticker, start_date, end_date, interval, timeout)`` returning a
+    ``yf.download``-shaped DataFrame (or None on failure); ``ticker`` is a
+    list when several symbols are fetched in one grouped call.
+    """
+
+    def __init__(self, path, fetcher, window_workers=4):
+        self.db = SQLiteDB(path, SCHEMA)
+        self.fetcher = fetcher
+        self.window_workers = window_workers
+        self.counters = {'hit': 0, 'miss': 0}  # Queries served without / with an upstream fetch
+
+    def covered_ranges(self, ticker, interval):
+        """Return the merged date ranges already stored for a series"""
+        rows = self.db.connect().execute(
+            'SELECT start, end FROM coverage WHERE ticker = ? AND interval = ?',
+            (ticker, interval)
+        ).fetchall()
+        return merge_ranges((_parse_date(s), _parse_date(e)) for s, e in rows)
+
+    def missing(self, ticker, interval, start_date, end_date):
+        """Return the date ranges that would have to be fetched for a query"""
+        start, end = _parse_date(start_date), _parse_date(end_date)
+        return missing_ranges(self.covered_ranges(ticker, interval), start, end)
+
+    def get(self, ticker, start_date, end_date, interval, timeout=15):
+        """Return prices for [start_date, end_date), fetching only missing gaps"""
+        missing_windows = self.fill(ticker, start_date, end_date, interval, timeout)
+        data = self.read(ticker, start_date, end_date, interval)
+        data.attrs['missing_windows'] = missing_windows
+        return data
+
+    def get_many(self, tickers, start_date, end_date, interval, timeout=30):
+        """Return {ticker: prices} for several symbols (see fill_many)"""
+        missing_windows = self.fill_many(tickers, start_date, end_date, interval, timeout)
+        frames = {}
+        for ticker in tickers:
+            frames[ticker] = self.read(ticker, start_date, end_date, interval)
+            frames[ticker].attrs['missing_windows'] = missing_windows[ticker]
+        return frames
+
+    def fill(self, ticker, start_date, end_date, interval, timeout=15):
+        """Fetch the gaps of [start_date, end_date) into the store without reading it.
+
+        Returns the (start, end) ISO date windows the upstream could not serve.
+        """
+        gaps = self.missing(ticker, interval, start_date, end_date)
+        self.counters['miss' if gaps else 'hit'] += 1
+        unserved = []
+        for gap_start, gap_end in gaps:
+            unserved += self._fill_gap([ticker], interval, gap_start, gap_end, timeout)[ticker]
+        return _iso_windows(unserved)
+
+    def fill_many(self, tickers, start_date, end_date, interval, timeout=30):
+        """fill() for several symbols; returns {ticker: unserved windows}.
+
+        Tickers missing the same date ranges are fetched together in one
+        grouped upstream call per range instead of one call per symbol. A
+        failed group or ticker only shows up in its own unserved windows.
+        """
+        by_gaps = {}
+        for ticker in tickers:
+            gaps = tuple(self.missing(ticker, interval, start_date, end_date))
+            self.counters['miss' if gaps else 'hit'] += 1
+            if gaps:
+                by_gaps.setdefault(gaps, []).append(ticker)
+        unserved = {}
+        for gaps, group in by_gaps.items():
+            for gap_start, gap_end in gaps:
+                for ticker, windows in self._fill_gap(group, interval, gap_start, gap_end, timeout).items():
+                    unserved.setdefault(ticker, []).extend(windows)
+        return {ticker: _iso_windows(unserved.get(ticker, [])) for ticker in tickers}
+
+    def _fill_gap(self, tickers, interval, start, end, timeout):
+        """Fetch one missing range for some tickers and merge it into the store.
+
+        Returns {ticker: windows of the range the upstream could not serve}.
+        """
+        windows, unserved = plan_windows(interval, start, end)
+        if unserved:
+            logger.warning(f"{interval} bars before {unserved[0][1]} are no longer served by the upstream")
+        if len(windows) <= 1:
+            failures = [self._fetch_window(tickers, interval, s, e, timeout) for s, e in windows]
+        else:
+            # The store stitches the windows: rows are keyed by timestamp, so overlaps collapse
+            with ThreadPoolExecutor(max_workers=min(self.window_workers, len(windows))) as pool:
+                # Each window runs in a copy of the caller's context (e.g. its upstream patience)
+                futures = [
+                    pool.submit(contextvars.copy_context().run, self._fetch_window, tickers, interval, s, e, timeout)
+                    for s, e in windows
+                ]
+                failures = [future.result() for future in futures]
+        result = {ticker: list(unserved) for ticker in tickers}
+        for window, failed in zip(windows, failures):
+            for ticker in failed:
+                result[ticker].append(window)
+        return result
+
+    def _fetch_window(self, tickers, interval, start, end, timeout):
+        """Fetch one window from the upstream and write it; returns the tickers it could not serve"""
+        logger.info(f"Fetching {', '.join(tickers)} {interval} {start} -> {end} from upstream")
+        symbols = tickers[0] if len(tickers) == 1 else list(tickers)
+        try:
+            raw = self.fetcher(symbols, start.isoformat(), end.isoformat(), interval, timeout)
+        except Exception as e:
+            logger.warning(f"Fetching {', '.join(tickers)} {interval} {start} -> {end} failed: {e}")
+            raw = None
+        if raw is None:
+            return list(tickers)
+        # Never mark today (or the future) as covered: the current bar still changes
+        covered_end = min(end, date.today())
+        # The fetcher lists symbols whose part of a grouped answer failed upstream
+        failed = [ticker for ticker in tickers if ticker in raw.attrs.get('failed_symbols', ())]
+        for ticker in tickers:
+            if ticker in failed:
+                continue
+            try:
+                data = normalize_frame(raw, ticker if len(tickers) > 1 else None)
+                known_series = self._series_tz(ticker, interval) is not False
+                self.write(ticker, interval, data)
+
+                # An empty answer only proves the gap has no trading days if we know
+                # the symbol exists; otherwise it may be a typo or an upstream failure
+                if data.empty and not known_series:
+                    continue
+                if covered_end > start:
+                    self._add_coverage(ticker, interval, start, covered_end)
+            except Exception as e:
+                # One bad symbol in a grouped answer does not lose the others
+                logger.warning(f"Could not store {ticker} {interval} {start} -> {end}: {e}")
+                failed.append(ticker)
+        return failed
+
+    def _series_tz(self, ticker, interval):
+        """Return the stored timezone of a series, or False if the series is unknown"""
+        row = self.db.connect().execute(
+            'SELECT tz FROM series WHERE ticker = ? AND interval = ?',
+            (ticker, interval)
+        ).fetchone()
+        return False if row is None else row[0]
+
+    def version(self, ticker, interval):
+        """Return the last time a series was written, or None if it is unknown"""
+        row = self.db.connect().execute(
+            'SELECT updated_at FROM series WHERE ticker = ? AND interval = ?',
+            (ticker, interval)
+        ).fetchone()
+        return row[0] if row else None
+
+    def write(self, ticker, interval, data):
+        """Upsert normalized OHLCV rows for a series"""
+        if data.empty:
+            return
+        index = pd.DatetimeIndex(data.index)
+        tz = str(index.tz) if index.tz is not None else None
+        if tz is not None:
+            index = index.tz_convert('UTC').tz_localize(None)
+        timestamps = (index - pd.Timestamp(0)) // pd.Timedelta(seconds=1)
+        # NaN -> NULL in one pass per column instead of per cell
+        columns = [
+            data[col].astype('object').where(data[col].notna(), None).tolist()
+            if col in data.columns else [None] * len(data)
+            for col in PRICE_COLUMNS
+        ]
+        rows = [
+            (ticker, interval, int(ts)) + tuple(values)
+            for ts, *values in zip(timestamps, *columns)
+        ]
+        conn = self.db.connect()
+        with conn:
+            conn.executemany(
+                'INSERT OR REPLACE INTO prices VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)', rows
+            )
+            conn.execute(
+                'INSERT OR REPLACE INTO series VALUES (?, ?, ?, ?)',
+                (ticker, interval, tz, time.time())
+            )
+
+    def _add_coverage(self, ticker, interval, start, end):
+        """Record [start, end) as fetched and compact the series' coverage rows"""
+        conn = self.db.connect()
+        with conn:
+            # Windows of one gap finish concurrently; take the write lock before reading
+            conn.execute('BEGIN IMMEDIATE')
+            rows = conn.execute(
+                'SELECT start, end FROM coverage WHERE ticker = ? AND interval = ?',
+                (ticker, interval)
+            ).fetchall()
+            ranges = [(_parse_date(s), _parse_date(e)) for s, e in rows]
+            merged = merge_ranges(ranges + [(start, end)])
+            conn.execute(
+                'DELETE FROM coverage WHERE ticker = ? AND interval = ?', (ticker, interval)
+            )
+            conn.executemany(
+                'INSERT INTO coverage VALUES (?, ?, ?, ?)',
+                [(ticker, interval, s.isoformat(), e.isoformat()) for s, e in merged]
+            )
+
+    def _bounds(self, ticker, start_date, end_date, interval):
+        """The series timezone and the [start, end) query bounds as unix timestamps"""
+        tz = self._series_tz(ticker, interval) or None
+        start = pd.Timestamp(_parse_date(start_date), tz=tz)
+        end = pd.Timestamp(_parse_date(end_date), tz=tz)
+        if tz is not None:
+            start, end = start.tz_convert('UTC'), end.tz_convert('UTC')
+        return tz, int(start.timestamp()), int(end.timestamp())
+
+    def count(self, ticker, start_date, end_date, interval):
+        """Number of stored bars in [start_date, end_date), from the index alone"""
+        _, start, end = self._bounds(ticker, start_date, end_date, interval)
+        return self.db.connect().execute(
+            'SELECT COUNT(*) FROM prices WHERE ticker = ? AND interval = ? AND ts >= ? AND ts < ?',
+            (ticker, interval, start, end)
+        ).fetchone()[0]
+
+    def span(self, ticker, start_date, end_date, interval):
+        """(bars, first ts, last ts) stored in [start_date, end_date), from the index alone.
+
+        Unlike version(), this does not change when the latest bar is
+        re-fetched with new values, only when bars are added or removed.
+        """
+        _, start, end = self._bounds(ticker, start_date, end_date, interval)
+        return tuple(self.db.connect().execute(
+            'SELECT COUNT(*), MIN(ts), MAX(ts) FROM prices WHERE ticker = ? AND interval = ? AND ts >= ? AND ts < ?',
+            (ticker, interval, start, end)
+        ).fetchone())
+
+    def iter_read(self, ticker, start_date, end_date, interval, chunk_rows=READ_CHUNK_ROWS):
+        """Yield the stored slice [start_date, end_date) as DataFrames of at most chunk_rows rows"""
+        tz, start, end = self._bounds(ticker, start_date, end_date, interval)
+        cursor = self.db.connect().execute(
+            'SELECT ts, open, high, low, close, adj_close, volume FROM prices '
+            'WHERE ticker = ? AND interval = ? AND ts >= ? AND ts < ? ORDER BY ts',
+            (ticker, interval, start, end)
+        )
+        first = True
+        while True:
+            rows = cursor.fetchmany(chunk_rows)
+            if rows or first:  # An empty slice still yields one (empty) frame
+                yield _rows_frame(rows, tz)
+            if len(rows) < chunk_rows:
+                break
+            first = False
+
+    def read_page(self, ticker, start_date, end_date, interval, offset, limit):
+        """Rows offset..offset+limit of the stored slice [start_date, end_date), read with LIMIT/OFFSET.
+
+        Keeps the same columns as read() of the whole slice, so every page of
+        a table has the same layout.
+        """
+        tz, start, end = self._bounds(ticker, start_date, end_date, interval)
+        conn = self.db.connect()
+        rows = conn.execute(
+            'SELECT ts, open, high, low, close, adj_close, volume FROM prices '
+            'WHERE ticker = ? AND interval = ? AND ts >= ? AND ts < ? ORDER BY ts LIMIT ? OFFSET ?',
+            (ticker, interval, start, end, limit, offset)
+        ).fetchall()
+        has_adj_close = conn.execute(
+            'SELECT 1 FROM prices WHERE ticker = ? AND interval = ? AND ts >= ? AND ts < ? '
+            'AND adj_close IS NOT NULL LIMIT 1',
+            (ticker, interval, start, end)
+        ).fetchone()
+        data = _rows_frame(rows, tz)
+        return data if has_adj_close else data.drop(columns='Adj Close')
+
+    def read(self, ticker, start_date, end_date, interval, transform=None):
+        """Read the stored slice [start_date, end_date) without touching the upstream.
+
+        Rows are converted chunk by chunk, so only one chunk of SQLite tuples
+        is alive at a time; transform(chunk) (e.g. a resample) is applied to
+        each chunk before they are concatenated.
+        """
+        chunks = [
+            transform(chunk) if transform else chunk
+            for chunk in self.iter_read(ticker, start_date, end_date, interval)
+        ]
+        data = chunks[0] if len(chunks) == 1 else pd.concat(chunks)
+        # Drop columns the upstream never supplied (e.g. Adj Close with auto_adjust)
+        return data.loc[:, data.notna().any(axis=0) | (data.columns != 'Adj Close')]
@@ -0,0 +1,88 @@
+import sqlite3
+import time
+
+from limits.storage import Storage
+
+from db import SQLiteDB
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS limits (
+    key TEXT PRIMARY KEY,
+    count INTEGER NOT NULL,
+    expiry REAL NOT NULL
+) WITHOUT ROWID;
+"""
+
+
+class SQLiteStorage(Storage):
+    """Rate-limit counters in a local SQLite file shared by every gunicorn worker.
+
+    Registered with `limits` under the ``sqlite`` scheme, so importing this
+    module is enough to use ``storage_uri="sqlite:///path/to/limits.sqlite"``.
+    Supports the fixed-window strategy (flask-limiter's default); each
+    increment is a single write transaction, so concurrent workers never
+    lose a hit.
+    """
+
+    STORAGE_SCHEME = ['sqlite']
+    PURGE_EVERY = 1000  # Increments between sweeps of expired keys
+
+    def __init__(self, uri=None, wrap_exceptions=False, **options):
+        path = uri.split('://', 1)[1] if uri and '://' in uri else ''
+        if not path:
+            raise ValueError("SQLite rate-limit storage needs a path: sqlite:///path/to/limits.sqlite")
+        self.db = SQLiteDB(path, SCHEMA)
+        self._increments = 0
+        super().__init__(uri, wrap_exceptions=wrap_exceptions, **options)
+
+    @property
+    def base_exceptions(self):
+        return sqlite3.Error
+
+    def incr(self, key, expiry, amount=1):
+        """Add `amount` hits to a key, starting a new window if the last one expired"""
+        now = time.time()
+        conn = self.db.connect()
+        with conn:
+            # The first statement is a write, so the whole read-modify-write holds the lock
+            conn.execute('DELETE FROM limits WHERE key = ? AND expiry <= ?', (key, now))
+            conn.execute(
+                'INSERT INTO limits (key, count, expiry) VALUES (?, ?, ?) '
+                'ON CONFLICT (key) DO UPDATE SET count = count + excluded.count',
+                (key, amount, now + expiry)
+            )
+            count = conn.execute('SELECT count FROM limits WHERE key = ?', (key,)).fetchone()[0]
+        self._increments += 1
+        if self._increments % self.PURGE_EVERY == 0:
+            with conn:
+                conn.execute('DELETE FROM limits WHERE expiry <= ?', (now,))
+        return count
+
+    def get(self, key):
+        row = self.db.connect().execute(
+            'SELECT count FROM limits WHERE key = ? AND expiry > ?', (key, time.time())
+        ).fetchone()
+        return row[0] if row else 0
+
+    def get_expiry(self, key):
+        row = self.db.connect().execute(
+            'SELECT expiry FROM limits WHERE key = ? AND expiry > ?', (key, time.time())
+        ).fetchone()
+        return row[0] if row else time.time()
+
+    def check(self):
+        try:
+            self.db.connect().execute('SELECT 1').fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+
+    def reset(self):
+        conn = self.db.connect()
+        with conn:
+            return conn.execute('DELETE FROM limits').rowcount
+
+    def clear(self, key):
+        conn = self.db.connect()
+        with conn:
+            conn.execute('DELETE FROM limits WHERE key = ?', (key,))
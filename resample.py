@@ -0,0 +1,121 @@
+import pandas as pd
+
+# Coarser intervals derived locally from stored daily bars, with their pandas
+# rules. Bins are labelled by their first day like Yahoo's own bars (weeks
+# start on Monday, months and quarters on their first calendar day).
+RESAMPLE_RULES = {
+    '1wk': 'W-MON',
+    '1mo': 'MS',
+    '3mo': 'QS',
+}
+
+# Ladder used to stay within a row budget, finest first
+INTERVAL_LADDER = ['1d', '1wk', '1mo', '3mo']
+
+# Coarser intraday bars derived locally when a range would not fit the memory budget.
+# Hourly bins start at :30 like Yahoo's (US sessions open at 9:30).
+INTRADAY_RULES = {
+    '2m': ('2min', None),
+    '5m': ('5min', None),
+    '15m': ('15min', None),
+    '30m': ('30min', None),
+    '1h': ('60min', '30min'),
+}
+INTRADAY_LADDER = ['1m', '2m', '5m', '15m', '30m', '1h']
+
+# Typical bars per trading day, to estimate the size of an interval before building it
+BARS_PER_DAY = {
+    '1m': 390, '2m': 195, '5m': 78, '15m': 26, '30m': 13, '60m': 7, '90m': 5, '1h': 7,
+    '1d': 1, '1wk': 1 / 5, '1mo': 1 / 21, '3mo': 1 / 63,
+}
+
+INTERVAL_LABELS = {
+    '1m': '1-minute',
+    '2m': '2-minute',
+    '5m': '5-minute',
+    '15m': '15-minute',
+    '30m': '30-minute',
+    '1h': 'hourly',
+    '1d': 'daily',
+    '1wk': 'weekly',
+    '1mo': 'monthly',
+    '3mo': 'quarterly',
+}
+
+# OHLCV aggregation: first open, max high, min low, last close, summed volume
+AGGREGATIONS = {
+    'Open': 'first',
+    'High': 'max',
+    'Low': 'min',
+    'Close': 'last',
+    'Adj Close': 'last',
+    'Volume': 'sum',
+}
+
+
+def base_interval(interval):
+    """Return the interval that is fetched and stored to serve `interval`"""
+    return '1d' if interval in RESAMPLE_RULES else interval
+
+
+def resample_ohlcv(data, interval):
+    """Aggregate daily (or intraday) OHLCV bars into a coarser interval in one vectorized pass"""
+    rule = RESAMPLE_RULES.get(interval)
+    offset = None
+    if rule is None and interval in INTRADAY_RULES:
+        rule, offset = INTRADAY_RULES[interval]
+    if rule is None or data.empty:
+        return data
+    aggregations = {col: how for col, how in AGGREGATIONS.items() if col in data.columns}
+    if rule.startswith('W-'):
+        resampler = data.resample(rule, label='left', closed='left')
+    else:
+        resampler = data.resample(rule, offset=offset)
+    resampled = resampler.agg(aggregations)
+    # Bins without any trading day (e.g. a holiday week) come back as NaN rows
+    resampled = resampled[resampled['Close'].notna()] if 'Close' in resampled else resampled.dropna(how='all')
+    if 'Volume' in resampled:
+        resampled['Volume'] = resampled['Volume'].astype(data['Volume'].dtype)
+    resampled.index.name = data.index.name
+    return resampled
+
+
+def derive_interval(daily, interval, max_rows=None):
+    """Derive `interval` bars from stored daily bars within an optional row budget.
+
+    If the result has more than max_rows rows, coarser intervals on the ladder
+    are tried until it fits. Returns (data, interval actually used).
+    Intervals that are not built from daily bars (intraday) are returned as-is.
+    """
+    data = resample_ohlcv(daily, interval) if interval in RESAMPLE_RULES else daily
+    if not max_rows or interval not in INTERVAL_LADDER:
+        return data, interval
+    for candidate in INTERVAL_LADDER[INTERVAL_LADDER.index(interval) + 1:]:
+        if len(data) <= max_rows:
+            break
+        data, interval = resample_ohlcv(daily, candidate), candidate
+    return data, interval
+
+
+def merge_bins(data):
+    """Combine bars that share a timestamp, e.g. one bin split across two resampled chunks"""
+    if not data.index.has_duplicates:
+        return data
+    aggregations = {col: how for col, how in AGGREGATIONS.items() if col in data.columns}
+    merged = data.groupby(level=0, sort=False).agg(aggregations)
+    merged.index.name = data.index.name
+    return merged
+
+
+def fit_interval(rows, base, interval, max_rows):
+    """The finest interval from `interval` up its ladder whose estimated size fits max_rows.
+
+    rows is the number of stored `base` bars. Falls back to the coarsest
+    interval on the ladder if none fits.
+    """
+    ladder = INTRADAY_LADDER if interval in INTRADAY_LADDER else INTERVAL_LADDER
+    candidates = ladder[ladder.index(interval):] if interval in ladder else [interval]
+    for candidate in candidates:
+        if rows * BARS_PER_DAY[candidate] / BARS_PER_DAY[base] <= max_rows:
+            return candidate
+    return candidates[-1]
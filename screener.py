@@ -0,0 +1,158 @@
+import ast
+import operator
+import re
+
+import pandas as pd
+
+from fundamentals_store import NUMERIC_FIELDS, TEXT_FIELDS
+
+# Common names for info fields, as people write them in a screen
+ALIASES = {
+    'p/e': 'trailingPE',
+    'pe': 'trailingPE',
+    'forward p/e': 'forwardPE',
+    'forward pe': 'forwardPE',
+    'peg': 'pegRatio',
+    'p/s': 'priceToSalesTrailing12Months',
+    'p/b': 'priceToBook',
+    'ev/ebitda': 'enterpriseToEbitda',
+    'ev/revenue': 'enterpriseToRevenue',
+    'ev/sales': 'enterpriseToRevenue',
+    'ev': 'enterpriseValue',
+    'market cap': 'marketCap',
+    'mcap': 'marketCap',
+    'price': 'currentPrice',
+    'roe': 'returnOnEquity',
+    'roa': 'returnOnAssets',
+    'profit margin': 'profitMargins',
+    'operating margin': 'operatingMargins',
+    'gross margin': 'grossMargins',
+    'ebitda margin': 'ebitdaMargins',
+    'revenue growth': 'revenueGrowth',
+    'earnings growth': 'earningsGrowth',
+    'debt/equity': 'debtToEquity',
+    'd/e': 'debtToEquity',
+    'current ratio': 'currentRatio',
+    'quick ratio': 'quickRatio',
+    'dividend yield': 'dividendYield',
+    'yield': 'dividendYield',
+    'payout ratio': 'payoutRatio',
+    'eps': 'trailingEps',
+    'fcf': 'freeCashflow',
+    'name': 'longName',
+}
+
+FIELDS = {name.lower(): name for name in TEXT_FIELDS + list(NUMERIC_FIELDS)}
+
+# Longest alias first so "forward p/e" wins over "p/e" and "ev/ebitda" over "ev"
+_ALIAS_RE = re.compile(
+    r'(?<![\w/])(' + '|'.join(re.escape(alias) for alias in sorted(ALIASES, key=len, reverse=True)) + r')(?![\w/])',
+    re.IGNORECASE
+)
+_SCALED_NUMBER_RE = re.compile(r'(?<![\w.])(\d+(?:\.\d+)?)\s*(%|[kmbt](?![\w]))', re.IGNORECASE)
+_SCALES = {'%': 0.01, 'k': 1e3, 'm': 1e6, 'b': 1e9, 't': 1e12}
+
+_COMPARISONS = {
+    ast.Lt: operator.lt,
+    ast.LtE: operator.le,
+    ast.Gt: operator.gt,
+    ast.GtE: operator.ge,
+    ast.Eq: operator.eq,
+    ast.NotEq: operator.ne,
+}
+_ARITHMETIC = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: operator.mul,
+    ast.Div: operator.truediv,
+}
+
+
+class ScreenError(ValueError):
+    """Raised for a screen expression that cannot be parsed or refers to unknown fields"""
+
+
+def resolve_field(name):
+    """Map an alias or (case-insensitive) info key to its column name"""
+    key = name.strip().lower()
+    field = ALIASES.get(key) or FIELDS.get(key)
+    if field is None:
+        raise ScreenError(f"Unknown field '{name.strip()}'")
+    return field
+
+
+def _rewrite(expression):
+    """Turn a human screen into a Python expression over plain field names"""
+    expression = _ALIAS_RE.sub(lambda m: ALIASES[m.group(1).lower()], expression)
+    expression = _SCALED_NUMBER_RE.sub(
+        lambda m: repr(float(m.group(1)) * _SCALES[m.group(2).lower()]), expression
+    )
+    expression = re.sub(r'\b(and|or|not)\b', lambda m: m.group(1).lower(), expression, flags=re.IGNORECASE)
+    return re.sub(r'(?<![<>=!])=(?!=)', '==', expression)
+
+
+def parse_screen(expression):
+    """Parse a screen such as "P/E < 15 and ROE > 20%" into a syntax tree"""
+    try:
+        return ast.parse(_rewrite(expression), mode='eval').body
+    except SyntaxError:
+        raise ScreenError(f"Could not parse screen '{expression}'")
+
+
+def _evaluate(node, frame):
+    """Evaluate a parsed screen over whole columns; only comparisons, and/or/not and arithmetic are allowed"""
+    if isinstance(node, ast.BoolOp):
+        values = [_evaluate(value, frame) for value in node.values]
+        combine = operator.and_ if isinstance(node.op, ast.And) else operator.or_
+        result = values[0]
+        for value in values[1:]:
+            result = combine(result, value)
+        return result
+    if isinstance(node, ast.UnaryOp):
+        operand = _evaluate(node.operand, frame)
+        if isinstance(node.op, ast.Not):
+            return ~operand
+        if isinstance(node.op, ast.USub):
+            return -operand
+    if isinstance(node, ast.Compare):
+        left = _evaluate(node.left, frame)
+        result = None
+        for op, comparator in zip(node.ops, node.comparators):
+            right = _evaluate(comparator, frame)
+            if type(op) not in _COMPARISONS:
+                break
+            if isinstance(right, str) and isinstance(left, pd.Series):
+                left, right = left.str.lower(), right.lower()  # Text fields compare case-insensitively
+            outcome = _COMPARISONS[type(op)](left, right)
+            result = outcome if result is None else result & outcome
+            left = right
+        else:
+            return result
+    if isinstance(node, ast.BinOp) and type(node.op) in _ARITHMETIC:
+        return _ARITHMETIC[type(node.op)](_evaluate(node.left, frame), _evaluate(node.right, frame))
+    if isinstance(node, ast.Name):
+        return frame[resolve_field(node.id)]
+    if isinstance(node, ast.Constant) and isinstance(node.value, (int, float, str)):
+        return node.value
+    raise ScreenError(f"Unsupported expression '{ast.unparse(node)}'")
+
+
+def screen(frame, expression='', sort=None, limit=None):
+    """Filter and sort a fundamentals frame.
+
+    `sort` is a field or alias, prefixed with '-' for descending; missing
+    values always sort last. Returns (matching rows, number of matches).
+    """
+    result = frame
+    if expression and expression.strip():
+        mask = _evaluate(parse_screen(expression), frame)
+        if not isinstance(mask, pd.Series) or not pd.api.types.is_bool_dtype(mask):
+            raise ScreenError('The screen must compare fields, e.g. "P/E < 15"')
+        result = frame[mask]
+    if sort:
+        descending = sort.startswith('-')
+        result = result.sort_values(resolve_field(sort.lstrip('-+')), ascending=not descending, na_position='last')
+    total = len(result)
+    if limit:
+        result = result.head(limit)
+    return result, total
@@ -0,0 +1,117 @@
+import fcntl
+import hashlib
+import logging
+import os
+import threading
+from concurrent.futures import Future
+
+logger = logging.getLogger(__name__)
+
+
+class SingleFlight:
+    """Coalesce identical concurrent calls so only one reaches the upstream.
+
+    Within a worker, callers with the same key wait on the first caller's
+    Future and receive its result (or exception). Across workers the leader
+    takes an exclusive flock on a per-key lock file, so a second worker doing
+    the same work blocks until the first is done; the wrapped function is
+    expected to consult the shared store first and will then find the data
+    already there.
+    """
+
+    def __init__(self, lock_dir=None):
+        self.lock_dir = lock_dir
+        if lock_dir:
+            os.makedirs(lock_dir, exist_ok=True)
+        self._lock = threading.Lock()
+        self._inflight = {}
+        self.counters = {'calls': 0, 'leaders': 0, 'coalesced': 0, 'lock_waits': 0}
+
+    def do(self, key, fn, *args, **kwargs):
+        """Run fn(*args, **kwargs) once per key at a time and share its result"""
+        with self._lock:
+            self.counters['calls'] += 1
+            future = self._inflight.get(key)
+            if future is not None:
+                self.counters['coalesced'] += 1
+                leader = False
+            else:
+                future = Future()
+                self._inflight[key] = future
+                self.counters['leaders'] += 1
+                leader = True
+
+        if not leader:
+            return future.result()
+
+        try:
+            with self._file_lock(key):
+                result = fn(*args, **kwargs)
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def stats(self):
+        with self._lock:
+            return dict(self.counters)
+
+    def _file_lock(self, key):
+        return _FileLock(self, key) if self.lock_dir else _NullLock()
+
+
+class _FileLock:
+    """Exclusive flock on a lock file named after the key's hash.
+
+    The holder unlinks the file before releasing it, so lock files do not
+    pile up one per key. A waiter that then wins the lock on the unlinked
+    inode sees that the path no longer names its file and retries with a
+    fresh one, which keeps the lock exclusive.
+    """
+
+    def __init__(self, flight, key):
+        self.flight = flight
+        digest = hashlib.sha1(repr(key).encode('utf-8')).hexdigest()
+        self.path = os.path.join(flight.lock_dir, f'{digest}.lock')
+        self.fd = None
+
+    def __enter__(self):
+        while True:
+            self.fd = os.open(self.path, os.O_CREAT | os.O_RDWR, 0o644)
+            try:
+                fcntl.flock(self.fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                # Another worker is fetching the same thing; wait for it to finish
+                with self.flight._lock:
+                    self.flight.counters['lock_waits'] += 1
+                fcntl.flock(self.fd, fcntl.LOCK_EX)
+            if self._still_linked():
+                return self
+            os.close(self.fd)
+
+    def __exit__(self, *exc):
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
+        fcntl.flock(self.fd, fcntl.LOCK_UN)
+        os.close(self.fd)
+        return False
+
+    def _still_linked(self):
+        try:
+            return os.stat(self.path).st_ino == os.fstat(self.fd).st_ino
+        except FileNotFoundError:
+            return False
+
+
+class _NullLock:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
@@ -0,0 +1,210 @@
+"""Local ticker symbol index for validation and autocomplete.
+
+Symbols live in a sorted list searched with bisect, so membership and prefix
+lookups cost O(log n). Fuzzy matches use a deletion index (every symbol
+minus one character), so a typo within one edit is found with a handful of
+dict lookups instead of comparing against every symbol.
+
+The index loads DATA_DIR/symbols.csv if it exists, else the small list
+bundled with the app. Refresh the full US exchange directory with:
+
+    python symbols.py refresh [--out data/symbols.csv]
+"""
+import argparse
+import csv
+import io
+import logging
+import os
+import re
+import threading
+import urllib.request
+from bisect import bisect_left, insort
+
+logger = logging.getLogger(__name__)
+
+BUNDLED_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'symbols.csv')
+
+# Nasdaq Trader symbol directories: Nasdaq listings, and NYSE/NYSE American/NYSE Arca/Cboe listings
+DIRECTORY_URLS = {
+    'nasdaq': 'https://www.nasdaqtrader.com/dynamic/SymDir/nasdaqlisted.txt',
+    'other': 'https://www.nasdaqtrader.com/dynamic/SymDir/otherlisted.txt',
+}
+OTHER_EXCHANGES = {'A': 'NYSEAMERICAN', 'N': 'NYSE', 'P': 'NYSEARCA', 'Z': 'BATS', 'V': 'IEX'}
+
+# Symbols a US directory can vouch for: plain letters with an optional share class (BRK-B).
+# Anything else (^GSPC, EURUSD=X, BTC-USD, VOD.L) is never rejected.
+US_SYMBOL = re.compile(r'^[A-Z]{1,5}(-[A-Z])?$')
+
+# Shorter queries are one edit away from too many symbols for fuzzy matches to help
+FUZZY_MIN_LENGTH = 3
+
+
+def edit_distance(a, b):
+    """Damerau-Levenshtein distance (adjacent transpositions count as one edit)"""
+    previous2, previous = None, list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i] + [0] * len(b)
+        for j, cb in enumerate(b, 1):
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb))
+            if i > 1 and j > 1 and ca == b[j - 2] and a[i - 2] == cb:
+                current[j] = min(current[j], previous2[j - 2] + 1)
+        previous2, previous = previous, current
+    return previous[-1]
+
+
+def _deletions(symbol):
+    return {symbol[:i] + symbol[i + 1:] for i in range(len(symbol))}
+
+
+class SymbolIndex:
+    """Sorted symbols with names, for membership, prefix, name and fuzzy lookups.
+
+    `complete` is True when the index was loaded from a downloaded exchange
+    directory rather than the bundled sample, i.e. when an unknown US symbol
+    can safely be treated as a typo.
+    """
+
+    def __init__(self, rows=(), complete=False):
+        self.complete = complete
+        self.names = dict(rows)
+        self.symbols = sorted(self.names)
+        # Sorted (name word, symbol) pairs for name prefix search
+        self._words = sorted({(word, symbol) for symbol, name in self.names.items()
+                              for word in re.findall(r'[a-z0-9]+', name.lower())})
+        self._deletes = {}
+        self._lock = threading.Lock()
+        for symbol in self.symbols:
+            self._index_deletions(symbol)
+
+    @classmethod
+    def load(cls, path=None):
+        """Load the first existing of `path` and the bundled list"""
+        for candidate in (path, BUNDLED_PATH):
+            if candidate and os.path.exists(candidate):
+                with open(candidate, newline='') as f:
+                    rows = [(row['symbol'].upper(), row.get('name') or '') for row in csv.DictReader(f)]
+                logger.info(f"Loaded {len(rows)} symbols from {candidate}")
+                return cls(rows, complete=candidate != BUNDLED_PATH)
+        return cls()
+
+    def __len__(self):
+        return len(self.symbols)
+
+    def __contains__(self, symbol):
+        i = bisect_left(self.symbols, symbol)
+        return i < len(self.symbols) and self.symbols[i] == symbol
+
+    def add(self, symbol, name=''):
+        """Learn a symbol at runtime (e.g. one the upstream just served)"""
+        with self._lock:
+            if symbol in self:
+                if name and not self.names.get(symbol):
+                    self.names[symbol] = name
+                return
+            insort(self.symbols, symbol)
+            self.names[symbol] = name
+            for word in re.findall(r'[a-z0-9]+', name.lower()):
+                insort(self._words, (word, symbol))
+            self._index_deletions(symbol)
+
+    def _index_deletions(self, symbol):
+        for variant in _deletions(symbol):
+            self._deletes.setdefault(variant, []).append(symbol)
+
+    def validates(self, symbol, assume_complete=False):
+        """Whether this index can tell that `symbol` does not exist"""
+        return (self.complete or assume_complete) and bool(US_SYMBOL.match(symbol))
+
+    def prefix(self, query, limit=10):
+        """Symbols starting with query, in order"""
+        results = []
+        i = bisect_left(self.symbols, query)
+        while i < len(self.symbols) and len(results) < limit and self.symbols[i].startswith(query):
+            results.append(self.symbols[i])
+            i += 1
+        return results
+
+    def by_name(self, query, limit=10):
+        """Symbols with a name word starting with query (case-insensitive)"""
+        query = query.lower()
+        results = []
+        i = bisect_left(self._words, (query, ''))
+        while i < len(self._words) and len(results) < limit and self._words[i][0].startswith(query):
+            if self._words[i][1] not in results:
+                results.append(self._words[i][1])
+            i += 1
+        return results
+
+    def fuzzy(self, query, limit=5, max_distance=1):
+        """Symbols within max_distance edits of query, closest first"""
+        candidates = set(self._deletes.get(query, ()))
+        for variant in _deletions(query) | {query}:
+            if variant in self and variant != query:
+                candidates.add(variant)
+            candidates.update(self._deletes.get(variant, ()))
+        candidates.discard(query)
+        scored = sorted((edit_distance(query, symbol), symbol) for symbol in candidates)
+        return [symbol for distance, symbol in scored if distance <= max_distance][:limit]
+
+    def search(self, query, limit=10):
+        """Autocomplete: symbol prefix matches, then name matches, then near misses.
+
+        Returns [{'symbol', 'name', 'match'}, ...].
+        """
+        query = query.strip()
+        if not query:
+            return []
+        results, seen = [], set()
+        for match, symbols in (('prefix', self.prefix(query.upper(), limit)),
+                               ('name', self.by_name(query, limit)),
+                               ('fuzzy', self.fuzzy(query.upper(), limit) if len(query) >= FUZZY_MIN_LENGTH else [])):
+            for symbol in symbols:
+                if symbol not in seen and len(results) < limit:
+                    seen.add(symbol)
+                    results.append({'symbol': symbol, 'name': self.names.get(symbol, ''), 'match': match})
+        return results
+
+
+def fetch_directory(timeout=30):
+    """Download the US exchange directories as [(symbol, name, exchange)] (test issues skipped)"""
+    rows = []
+    for source, url in DIRECTORY_URLS.items():
+        with urllib.request.urlopen(url, timeout=timeout) as response:
+            text = response.read().decode('utf-8', 'replace')
+        lines = [line for line in text.splitlines() if line and not line.startswith('File Creation Time')]
+        for record in csv.DictReader(io.StringIO('\n'.join(lines)), delimiter='|'):
+            if record.get('Test Issue') == 'Y':
+                continue
+            if source == 'nasdaq':
+                symbol, exchange = record['Symbol'], 'NASDAQ'
+            else:
+                symbol, exchange = record['ACT Symbol'], OTHER_EXCHANGES.get(record.get('Exchange'), '')
+            # Yahoo writes share classes with a dash: BRK.B -> BRK-B
+            rows.append((symbol.replace('.', '-'), record['Security Name'], exchange))
+    return rows
+
+
+def write_directory(rows, path):
+    """Write rows atomically, so workers never load a half-written list"""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp = f'{path}.tmp'
+    with open(tmp, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['symbol', 'name', 'exchange'])
+        writer.writerows(sorted(rows))
+    os.replace(tmp, path)
+
+
+def main():
+    default_dir = os.environ.get('DATA_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data'))
+    parser = argparse.ArgumentParser(description='Manage the local ticker symbol list')
+    parser.add_argument('command', choices=['refresh'])
+    parser.add_argument('--out', default=os.path.join(default_dir, 'symbols.csv'))
+    args = parser.parse_args()
+    rows = fetch_directory()
+    write_directory(rows, args.out)
+    print(f"Wrote {len(rows)} symbols to {args.out}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,27 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# The app reads its configuration at import time: offline provider, no limits, a throwaway data directory
+os.environ['MARKET_DATA_PROVIDER'] = 'fake'
+os.environ['DATA_DIR'] = tempfile.mkdtemp(prefix='stockdownloader-tests-')
+os.environ['RATELIMIT_ENABLED'] = '0'
+os.environ['UPSTREAM_RATE'] = '100000'
+os.environ['UPSTREAM_BURST'] = '100000'
+os.environ['SECRET_KEY'] = 'tests'
+
+
+@pytest.fixture(scope='session')
+def app_module():
+    import main
+    return main
+
+
+@pytest.fixture
+def client(app_module):
+    return app_module.app.test_client()
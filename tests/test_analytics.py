@@ -0,0 +1,68 @@
+from datetime import date, timedelta
+
+import pandas as pd
+import pytest
+
+from analytics import compute_analytics
+
+
+@pytest.fixture
+def downloads(app_module, monkeypatch):
+    calls = []
+    original = app_module.download_batch_data
+
+    def recording(*args, **kwargs):
+        calls.append(args)
+        return original(*args, **kwargs)
+
+    monkeypatch.setattr(app_module, 'download_batch_data', recording)
+    return calls
+
+
+def test_memo_is_checked_before_downloading(app_module, downloads):
+    args = (['AAPL', 'MSFT'], '2022-01-01', '2023-01-01', '1d')
+    first = app_module.get_analytics(*args, benchmark='SPY')
+    assert app_module.get_analytics(*args, benchmark='SPY') == first
+    assert len(downloads) == 1
+
+
+def test_refreshed_latest_bar_keeps_the_memo_and_a_new_bar_does_not(app_module, downloads):
+    store = app_module.price_store
+    start, end = (date.today() - timedelta(days=120)).isoformat(), (date.today() + timedelta(days=1)).isoformat()
+    args = (['NVDA'], start, end, '1d')
+    app_module.get_analytics(*args)
+    stored = store.read('NVDA', start, end, '1d')
+    # Re-fetching the latest bar rewrites it (and bumps the series version) without adding bars
+    store.write('NVDA', '1d', stored.iloc[-1:])
+    app_module.get_analytics(*args)
+    assert len(downloads) == 1
+    # A bar on a day the range did not have yet is new data
+    extra = next(day for day in (stored.index[0] + timedelta(days=n) for n in range(1, 7)) if day not in stored.index)
+    store.write('NVDA', '1d', stored.iloc[:1].set_axis([extra]))
+    app_module.get_analytics(*args)
+    assert len(downloads) == 2
+
+
+def test_current_client_gets_304_without_computing(client, app_module, monkeypatch):
+    query = {'tickers': 'AAPL,MSFT', 'start': '2021-01-01', 'end': '2022-01-01'}
+    first = client.get('/api/analytics', query_string=query)
+    assert first.status_code == 200
+
+    def fail(*args, **kwargs):
+        raise AssertionError('analytics computed for a current client')
+
+    monkeypatch.setattr(app_module, 'get_analytics', fail)
+    again = client.get('/api/analytics', query_string=query, headers={'If-None-Match': first.headers['ETag']})
+    assert again.status_code == 304
+
+
+def test_metrics_match_hand_computed_values():
+    index = pd.date_range('2024-01-01', periods=4, freq='D')
+    prices = pd.DataFrame({'A': [100.0, 110.0, 99.0, 120.0], 'B': [50.0, 55.0, 49.5, 60.0]}, index=index)
+    metrics = compute_analytics(prices, benchmark='B', beta_window=2)['metrics']
+    assert metrics.loc['A', 'Total Return'] == pytest.approx(0.2)
+    assert metrics.loc['A', 'Max Drawdown'] == pytest.approx(99 / 110 - 1)
+    assert metrics.loc['A', 'Observations'] == 3
+    # B moves exactly like A, so A's beta against it is 1
+    assert metrics.loc['A', 'Beta'] == pytest.approx(1)
+    assert metrics.loc['A', 'Rolling Beta (2)'] == pytest.approx(1)
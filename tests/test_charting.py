@@ -0,0 +1,55 @@
+import base64
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from charting import build_chart_payload, compute_indicators, lttb_indices, minmax_indices
+
+
+@pytest.fixture
+def walk():
+    rng = np.random.default_rng(7)
+    return np.cumsum(rng.normal(size=1000)) + 100
+
+
+def decode(column):
+    return np.frombuffer(base64.b64decode(column['data']), dtype=np.dtype(column['dtype']).newbyteorder('<'))
+
+
+def test_lttb_keeps_the_requested_points_and_both_ends(walk):
+    keep = lttb_indices(np.arange(len(walk), dtype='float64'), walk, 100)
+    assert len(keep) == 100
+    assert keep[0] == 0 and keep[-1] == len(walk) - 1
+    assert (np.diff(keep) > 0).all()
+    assert len(lttb_indices(np.arange(50.0), walk[:50], 100)) == 50  # Short series are kept whole
+
+
+def test_minmax_keeps_both_ends_and_the_extremes(walk):
+    keep = minmax_indices(walk, 100)
+    assert len(keep) <= 100
+    assert keep[0] == 0 and keep[-1] == len(walk) - 1
+    assert walk.argmin() in keep and walk.argmax() in keep
+    assert len(minmax_indices(walk[:50], 100)) == 50
+
+
+def test_chart_payload_is_decimated_at_the_same_indices(walk):
+    index = pd.date_range('2020-01-01', periods=len(walk), freq='D', name='Date')
+    data = pd.DataFrame({'Open': walk, 'High': walk + 1, 'Low': walk - 1, 'Close': walk}, index=index)
+    for method in ('lttb', 'minmax'):
+        payload = build_chart_payload(data, points=200, method=method, indicators=('sma50',))
+        t = decode(payload['columns']['t'])
+        assert payload['points'] == len(t) <= 200 and payload['source_rows'] == len(walk)
+        assert t[0] == index[0].value // 10 ** 6 and t[-1] == index[-1].value // 10 ** 6
+        assert len(decode(payload['columns']['sma50'])) == len(t)
+
+
+def test_indicators_match_hand_computed_values():
+    result = compute_indicators(pd.Series([1.0, 2.0, 3.0, 4.0, 5.0]), ('sma3', 'ema3'))
+    np.testing.assert_allclose(result['sma3'], [np.nan, np.nan, 2, 3, 4])
+    # span 3: alpha = 0.5, seeded with the first close
+    np.testing.assert_allclose(result['ema3'], [1, 1.5, 2.25, 3.125, 4.0625])
+
+    # Changes +1 -1 +1 +1; Wilder averages with alpha 1/2: gains 1, .5, .75, .875 and losses 0, .5, .25, .125
+    rsi = compute_indicators(pd.Series([1.0, 2.0, 1.0, 2.0, 3.0]), ('rsi2',))['rsi2']
+    np.testing.assert_allclose(rsi, [np.nan, np.nan, 50, 75, 87.5])
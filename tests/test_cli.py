@@ -0,0 +1,63 @@
+import json
+import os
+
+import pandas as pd
+
+import cli
+
+
+def run(tmp_path, *args):
+    return cli.main(['--provider', 'fake', '--out', str(tmp_path), '--format', 'csv', '--progress-every', '60'] + list(args))
+
+
+def manifest(tmp_path):
+    with open(tmp_path / 'manifest.jsonl') as f:
+        return [json.loads(line) for line in f]
+
+
+def test_sanitized_file_names_do_not_collide():
+    assert cli.file_name('AAPL') == 'AAPL'
+    assert cli.file_name('BRK/B') != cli.file_name('BRK_B')
+    assert cli.file_name('BRK/B').startswith('BRK_B-')
+
+
+def test_rerun_with_fundamentals_exports_them_for_done_tickers(tmp_path, app_module):
+    assert run(tmp_path, 'AAPL', 'MSFT', '--start', '2024-01-01', '--end', '2024-02-01') == 0
+    assert run(tmp_path, 'AAPL', 'MSFT', 'NVDA', '--start', '2024-01-01', '--end', '2024-02-01', '--fundamentals') == 0
+    table = pd.read_csv(tmp_path / 'fundamentals.csv', index_col='Ticker')
+    assert sorted(table.index) == ['AAPL', 'MSFT', 'NVDA']
+    # Entries with fundamentals are still done for a run that does not ask for them
+    assert run(tmp_path, 'AAPL', '--start', '2024-01-01', '--end', '2024-02-01') == 0
+    assert len(manifest(tmp_path)) == 5
+
+
+def test_missing_windows_are_recorded_as_partial_and_retried(tmp_path, app_module, monkeypatch):
+    original = app_module.download_stock_data
+
+    def with_a_hole(*args, **kwargs):
+        data = original(*args, **kwargs)
+        data.attrs['missing_windows'] = [('2024-01-08', '2024-01-15')]
+        return data
+
+    monkeypatch.setattr(app_module, 'download_stock_data', with_a_hole)
+    assert run(tmp_path, 'AAPL', '--start', '2024-01-01', '--end', '2024-02-01') == 1
+    entry = manifest(tmp_path)[-1]
+    assert entry['status'] == 'partial' and entry['missing_windows'] == [['2024-01-08', '2024-01-15']]
+    assert os.path.exists(entry['path'])
+
+    monkeypatch.setattr(app_module, 'download_stock_data', original)
+    assert run(tmp_path, 'AAPL', '--start', '2024-01-01', '--end', '2024-02-01') == 0
+    assert manifest(tmp_path)[-1]['status'] == 'done'
+
+
+def test_exports_wait_for_the_upstream_budget(tmp_path, app_module, monkeypatch):
+    waits = []
+    original = app_module.download_stock_data
+
+    def recording(*args, **kwargs):
+        waits.append(app_module.upstream._patience.get())
+        return original(*args, **kwargs)
+
+    monkeypatch.setattr(app_module, 'download_stock_data', recording)
+    assert run(tmp_path, 'AAPL', 'MSFT', '--start', '2024-01-01', '--end', '2024-02-01', '--workers', '2') == 0
+    assert waits == [app_module.UPSTREAM_BATCH_MAX_WAIT] * 2
@@ -0,0 +1,54 @@
+import glob
+import os
+import tempfile
+
+import pytest
+
+QUERY = {'ticker': 'MSFT', 'start': '2023-01-01', 'end': '2024-01-01', 'interval': '1d'}
+
+
+def export_files():
+    return set(glob.glob(os.path.join(tempfile.gettempdir(), 'export_*')))
+
+
+@pytest.fixture
+def session_client(client):
+    client.post('/', data=QUERY)  # Stores the session's last query
+    return client
+
+
+@pytest.mark.parametrize('export_format', ['xlsx', 'parquet'])
+def test_export_file_is_removed_even_if_the_body_is_never_read(session_client, export_format):
+    before = export_files()
+    response = session_client.head('/export', query_string={'format': export_format})
+    assert response.status_code == 200
+    response.close()
+    response = session_client.get('/export', query_string={'format': export_format}, buffered=False)
+    response.close()  # The client went away without reading anything
+    assert export_files() <= before
+
+
+def test_streamed_export_is_complete_and_removed(session_client):
+    before = export_files()
+    response = session_client.get('/export', query_string={'format': 'parquet'})
+    assert response.data.startswith(b'PAR1') and len(response.data) == int(response.headers['X-Export-Bytes'])
+    response.close()  # As the WSGI server does once the body is sent
+    assert export_files() <= before
+
+
+def test_csv_export_carries_its_size_unless_streamed(session_client, app_module, monkeypatch):
+    response = session_client.get('/export', query_string={'format': 'csv'})
+    assert response.data.startswith(b'Date,') and len(response.data) == int(response.headers['X-Export-Bytes'])
+    monkeypatch.setattr(app_module, 'CSV_BUFFER_ROWS', 10)
+    streamed = session_client.get('/export', query_string={'format': 'csv'})
+    assert streamed.data == response.data and 'X-Export-Bytes' not in streamed.headers
+
+
+def test_export_answers_304_without_loading_the_prices(session_client, app_module, monkeypatch):
+    first = session_client.get('/export', query_string={'format': 'csv'})
+    assert first.status_code == 200 and first.headers['ETag']
+    loads = []
+    monkeypatch.setattr(app_module, 'load_query_data', lambda *args, **kwargs: loads.append(args))
+    again = session_client.get('/export', query_string={'format': 'csv'}, headers={'If-None-Match': first.headers['ETag']})
+    assert again.status_code == 304
+    assert not loads
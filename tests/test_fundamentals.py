@@ -0,0 +1,24 @@
+import time
+
+import fake_provider
+
+STUB = {'trailingPegRatio': None}  # What yfinance returns for a failed or unknown quote
+
+
+def test_nameless_stub_info_is_a_miss(app_module, monkeypatch):
+    monkeypatch.setattr(fake_provider.Ticker, 'info', property(lambda self: dict(STUB)))
+    assert app_module.Fundamentals('STUBA').info == {}
+    assert app_module.fundamentals_cache.peek('STUBA') is None
+    assert 'STUBA' not in app_module.fundamentals_store.frame().index
+
+
+def test_stub_refresh_does_not_replace_good_data(app_module, monkeypatch):
+    good = app_module.Fundamentals('STUBB').info
+    assert good['longName']
+    app_module.fundamentals_cache.set('STUBB', good, ttl=-1)  # Expired: the next read refreshes it
+    monkeypatch.setattr(fake_provider.Ticker, 'info', property(lambda self: dict(STUB)))
+    assert app_module.Fundamentals('STUBB').info == good
+    deadline = time.monotonic() + 2
+    while 'STUBB' in app_module.fundamentals_cache._refreshing and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert app_module.fundamentals_cache.peek('STUBB') == good
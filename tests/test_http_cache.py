@@ -0,0 +1,59 @@
+import gzip
+
+import pytest
+
+QUERY = {'ticker': 'AAPL', 'start': '2023-01-01', 'end': '2024-01-01', 'interval': '1d', 'limit': 50}
+
+
+@pytest.fixture(autouse=True)
+def stored_range(app_module):
+    # Explicit queries are answered from the store only
+    app_module.price_store.fill('AAPL', QUERY['start'], QUERY['end'], '1d')
+
+
+def test_explicit_queries_do_not_fetch(client, app_module):
+    calls = []
+    original = app_module.price_store.fetcher
+    app_module.price_store.fetcher = lambda *args, **kwargs: calls.append(args) or original(*args, **kwargs)
+    try:
+        response = client.get('/api/prices', query_string=dict(QUERY, ticker='MSFT', start='2010-01-01', end='2011-01-01'))
+    finally:
+        app_module.price_store.fetcher = original
+    assert response.status_code == 404 and not calls
+
+
+def test_pages_match_the_full_table(client, app_module):
+    stored = app_module.price_store.read('AAPL', QUERY['start'], QUERY['end'], '1d')
+    first = client.get('/api/prices', query_string=dict(QUERY, cursor=0)).get_json()
+    second = client.get('/api/prices', query_string=dict(QUERY, cursor=first['next_cursor'])).get_json()
+    assert first['total'] == len(stored)
+    assert first['columns'] == second['columns'] == ['Date'] + list(stored.columns)
+    dates = [row[0] for row in first['rows'] + second['rows']]
+    assert dates == [ts.strftime('%Y-%m-%d') for ts in stored.index[:100]]
+
+
+def test_prices_answer_304_for_a_current_etag(client):
+    first = client.get('/api/prices', query_string=QUERY)
+    assert first.status_code == 200 and first.headers['ETag']
+    assert first.cache_control.max_age  # A fully stored past range may be reused
+    again = client.get('/api/prices', query_string=QUERY, headers={'If-None-Match': first.headers['ETag']})
+    assert again.status_code == 304 and again.data == b''
+    other = client.get('/api/prices', query_string=dict(QUERY, end='2023-12-01'),
+                       headers={'If-None-Match': first.headers['ETag']})
+    assert other.status_code == 200
+
+
+def test_new_bars_change_the_etag(client, app_module):
+    first = client.get('/api/prices', query_string=QUERY)
+    app_module.price_store.write('AAPL', '1d', app_module.price_store.read('AAPL', '2023-06-01', '2023-06-10', '1d'))
+    again = client.get('/api/prices', query_string=QUERY, headers={'If-None-Match': first.headers['ETag']})
+    assert again.status_code == 200 and again.headers['ETag'] != first.headers['ETag']
+
+
+def test_json_is_gzipped_for_clients_that_accept_it(client):
+    plain = client.get('/api/prices', query_string=dict(QUERY, limit=500))
+    response = client.get('/api/prices', query_string=dict(QUERY, limit=500),
+                          headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert gzip.decompress(response.data) == plain.data
+    assert response.headers['ETag'].startswith('W/')
@@ -0,0 +1,61 @@
+import threading
+import time
+
+import fake_provider
+
+
+def test_price_fetch_on_the_pool_charges_the_request_budget(client, app_module, monkeypatch):
+    budgets = []
+    original = app_module.download_stock_data
+
+    def recording(*args, **kwargs):
+        budgets.append(kwargs.get('budget'))
+        return original(*args, **kwargs)
+
+    monkeypatch.setattr(app_module, 'download_stock_data', recording)
+    response = client.post('/', data={'ticker': 'AAPL', 'start': '2024-01-01', 'end': '2024-03-01', 'interval': '1d'})
+    assert response.status_code == 200
+    assert budgets and isinstance(budgets[0], app_module.MemoryBudget)
+    assert budgets[0].used > 0
+
+
+def test_empty_ticker_and_unknown_interval_are_rejected_before_any_fetch(client, app_module, monkeypatch):
+    calls = []
+    monkeypatch.setattr(app_module, 'download_stock_data', lambda *args, **kwargs: calls.append(args))
+    monkeypatch.setattr(app_module, 'get_financial_ratios', lambda *args, **kwargs: calls.append(args))
+    form = {'ticker': 'AAPL', 'start': '2024-01-01', 'end': '2024-03-01', 'interval': '1d'}
+    page = client.post('/', data=dict(form, ticker='   ')).get_data(as_text=True)
+    assert 'Please enter a ticker symbol.' in page
+    page = client.post('/', data=dict(form, interval='bogus')).get_data(as_text=True)
+    assert 'Unsupported interval &#39;bogus&#39;' in page
+    assert not calls
+    assert '' not in app_module.fundamentals_store.frame().index
+    assert client.post('/batch', data={'tickers': 'AAPL', 'start': '2024-01-01', 'end': '2024-03-01',
+                                       'interval': 'bogus'}).status_code == 400
+    assert client.get('/api/analytics', query_string={'tickers': 'AAPL', 'start': '2024-01-01', 'end': '2024-03-01',
+                                                      'interval': 'bogus'}).status_code == 400
+
+
+def test_slow_fundamentals_render_a_partial_page_by_the_deadline(client, app_module, monkeypatch):
+    release = threading.Event()
+
+    def slow_info(self):
+        release.wait(5)  # An upstream that answers long after the page's deadline
+        return {'longName': 'Slow Corp', 'currentPrice': 10.0}
+
+    monkeypatch.setattr(fake_provider.Ticker, 'info', property(slow_info))
+    monkeypatch.setattr(app_module, 'INDEX_DEADLINE', 0.5)
+    try:
+        started = time.monotonic()
+        response = client.post('/', data={'ticker': 'SLOWF', 'start': '2024-01-01', 'end': '2024-03-01', 'interval': '1d'})
+        elapsed = time.monotonic() - started
+    finally:
+        release.set()
+    assert response.status_code == 200
+    assert elapsed < 3
+    page = response.get_data(as_text=True)
+    assert 'Partial results:' in page
+    assert 'Fundamentals did not arrive within' in page
+    assert 'Prices did not arrive' not in page
+    assert 'daily rows from 2024-01-01' in page  # The price table still renders
+    assert 'Financial Analysis for SLOWF' not in page
@@ -0,0 +1,82 @@
+import time
+
+import pytest
+
+from jobs import JobQueue
+
+
+@pytest.fixture
+def queue(tmp_path):
+    queue = JobQueue(str(tmp_path / 'jobs.sqlite'), concurrency=2, timeout=2)
+    queue.POLL_INTERVAL = 0.02
+    return queue
+
+
+def wait_for(queue, job_id, timeout=5):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = queue.status(job_id)
+        if job['status'] not in ('queued', 'running'):
+            return job
+        time.sleep(0.02)
+    raise AssertionError(f'job {job_id} did not finish')
+
+
+def test_job_result_and_failure(queue):
+    queue.register('double', lambda params, job: {'value': params['value'] * 2})
+    queue.register('fail', lambda params, job: 1 / 0)
+    assert wait_for(queue, queue.submit('double', {'value': 21}))['result'] == {'value': 42}
+    failed = wait_for(queue, queue.submit('fail', {}))
+    assert failed['status'] == 'failed' and 'division' in failed['error']
+
+
+def test_identical_active_jobs_are_deduplicated(queue):
+    queue.register('sleep', lambda params, job: time.sleep(0.3))
+    first = queue.submit('sleep', {'n': 1})
+    assert queue.submit('sleep', {'n': 1}) == first
+    assert queue.submit('sleep', {'n': 2}) != first
+
+
+def test_cancel_stops_a_running_job_at_its_checkpoint(queue):
+    checkpoints = []
+
+    def handler(params, job):
+        while True:
+            job.check()
+            checkpoints.append(1)
+            time.sleep(0.01)
+
+    queue.register('loop', handler)
+    job_id = queue.submit('loop', {})
+    while not checkpoints:
+        time.sleep(0.01)
+    assert queue.cancel(job_id)
+    assert wait_for(queue, job_id)['status'] == 'cancelled'
+
+
+def test_slow_job_times_out(queue):
+    queue.timeout = 0.2
+    queue.register('hang', lambda params, job: time.sleep(2))
+    job = wait_for(queue, queue.submit('hang', {}))
+    assert job['status'] == 'timeout'
+
+
+def test_result_of_a_timed_out_job_is_discarded(queue):
+    queue.timeout = 0.1
+    discarded = []
+    queue.register('late', lambda params, job: time.sleep(0.3) or {'path': 'late'}, discard=discarded.append)
+    assert wait_for(queue, queue.submit('late', {}))['status'] == 'timeout'
+    deadline = time.monotonic() + 2
+    while not discarded and time.monotonic() < deadline:
+        time.sleep(0.02)
+    assert discarded == [{'path': 'late'}]
+
+
+def test_only_a_finished_job_for_the_query_skips_the_queue(app_module):
+    query = {'ticker': 'AAPL', 'start_date': '1990-01-01', 'end_date': '2020-01-01', 'interval': '1d'}
+    assert not app_module.finished_price_job('', query)
+    assert not app_module.finished_price_job('no-such-job', query)
+    job_id = app_module.job_queue.submit('prices', query)
+    assert wait_for(app_module.job_queue, job_id, timeout=30)['status'] == 'done'
+    assert app_module.finished_price_job(job_id, query)
+    assert not app_module.finished_price_job(job_id, dict(query, ticker='MSFT'))
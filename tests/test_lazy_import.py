@@ -0,0 +1,38 @@
+import logging
+import threading
+
+SLOW_MODULE = """
+import time
+time.sleep(0.3)  # A heavy import (yfinance, pyarrow) still running when other threads ask for it
+
+def download():
+    return 'ok'
+"""
+
+
+def test_concurrent_first_uses_get_the_finished_module(app_module, tmp_path, monkeypatch, caplog):
+    (tmp_path / 'slow_lazy_module.py').write_text(SLOW_MODULE)
+    monkeypatch.syspath_prepend(str(tmp_path))
+    monkeypatch.delitem(app_module.sys.modules, 'slow_lazy_module', raising=False)
+    monkeypatch.setattr(app_module, 'lazy_imported', set(app_module.lazy_imported))
+    start = threading.Barrier(4)
+    results, errors = [], []
+
+    def use():
+        start.wait()
+        try:
+            results.append(app_module.lazy_import('slow_lazy_module').download())
+        except Exception as e:
+            errors.append(e)
+
+    with caplog.at_level(logging.INFO, logger='main'):
+        threads = [threading.Thread(target=use) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    assert not errors
+    assert results == ['ok'] * 4
+    # Only the import that did the work is timed
+    assert len([r for r in caplog.records if r.message.startswith('Imported slow_lazy_module')]) == 1
+    assert app_module.boot_timings['imports']['slow_lazy_module'] >= 0.3
@@ -0,0 +1,65 @@
+import json
+import re
+
+from metrics import Metrics
+
+# One Server-Timing metric: a token name with a millisecond duration, e.g. "render;dur=12.3"
+TIMING = re.compile(r'^[A-Za-z0-9_\-.]+;dur=\d+(\.\d+)?$')
+
+
+def test_render_merges_the_snapshots_of_every_worker(tmp_path):
+    worker = Metrics(str(tmp_path))
+    worker.describe('http_requests_total', 'counter', 'Requests by endpoint and status')
+    worker.describe('stage_seconds', 'histogram', 'Time spent in each stage', buckets=(0.1, 1))
+    worker.inc('http_requests_total', endpoint='index', status='200')
+    worker.observe('stage_seconds', 0.05, stage='render')
+    # Another gunicorn worker (live or exited) left its snapshot behind
+    other = {
+        'counters': [['http_requests_total', {'endpoint': 'index', 'status': '200'}, 2]],
+        'histograms': [['stage_seconds', {'stage': 'render'}, {'buckets': [0, 1], 'sum': 0.5, 'count': 1}]],
+    }
+    (tmp_path / '999999.json').write_text(json.dumps(other))
+    (tmp_path / '999998.json').write_text('{"counters": [')  # Half-written snapshots are skipped
+
+    lines = worker.render().splitlines()
+    assert '# HELP http_requests_total Requests by endpoint and status' in lines
+    assert '# TYPE http_requests_total counter' in lines
+    assert 'http_requests_total{endpoint="index",status="200"} 3' in lines
+    assert '# TYPE stage_seconds histogram' in lines
+    assert 'stage_seconds_bucket{stage="render",le="0.1"} 1' in lines
+    assert 'stage_seconds_bucket{stage="render",le="1"} 2' in lines
+    assert 'stage_seconds_bucket{stage="render",le="+Inf"} 2' in lines
+    assert 'stage_seconds_sum{stage="render"} 0.55' in lines
+    assert 'stage_seconds_count{stage="render"} 2' in lines
+
+
+def test_flush_writes_a_snapshot_other_workers_can_read(tmp_path):
+    worker = Metrics(str(tmp_path))
+    worker.add_collector(lambda: [('cache_requests_total', {'cache': 'info', 'result': 'hit'}, 4)])
+    worker.flush(force=True)
+    snapshots = list(tmp_path.glob('*.json'))
+    assert len(snapshots) == 1
+    assert json.loads(snapshots[0].read_text())['counters'] == [
+        ['cache_requests_total', {'cache': 'info', 'result': 'hit'}, 4]
+    ]
+
+
+def test_metrics_endpoint_renders_prometheus_text(client):
+    client.get('/stats')
+    response = client.get('/metrics')
+    assert response.status_code == 200
+    assert response.mimetype == 'text/plain'
+    body = response.get_data(as_text=True)
+    assert '# TYPE http_requests_total counter' in body
+    assert re.search(r'^http_requests_total\{endpoint="stats",status="200"\} [1-9]\d*$', body, re.M)
+    assert '# TYPE http_request_seconds histogram' in body
+
+
+def test_responses_carry_a_well_formed_server_timing_header(client):
+    response = client.post('/', data={'ticker': 'AAPL', 'start': '2024-01-01', 'end': '2024-03-01', 'interval': '1d'})
+    assert response.status_code == 200
+    entries = response.headers['Server-Timing'].split(', ')
+    assert all(TIMING.match(entry) for entry in entries), entries
+    names = [entry.split(';')[0] for entry in entries]
+    assert names[-1] == 'total'
+    assert 'render' in names
@@ -0,0 +1,136 @@
+from datetime import date, timedelta
+
+import fake_provider
+from price_store import PriceStore, missing_ranges, normalize_frame, plan_windows, split_range
+
+
+class RecordingFetcher:
+    """fake_provider.download with a log of calls; `fail` makes every call return None"""
+
+    def __init__(self, fail=False):
+        self.calls = []
+        self.fail = fail
+
+    def __call__(self, ticker, start_date, end_date, interval, timeout):
+        self.calls.append((ticker, start_date, end_date, interval))
+        if self.fail:
+            return None
+        return fake_provider.download(ticker, start=start_date, end=end_date, interval=interval)
+
+
+def test_missing_ranges_skips_covered_parts():
+    d = date.fromisoformat
+    covered = [(d('2024-01-01'), d('2024-02-01')), (d('2024-03-01'), d('2024-04-01'))]
+    assert missing_ranges(covered, d('2023-12-01'), d('2024-05-01')) == [
+        (d('2023-12-01'), d('2024-01-01')), (d('2024-02-01'), d('2024-03-01')), (d('2024-04-01'), d('2024-05-01'))
+    ]
+    assert missing_ranges(covered, d('2024-01-05'), d('2024-01-20')) == []
+
+
+def test_plan_windows_splits_intraday_and_drops_expired_range():
+    today = date(2024, 6, 30)
+    windows, unavailable = plan_windows('1m', today - timedelta(days=40), today, today=today)
+    assert unavailable == [(today - timedelta(days=40), today - timedelta(days=29))]
+    assert windows == split_range(today - timedelta(days=29), today, 7)
+    assert all((end - start).days <= 7 for start, end in windows)
+    assert plan_windows('1d', date(2000, 1, 1), today, today=today) == ([(date(2000, 1, 1), today)], [])
+
+
+def test_fill_fetches_only_missing_gaps(tmp_path):
+    fetcher = RecordingFetcher()
+    store = PriceStore(str(tmp_path / 'prices.sqlite'), fetcher)
+    store.fill('AAA', '2024-01-01', '2024-03-01', '1d')
+    store.fill('AAA', '2024-02-01', '2024-04-01', '1d')
+    assert [call[1:3] for call in fetcher.calls] == [('2024-01-01', '2024-03-01'), ('2024-03-01', '2024-04-01')]
+    data = store.read('AAA', '2024-01-01', '2024-04-01', '1d')
+    assert len(data) == store.count('AAA', '2024-01-01', '2024-04-01', '1d') > 0
+    assert data.index.is_monotonic_increasing and not data.index.has_duplicates
+    assert store.fill('AAA', '2024-01-15', '2024-03-15', '1d') == []
+    assert len(fetcher.calls) == 2
+
+
+def test_failed_fetch_is_not_marked_covered(tmp_path):
+    store = PriceStore(str(tmp_path / 'prices.sqlite'), RecordingFetcher(fail=True))
+    assert store.fill('AAA', '2024-01-01', '2024-02-01', '1d') == [('2024-01-01', '2024-02-01')]
+    assert store.missing('AAA', '1d', '2024-01-01', '2024-02-01') != []
+
+
+def test_empty_answer_for_unknown_symbol_is_not_cached(tmp_path):
+    store = PriceStore(str(tmp_path / 'prices.sqlite'), RecordingFetcher())
+    store.fill('INVALID1', '2024-01-01', '2024-02-01', '1d')
+    assert store.missing('INVALID1', '1d', '2024-01-01', '2024-02-01') != []
+
+
+def test_fill_many_groups_tickers_with_the_same_gaps(tmp_path):
+    fetcher = RecordingFetcher()
+    store = PriceStore(str(tmp_path / 'prices.sqlite'), fetcher)
+    store.fill('AAA', '2024-01-01', '2024-02-01', '1d')
+    store.fill_many(['AAA', 'BBB', 'CCC'], '2024-01-01', '2024-03-01', '1d')
+    grouped = fetcher.calls[1:]
+    assert (['BBB', 'CCC'], '2024-01-01', '2024-03-01', '1d') in grouped
+    assert ('AAA', '2024-02-01', '2024-03-01', '1d') in grouped
+    assert all(store.missing(t, '1d', '2024-01-01', '2024-03-01') == [] for t in ['AAA', 'BBB', 'CCC'])
+
+
+def test_chunked_read_matches_single_read(tmp_path):
+    store = PriceStore(str(tmp_path / 'prices.sqlite'), RecordingFetcher())
+    store.fill('AAA', '2020-01-01', '2024-01-01', '1d')
+    whole = store.read('AAA', '2020-01-01', '2024-01-01', '1d')
+    chunks = list(store.iter_read('AAA', '2020-01-01', '2024-01-01', '1d', chunk_rows=100))
+    assert len(chunks) == -(-len(whole) // 100)
+    assert sum(len(chunk) for chunk in chunks) == len(whole)
+
+
+def test_failing_group_or_ticker_does_not_fail_the_others(tmp_path):
+    fetcher = RecordingFetcher()
+
+    def flaky(ticker, *args):
+        if 'BAD' in ticker:
+            raise IOError('connection reset')
+        return fetcher(ticker, *args)
+
+    store = PriceStore(str(tmp_path / 'prices.sqlite'), flaky)
+    store.fill('AAA', '2024-01-01', '2024-02-01', '1d')
+    unserved = store.fill_many(['AAA', 'BAD', 'CCC'], '2024-01-01', '2024-03-01', '1d')
+    assert unserved['AAA'] == []
+    assert unserved['BAD'] == unserved['CCC'] == [('2024-01-01', '2024-03-01')]  # Same group as BAD
+
+    original_write = store.write
+    store.write = lambda ticker, *args: (ticker == 'CCC' and 1 / 0) or original_write(ticker, *args)
+    fetcher.fail = False
+    unserved = store.fill_many(['DDD', 'CCC'], '2024-01-01', '2024-03-01', '1d')
+    assert unserved == {'DDD': [], 'CCC': [('2024-01-01', '2024-03-01')]}
+    assert store.missing('CCC', '1d', '2024-01-01', '2024-03-01') != []
+
+
+def test_symbol_missing_from_grouped_answer_gets_no_bars(tmp_path):
+    store = PriceStore(str(tmp_path / 'prices.sqlite'), RecordingFetcher())
+    store.fill_many(['AAA', 'INVALID1'], '2024-01-01', '2024-02-01', '1d')
+    assert store.count('AAA', '2024-01-01', '2024-02-01', '1d') > 0
+    assert store.count('INVALID1', '2024-01-01', '2024-02-01', '1d') == 0
+
+
+def test_multi_window_gap_is_stitched_without_duplicates_or_holes(tmp_path):
+    fetcher = RecordingFetcher()
+    store = PriceStore(str(tmp_path / 'prices.sqlite'), fetcher, window_workers=3)
+    today = date.today()
+    start = today - timedelta(days=20)
+    assert store.fill('AAA', start.isoformat(), today.isoformat(), '1m') == []
+
+    # Three 7-day windows, fetched concurrently, that tile the gap exactly
+    windows = sorted(call[1:3] for call in fetcher.calls)
+    assert windows == [(s.isoformat(), e.isoformat()) for s, e in split_range(start, today, 7)]
+    assert len(windows) == 3
+
+    data = store.read('AAA', start.isoformat(), today.isoformat(), '1m')
+    assert data.index.is_monotonic_increasing and not data.index.has_duplicates
+    # Every bar of the range is there exactly once: the same rows as one fetch of the whole gap
+    whole = normalize_frame(fake_provider.download('AAA', start=start.isoformat(), end=today.isoformat(), interval='1m'))
+    assert len(whole) > 0
+    assert data.index.equals(whole.index)
+
+    # The windows merge into a single coverage row, so nothing is fetched again
+    assert store.covered_ranges('AAA', '1m') == [(start, today)]
+    assert store.missing('AAA', '1m', start.isoformat(), today.isoformat()) == []
+    assert store.fill('AAA', start.isoformat(), today.isoformat(), '1m') == []
+    assert len(fetcher.calls) == 3
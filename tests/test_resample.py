@@ -0,0 +1,52 @@
+import numpy as np
+import pandas as pd
+
+from resample import derive_interval, fit_interval, merge_bins, resample_ohlcv
+
+
+def daily_bars(start='2024-01-01', periods=30):
+    index = pd.bdate_range(start, periods=periods, name='Date')
+    close = np.arange(1, periods + 1, dtype='float64')
+    return pd.DataFrame({
+        'Open': close - 0.5, 'High': close + 1, 'Low': close - 1, 'Close': close,
+        'Volume': np.full(periods, 100, dtype='int64'),
+    }, index=index)
+
+
+def test_weekly_bars_aggregate_ohlcv():
+    daily = daily_bars()
+    weekly = resample_ohlcv(daily, '1wk')
+    first_week = daily.loc['2024-01-01':'2024-01-05']
+    assert weekly.index[0] == pd.Timestamp('2024-01-01')  # Labelled by the Monday
+    row = weekly.iloc[0]
+    assert row['Open'] == first_week['Open'].iloc[0]
+    assert row['High'] == first_week['High'].max()
+    assert row['Low'] == first_week['Low'].min()
+    assert row['Close'] == first_week['Close'].iloc[-1]
+    assert row['Volume'] == 500 and weekly['Volume'].dtype == daily['Volume'].dtype
+    assert weekly['Volume'].sum() == daily['Volume'].sum()
+
+
+def test_derive_interval_climbs_the_ladder_to_fit_max_rows():
+    daily = daily_bars(periods=400)
+    data, interval = derive_interval(daily, '1d', max_rows=100)
+    assert interval == '1wk' and len(data) <= 100
+    data, interval = derive_interval(daily, '1d', max_rows=50)
+    assert interval == '1mo' and len(data) <= 50
+    data, interval = derive_interval(daily, '1d', max_rows=1000)
+    assert interval == '1d' and len(data) == 400
+
+
+def test_merge_bins_combines_split_bins():
+    weekly = resample_ohlcv(daily_bars(), '1wk')
+    split = pd.concat([weekly.iloc[:2], weekly.iloc[1:]])
+    merged = merge_bins(split)
+    assert not merged.index.has_duplicates and len(merged) == len(weekly)
+    assert merged['Volume'].iloc[1] == 2 * weekly['Volume'].iloc[1]
+
+
+def test_fit_interval_picks_finest_interval_within_budget():
+    assert fit_interval(390 * 20, '1m', '1m', 390 * 20) == '1m'
+    assert fit_interval(390 * 20, '1m', '1m', 78 * 20) == '5m'
+    assert fit_interval(5000, '1d', '1d', 1500) == '1wk'
+    assert fit_interval(10 ** 9, '1d', '1d', 10) == '3mo'
@@ -0,0 +1,40 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from fundamentals_store import NUMERIC_FIELDS, TEXT_FIELDS
+from screener import ScreenError, screen
+
+
+@pytest.fixture
+def frame():
+    frame = pd.DataFrame(np.nan, index=pd.Index(['AAA', 'BBB', 'CCC'], name='ticker'), columns=list(NUMERIC_FIELDS))
+    frame[TEXT_FIELDS] = None
+    frame['trailingPE'] = [10.0, 25.0, np.nan]
+    frame['returnOnEquity'] = [0.30, 0.10, 0.25]
+    frame['marketCap'] = [5e9, 2e12, 8e8]
+    frame['sector'] = ['Technology', 'Energy', 'technology']
+    return frame
+
+
+def test_aliases_and_percentages(frame):
+    result, total = screen(frame, 'P/E < 15 and ROE > 20%')
+    assert list(result.index) == ['AAA'] and total == 1
+
+
+def test_scaled_numbers_and_text_fields(frame):
+    result, _ = screen(frame, "market cap > 1b and sector = 'TECHNOLOGY'")
+    assert list(result.index) == ['AAA']
+    result, _ = screen(frame, 'mcap >= 1t or not roe > 20%')
+    assert list(result.index) == ['BBB']
+
+
+def test_sort_puts_missing_values_last_and_limit_keeps_total(frame):
+    result, total = screen(frame, '', sort='-p/e', limit=2)
+    assert list(result.index) == ['BBB', 'AAA'] and total == 3
+
+
+@pytest.mark.parametrize('expression', ['nosuchfield > 1', 'P/E <', '__import__("os")', 'P/E'])
+def test_bad_screens_raise_screen_error(frame, expression):
+    with pytest.raises(ScreenError):
+        screen(frame, expression)
@@ -0,0 +1,55 @@
+import os
+import threading
+import time
+
+from singleflight import SingleFlight
+
+
+def test_file_lock_is_exclusive_across_flights_and_leaves_no_files(tmp_path):
+    # Two flights on one directory stand in for two workers: flock locks
+    # belong to the open file, so their leaders contend like processes do
+    flights = [SingleFlight(str(tmp_path)), SingleFlight(str(tmp_path))]
+    holders, overlaps = [], []
+
+    def work():
+        holders.append(1)
+        if len(holders) > 1:
+            overlaps.append(len(holders))
+        time.sleep(0.002)
+        holders.pop()
+
+    def run(flight):
+        for _ in range(50):
+            flight.do('key', work)
+
+    threads = [threading.Thread(target=run, args=(flight,)) for flight in flights]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert not overlaps
+    assert os.listdir(tmp_path) == []
+
+
+def test_concurrent_callers_share_one_call(tmp_path):
+    flight = SingleFlight(str(tmp_path))
+    started, release, calls = threading.Event(), threading.Event(), []
+
+    def slow():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return 'value'
+
+    results = []
+    leader = threading.Thread(target=lambda: results.append(flight.do('key', slow)))
+    leader.start()
+    started.wait(5)
+    follower = threading.Thread(target=lambda: results.append(flight.do('key', slow)))
+    follower.start()
+    while flight.stats()['coalesced'] == 0:
+        time.sleep(0.001)
+    release.set()
+    leader.join()
+    follower.join()
+    assert results == ['value', 'value'] and len(calls) == 1
@@ -0,0 +1,33 @@
+import fake_provider
+
+
+def post(client, ticker):
+    return client.post('/', data={'ticker': ticker, 'start': '2024-01-01', 'end': '2024-03-01', 'interval': '1d'})
+
+
+def test_unlisted_symbols_reach_the_upstream_and_typos_get_suggestions(client, app_module, monkeypatch):
+    # With the full exchange directory loaded, OTC ADRs and mutual funds are still not listed
+    monkeypatch.setattr(app_module.symbol_index, 'complete', True)
+    original = fake_provider.download
+
+    def download(tickers, *args, **kwargs):
+        data = original(tickers, *args, **kwargs)
+        return data.iloc[0:0] if tickers == 'AAPK' else data
+
+    monkeypatch.setattr(fake_provider, 'download', download)
+    info = fake_provider.Ticker.info
+    monkeypatch.setattr(fake_provider.Ticker, 'info', property(lambda self: {} if self.ticker == 'AAPK' else info.fget(self)))
+
+    for ticker in ('TCEHY', 'VFIAX'):
+        assert ticker not in app_module.symbol_index
+        page = post(client, ticker).get_data(as_text=True)
+        assert 'No data found' not in page and 'not a listed' not in page
+        assert ticker in app_module.symbol_index  # Learned from the upstream's answer
+
+    page = post(client, 'AAPK').get_data(as_text=True)
+    assert "No data found for ticker &#39;AAPK&#39;. Did you mean AAPL" in page
+
+
+def test_strict_validation_still_rejects_before_the_upstream(client, app_module, monkeypatch):
+    monkeypatch.setattr(app_module, 'SYMBOL_VALIDATION', 'strict')
+    assert 'not a listed ticker symbol' in post(client, 'QQQQX').get_data(as_text=True)
@@ -0,0 +1,66 @@
+import threading
+import time
+
+import pytest
+
+from ttl_cache import TTLCache
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return TTLCache(str(tmp_path / 'cache.sqlite'), namespace='test', ttl=60, stale_ttl=60, max_entries=3)
+
+
+def test_entries_expire_after_the_ttl_and_stale_window(cache):
+    cache.set('fresh', 1)
+    cache.set('stale', 2, ttl=-1)
+    cache.set('gone', 3, ttl=-61)
+    assert cache.get('fresh') == (1, True)
+    assert cache.get('stale') == (2, False)
+    assert cache.get('gone') is None
+    # peek ignores expiry (used while the upstream is down)
+    assert cache.peek('gone') == 3
+
+
+def test_stale_entry_is_served_and_refreshed_once(cache):
+    cache.set('key', 'old', ttl=-1)
+    release, calls = threading.Event(), []
+
+    def loader():
+        calls.append(1)
+        release.wait(5)
+        return 'new'
+
+    assert [cache.get_or_load('key', loader) for _ in range(3)] == ['old'] * 3
+    release.set()
+    deadline = time.monotonic() + 5
+    while cache.get('key') != ('new', True) and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert cache.get('key') == ('new', True)
+    assert len(calls) == 1
+    assert cache.counters['stale'] == 3
+
+
+def test_none_is_returned_but_not_cached(cache):
+    assert cache.get_or_load('key', lambda: None) is None
+    assert cache.get('key') is None
+    assert cache.get_or_load('key', lambda: 'value') == 'value'
+    assert cache.get_or_load('key', lambda: 'other') == 'value'
+
+
+def test_least_recently_used_entries_are_evicted(cache):
+    for key in 'abc':
+        cache.set(key, key)
+        time.sleep(0.01)
+    cache.get('a')  # Now more recent than b
+    time.sleep(0.01)
+    cache.set('d', 'd')
+    assert cache.get('b') is None
+    assert [cache.peek(key) for key in 'acd'] == ['a', 'c', 'd']
+
+
+def test_invalidate_drops_one_entry(cache):
+    cache.set('a', 1)
+    cache.set('b', 2)
+    cache.invalidate('a')
+    assert cache.get('a') is None and cache.get('b') == (2, True)
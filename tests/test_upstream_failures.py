@@ -0,0 +1,59 @@
+import logging
+import threading
+
+import pytest
+
+from price_store import PriceStore
+from upstream import Upstream, UpstreamUnavailable
+
+
+def test_transport_failure_raises_and_trips_the_breaker(app_module, tmp_path):
+    upstream = Upstream(str(tmp_path / 'upstream.sqlite'), rate=1000, burst=1000, retries=0, failure_threshold=2)
+    for _ in range(2):
+        with pytest.raises(IOError, match='Connection aborted'):
+            upstream.call(app_module.download_from_yahoo, 'XOFFLINE', '2024-01-01', '2024-02-01', '1d')
+    assert upstream.is_open()
+    with pytest.raises(UpstreamUnavailable):
+        upstream.call(app_module.download_from_yahoo, 'AAPL', '2024-01-01', '2024-02-01', '1d')
+
+
+def test_unknown_symbol_is_an_empty_answer_not_a_failure(app_module):
+    data = app_module.download_from_yahoo('XINVALID', '2024-01-01', '2024-02-01', '1d')
+    assert data.empty and data.attrs['failed_symbols'] == []
+
+
+def test_failed_symbols_are_not_marked_covered(app_module, tmp_path):
+    store = PriceStore(str(tmp_path / 'prices.sqlite'), app_module.download_from_yahoo)
+    assert store.fill('XOFFLINE', '2024-01-01', '2024-02-01', '1d') == [('2024-01-01', '2024-02-01')]
+    missing = store.fill_many(['AAPL', 'YOFFLINE'], '2024-01-01', '2024-02-01', '1d')
+    assert missing == {'AAPL': [], 'YOFFLINE': [('2024-01-01', '2024-02-01')]}
+    assert store.missing('AAPL', '1d', '2024-01-01', '2024-02-01') == []
+    assert store.missing('YOFFLINE', '1d', '2024-01-01', '2024-02-01') != []
+    assert store.missing('XOFFLINE', '1d', '2024-01-01', '2024-02-01') != []
+
+
+def test_errors_are_captured_per_thread(app_module):
+    # The record format yf.download uses for its per-symbol summary
+    yf_logger = logging.getLogger('yfinance')
+    with app_module.DownloadErrors() as captured:
+        yf_logger.error("\n2 Failed downloads:")
+        yf_logger.error("['AAPL', 'MSFT']: YFRateLimitError('Too Many Requests. Rate limited. Try after a while.')")
+        # A concurrent download on another thread reports its own failures
+        other = threading.Thread(target=yf_logger.error, args=("['NVDA']: ConnectionError('reset')",))
+        other.start()
+        other.join()
+    assert set(captured.errors) == {'AAPL', 'MSFT'}
+    assert 'Rate limited' in captured.errors['AAPL']
+
+
+def test_batch_callers_wait_for_tokens_instead_of_failing(app_module, tmp_path, monkeypatch):
+    upstream = Upstream(str(tmp_path / 'upstream.sqlite'), rate=20, burst=1, max_wait=0)
+    monkeypatch.setattr(app_module, 'upstream', upstream)
+    tickers = [f'WAIT{i}' for i in range(4)]
+    with pytest.raises(UpstreamUnavailable):
+        for ticker in tickers:
+            upstream.call(lambda: ticker)
+    # Pool threads inherit the caller's patience, so every ticker gets its info
+    with upstream.patience(5):
+        ratios = app_module.fetch_batch_ratios(tickers)
+    assert all(ratios[ticker] for ticker in tickers)
@@ -0,0 +1,137 @@
+import json
+import logging
+import threading
+import time
+
+from db import SQLiteDB
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS cache (
+    namespace TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value TEXT NOT NULL,
+    stored_at REAL NOT NULL,
+    expires_at REAL NOT NULL,
+    accessed_at REAL NOT NULL,
+    PRIMARY KEY (namespace, key)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS cache_lru ON cache (namespace, accessed_at);
+"""
+
+
+class TTLCache:
+    """Size-bounded TTL cache stored in SQLite so all gunicorn workers share it.
+
+    Entries expire ``ttl`` seconds after they are stored. Expired entries are
+    still served for another ``stale_ttl`` seconds while a background thread
+    refreshes them (stale-while-revalidate). When the namespace grows past
+    ``max_entries`` the least recently used entries are evicted. Values must
+    be JSON-serializable.
+    """
+
+    def __init__(self, path, namespace, ttl=3600, stale_ttl=86400, max_entries=512):
+        self.db = SQLiteDB(path, SCHEMA)
+        self.namespace = namespace
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.max_entries = max_entries
+        self._refreshing = set()
+        self._lock = threading.Lock()
+        self.counters = {'hit': 0, 'stale': 0, 'miss': 0}  # get_or_load() results in this worker
+
+    def get(self, key):
+        """Return (value, is_fresh) for a usable entry, or None on a miss"""
+        now = time.time()
+        conn = self.db.connect()
+        row = conn.execute(
+            'SELECT value, expires_at FROM cache WHERE namespace = ? AND key = ?',
+            (self.namespace, key)
+        ).fetchone()
+        if row is None or row[1] + self.stale_ttl <= now:
+            return None
+        with conn:
+            conn.execute(
+                'UPDATE cache SET accessed_at = ? WHERE namespace = ? AND key = ?',
+                (now, self.namespace, key)
+            )
+        return json.loads(row[0]), row[1] > now
+
+    def peek(self, key):
+        """Return a stored value however old it is (e.g. while the upstream is down), or None"""
+        row = self.db.connect().execute(
+            'SELECT value FROM cache WHERE namespace = ? AND key = ?', (self.namespace, key)
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def set(self, key, value, ttl=None):
+        """Store a value and evict the least recently used entries beyond max_entries"""
+        now = time.time()
+        ttl = self.ttl if ttl is None else ttl
+        conn = self.db.connect()
+        with conn:
+            conn.execute(
+                'INSERT OR REPLACE INTO cache VALUES (?, ?, ?, ?, ?, ?)',
+                (self.namespace, key, json.dumps(value), now, now + ttl, now)
+            )
+            conn.execute(
+                'DELETE FROM cache WHERE namespace = ? AND key IN ('
+                ' SELECT key FROM cache WHERE namespace = ?'
+                ' ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)',
+                (self.namespace, self.namespace, self.max_entries)
+            )
+
+    def invalidate(self, key):
+        """Drop a single entry"""
+        conn = self.db.connect()
+        with conn:
+            conn.execute(
+                'DELETE FROM cache WHERE namespace = ? AND key = ?', (self.namespace, key)
+            )
+
+    def clear(self):
+        """Drop every entry in this namespace"""
+        conn = self.db.connect()
+        with conn:
+            conn.execute('DELETE FROM cache WHERE namespace = ?', (self.namespace,))
+
+    def get_or_load(self, key, loader, ttl=None):
+        """Return the cached value, calling loader() on a miss.
+
+        Stale entries are returned immediately and refreshed in the background.
+        A loader result of None is returned but not cached, so failures are retried.
+        """
+        cached = self.get(key)
+        if cached is not None:
+            value, fresh = cached
+            self.counters['hit' if fresh else 'stale'] += 1
+            if not fresh:
+                self._refresh_in_background(key, loader, ttl)
+            return value
+
+        self.counters['miss'] += 1
+        value = loader()
+        if value is not None:
+            self.set(key, value, ttl)
+        return value
+
+    def _refresh_in_background(self, key, loader, ttl):
+        """Reload one entry on a daemon thread unless a refresh is already running"""
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+
+        def refresh():
+            try:
+                value = loader()
+                if value is not None:
+                    self.set(key, value, ttl)
+            except Exception as e:
+                logger.warning(f"Background refresh of {self.namespace}:{key} failed: {e}")
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        threading.Thread(target=refresh, name=f"refresh-{key}", daemon=True).start()
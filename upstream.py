@@ -0,0 +1,176 @@
+import contextvars
+import logging
+import random
+import time
+from contextlib import contextmanager
+
+from db import SQLiteDB
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS bucket (
+    id INTEGER PRIMARY KEY CHECK (id = 0),
+    tokens REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS breaker (
+    id INTEGER PRIMARY KEY CHECK (id = 0),
+    failures INTEGER NOT NULL,
+    trips INTEGER NOT NULL,
+    opened_until REAL NOT NULL
+);
+INSERT OR IGNORE INTO breaker (id, failures, trips, opened_until) VALUES (0, 0, 0, 0);
+"""
+
+
+class UpstreamUnavailable(Exception):
+    """Raised instead of calling the upstream while the circuit is open or the budget is exhausted"""
+
+
+class Upstream:
+    """Budget and circuit breaker shared by every call to the market-data upstream.
+
+    A token bucket (``rate`` calls per second, bursts of ``burst``) paces calls
+    across all workers. Failed calls are retried with exponential backoff and
+    jitter; after ``failure_threshold`` consecutive failures the circuit opens
+    for ``cooldown`` seconds (doubling on each repeated trip, up to
+    ``max_cooldown``) and calls fail fast with UpstreamUnavailable so callers
+    can serve cached data instead of blocking. Once the cooldown has passed a
+    single probe call is let through to test whether the upstream recovered.
+    State lives in SQLite so all gunicorn workers see the same budget and circuit.
+    Batch and background work, which no client is waiting on, can wait longer
+    for a token inside ``with upstream.patience(seconds):`` instead of failing.
+    """
+
+    def __init__(self, path, rate=2.0, burst=5, max_wait=10, retries=2, backoff=0.5,
+                 failure_threshold=5, cooldown=30, max_cooldown=300):
+        self.db = SQLiteDB(path, SCHEMA)
+        self.rate = rate
+        self.burst = burst
+        self.max_wait = max_wait
+        self.retries = retries
+        self.backoff = backoff
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self._patience = contextvars.ContextVar(f'upstream_patience_{id(self)}', default=None)
+        conn = self.db.connect()
+        with conn:
+            conn.execute(
+                'INSERT OR IGNORE INTO bucket (id, tokens, updated_at) VALUES (0, ?, ?)', (burst, time.time())
+            )
+
+    def call(self, fn, *args, **kwargs):
+        """Call fn(*args, **kwargs) within the budget, retrying failures with backoff"""
+        for attempt in range(self.retries + 1):
+            if not self._allow():
+                raise UpstreamUnavailable('The upstream is failing; the circuit is open.')
+            self._acquire()
+            try:
+                result = fn(*args, **kwargs)
+            except Exception as e:
+                self._record_failure()
+                if attempt == self.retries:
+                    raise
+                delay = self.backoff * 2 ** attempt * random.uniform(0.5, 1.5)
+                logger.warning(f"Upstream call failed ({e}); retrying in {delay:.1f}s")
+                time.sleep(delay)
+            else:
+                self._record_success()
+                return result
+
+    @contextmanager
+    def patience(self, max_wait):
+        """Let calls in this context wait up to max_wait seconds for a token"""
+        token = self._patience.set(max_wait)
+        try:
+            yield
+        finally:
+            self._patience.reset(token)
+
+    def is_open(self):
+        """True while calls are being refused"""
+        row = self.db.connect().execute('SELECT opened_until FROM breaker WHERE id = 0').fetchone()
+        return row[0] > time.time()
+
+    def state(self):
+        """Circuit and budget state for /stats"""
+        conn = self.db.connect()
+        failures, trips, opened_until = conn.execute(
+            'SELECT failures, trips, opened_until FROM breaker WHERE id = 0'
+        ).fetchone()
+        tokens, updated_at = conn.execute('SELECT tokens, updated_at FROM bucket WHERE id = 0').fetchone()
+        now = time.time()
+        return {
+            'circuit': 'open' if opened_until > now else ('half-open' if trips else 'closed'),
+            'consecutive_failures': failures,
+            'retry_in': max(0.0, round(opened_until - now, 1)),
+            'tokens': round(min(self.burst, tokens + (now - updated_at) * self.rate), 2),
+        }
+
+    def _acquire(self):
+        """Wait for a token, failing fast if the wait would exceed max_wait (or the context's patience)"""
+        max_wait = self._patience.get()
+        deadline = time.monotonic() + (self.max_wait if max_wait is None else max_wait)
+        while True:
+            wait = self._take_token()
+            if wait == 0:
+                return
+            if time.monotonic() + wait > deadline:
+                raise UpstreamUnavailable('The upstream request budget is exhausted; try again shortly.')
+            time.sleep(wait)
+
+    def _take_token(self):
+        """Take a token if one is available; otherwise return the seconds until one is"""
+        now = time.time()
+        conn = self.db.connect()
+        with conn:
+            conn.execute('BEGIN IMMEDIATE')
+            tokens, updated_at = conn.execute('SELECT tokens, updated_at FROM bucket WHERE id = 0').fetchone()
+            tokens = min(self.burst, tokens + max(0.0, now - updated_at) * self.rate)
+            wait = 0 if tokens >= 1 else (1 - tokens) / self.rate
+            if wait == 0:
+                tokens -= 1
+            conn.execute('UPDATE bucket SET tokens = ?, updated_at = ? WHERE id = 0', (tokens, now))
+        return wait
+
+    def _allow(self):
+        """Closed: allow. Open: refuse. Cooldown over: allow one probe per cooldown."""
+        now = time.time()
+        conn = self.db.connect()
+        trips, opened_until = conn.execute('SELECT trips, opened_until FROM breaker WHERE id = 0').fetchone()
+        if opened_until > now:
+            return False
+        if not trips:
+            return True
+        # Half-open: whoever moves opened_until forward first gets to probe
+        with conn:
+            claimed = conn.execute(
+                'UPDATE breaker SET opened_until = ? WHERE id = 0 AND opened_until = ?',
+                (now + self.max_wait + self.cooldown, opened_until)
+            ).rowcount
+        return bool(claimed)
+
+    def _record_success(self):
+        conn = self.db.connect()
+        with conn:
+            conn.execute(
+                'UPDATE breaker SET failures = 0, trips = 0, opened_until = 0 '
+                'WHERE id = 0 AND (failures != 0 OR trips != 0 OR opened_until != 0)'
+            )
+
+    def _record_failure(self):
+        now = time.time()
+        conn = self.db.connect()
+        with conn:
+            conn.execute('UPDATE breaker SET failures = failures + 1 WHERE id = 0')
+            failures, trips = conn.execute('SELECT failures, trips FROM breaker WHERE id = 0').fetchone()
+            # A failed probe reopens at once; otherwise open after enough consecutive failures
+            if trips or failures >= self.failure_threshold:
+                cooldown = min(self.max_cooldown, self.cooldown * 2 ** trips)
+                conn.execute(
+                    'UPDATE breaker SET failures = 0, trips = trips + 1, opened_until = ? WHERE id = 0',
+                    (now + cooldown,)
+                )
+                logger.warning(f"Upstream circuit opened for {cooldown}s after repeated failures")